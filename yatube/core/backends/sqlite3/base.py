@@ -0,0 +1,32 @@
+"""
+Бэкенд SQLite для продакшена: каждое новое соединение получает
+PRAGMA из SQLITE_PRAGMAS (WAL, synchronous=NORMAL, mmap, кеш страниц,
+busy_timeout), а транзакции начинаются с BEGIN SQLITE_TRANSACTION_MODE.
+
+BEGIN IMMEDIATE берет блокировку записи сразу: конкурирующий писатель
+ждет ее busy_timeout. При обычном BEGIN транзакция сначала читает,
+и повышение блокировки до записи при чужой записи сразу падает
+с "database is locked", не дожидаясь таймаута.
+"""
+
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+def pragmas():
+    return getattr(settings, 'SQLITE_PRAGMAS', {})
+
+
+def transaction_mode():
+    return getattr(settings, 'SQLITE_TRANSACTION_MODE', '')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in pragmas().items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {transaction_mode()}'.strip())
@@ -0,0 +1,220 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends import locmem
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+_missing = object()
+
+# ограничение SQLite на число параметров в одном запросе
+CHUNK_SIZE = 500
+
+# как часто (в записях) проверять размер кеша
+CULL_EVERY = 100
+
+
+class MetricsMixin:
+    """Считает попадания и промахи кеша для замера запроса."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version=version)
+        if value is _missing:
+            metrics.record_cache(0, 1)
+            return default
+        metrics.record_cache(1)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = super().get_many(keys, version=version)
+        metrics.record_cache(len(values), len(keys) - len(values))
+        return values
+
+
+class LocMemCache(MetricsMixin, locmem.LocMemCache):
+    pass
+
+
+def _chunks(items):
+    items = list(items)
+    for start in range(0, len(items), CHUNK_SIZE):
+        yield items[start:start + CHUNK_SIZE]
+
+
+class SQLiteBackend(BaseCache):
+    """
+    Кеш в SQLite-файле LOCATION, общий для всех процессов сервера:
+    попадания не делятся на число воркеров, а сброс версий в одном
+    воркере сразу виден остальным. Файл в режиме WAL, чтение не ждет
+    записи; add и incr атомарны между процессами.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self.local = threading.local()
+        self.writes = 0
+
+    @property
+    def connection(self):
+        # соединение не переживает fork: у каждого процесса свое
+        pid = os.getpid()
+        if getattr(self.local, 'pid', None) != pid:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10,
+                                         isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, '
+                'value BLOB NOT NULL, expires REAL) WITHOUT ROWID'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_expires '
+                               'ON cache (expires)')
+            self.local.connection = connection
+            self.local.pid = pid
+        return self.local.connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def _load(self, keys):
+        now = time.time()
+        found = {}
+        for chunk in _chunks(keys):
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.connection.execute(
+                'SELECT key, value FROM cache WHERE key IN '
+                f'({placeholders}) AND (expires IS NULL OR expires > ?)',
+                [*chunk, now],
+            )
+            found.update(
+                (key, pickle.loads(value)) for key, value in rows)
+        return found
+
+    def _write(self, connection, items, expires):
+        connection.executemany(
+            'INSERT OR REPLACE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            [(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires)
+             for key, value in items],
+        )
+        self.writes += len(items)
+        if self.writes >= CULL_EVERY:
+            self.writes = 0
+            self._cull(connection)
+
+    def _cull(self, connection):
+        connection.execute('DELETE FROM cache WHERE expires <= ?',
+                           (time.time(),))
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            # как и остальные кеши Django, удаляет 1/CULL_FREQUENCY записей,
+            # первыми - те, что скоро истекут сами
+            connection.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency if self._cull_frequency
+                 else count,),
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._load([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        return {keys[key]: value
+                for key, value in self._load(keys).items()}
+
+    def has_key(self, key, version=None):
+        return self.get(key, _missing, version=version) is not _missing
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self._write(self.connection, [(key, value)], self._expires(timeout))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = [(self._key(key, version), value)
+                 for key, value in data.items()]
+        connection = self.connection
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            self._write(connection, items, self._expires(timeout))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self.connection.execute(
+            'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+            'expires = excluded.expires WHERE cache.expires <= ?',
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+             self._expires(timeout), time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        connection = self.connection
+        # чтение и запись под одной блокировкой записи: два процесса
+        # не прибавят к одному и тому же старому значению
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key),
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self.connection.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self._expires(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        for chunk in _chunks(keys):
+            placeholders = ','.join('?' * len(chunk))
+            self.connection.execute(
+                f'DELETE FROM cache WHERE key IN ({placeholders})', chunk)
+
+    def clear(self):
+        self.connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # соединение живет весь процесс: открывать файл на каждый
+        # запрос дороже самих чтений
+        pass
+
+
+class SQLiteCache(MetricsMixin, SQLiteBackend):
+    pass
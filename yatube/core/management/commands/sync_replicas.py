@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import replicas
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную SQLite-базу в реплики REPLICA_DATABASES; '
+            'локальная замена репликации')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Повторять каждые N секунд (0 - один раз)')
+
+    def handle(self, *args, **options):
+        aliases = replicas.aliases()
+        if not aliases:
+            raise CommandError('REPLICA_DATABASES пуст: задайте DB_REPLICAS')
+
+        interval = options['interval']
+        while True:
+            started = time.perf_counter()
+            for alias in aliases:
+                replicas.sync(alias)
+            self.stdout.write(self.style.SUCCESS(
+                f'Реплики обновлены: {", ".join(aliases)} за '
+                f'{(time.perf_counter() - started) * 1000:.0f} мс'))
+            if not interval:
+                return
+            time.sleep(interval)
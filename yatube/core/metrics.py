@@ -0,0 +1,189 @@
+"""
+Легкие замеры запросов для продакшена: время ответа, число и время
+SQL-запросов, попадания в кеш и время отрисовки шаблонов.
+
+Замер текущего запроса хранится в Recorder потока; его заполняют
+обертка выполнения SQL, кеш core.cache и шаблонный бэкенд core.template.
+Итоги копятся в гистограммах по имени URL внутри процесса.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# верхние границы корзин гистограмм, мс; последняя корзина - все, что больше
+BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_local = threading.local()
+
+
+class Recorder:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.template_ms = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обертка connection.execute_wrapper."""
+
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_ms += (time.perf_counter() - started) * 1000
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total_ms(), 3),
+            'db_queries': self.queries,
+            'db_ms': round(self.db_ms, 3),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'template_ms': round(self.template_ms, 3),
+        }
+
+
+def current():
+    """Замер текущего запроса или None вне запроса."""
+
+    return getattr(_local, 'recorder', None)
+
+
+@contextmanager
+def recording():
+    recorder = Recorder()
+    previous, _local.recorder = current(), recorder
+    try:
+        yield recorder
+    finally:
+        _local.recorder = previous
+
+
+def record_cache(hits, misses=0):
+    recorder = current()
+    if recorder is not None:
+        recorder.cache_hits += hits
+        recorder.cache_misses += misses
+
+
+@contextmanager
+def rendering():
+    """Время отрисовки; вложенные шаблоны не учитываются дважды."""
+
+    recorder = current()
+    if recorder is None:
+        yield
+        return
+
+    recorder.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.template_depth -= 1
+        if not recorder.template_depth:
+            recorder.template_ms += (time.perf_counter() - started) * 1000
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, fraction):
+        """
+        Верхняя граница корзины, в которую попадает квантиль;
+        None, если замеров нет или квантиль за последней границей.
+        """
+
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return BUCKETS[index] if index < len(BUCKETS) else None
+        return None
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 3) if self.count else None,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': {
+                str(bound): count
+                for bound, count in zip(BUCKETS + ('inf',), self.counts)
+            },
+        }
+
+
+class ViewStats:
+    HISTOGRAMS = ('total_ms', 'db_ms', 'template_ms')
+    COUNTERS = ('db_queries', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.histograms = {name: Histogram() for name in self.HISTOGRAMS}
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+
+    def add(self, values, status):
+        self.requests += 1
+        if status >= 500:
+            self.errors += 1
+        for name, histogram in self.histograms.items():
+            histogram.add(values[name])
+        for name in self.counters:
+            self.counters[name] += values[name]
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            **{name: histogram.as_dict()
+               for name, histogram in self.histograms.items()},
+            **{f'{name}_per_request': round(total / self.requests, 3)
+               for name, total in self.counters.items()},
+        }
+
+
+_views = {}
+_lock = threading.Lock()
+
+
+def add(name, values, status):
+    with _lock:
+        if name not in _views:
+            _views[name] = ViewStats()
+        _views[name].add(values, status)
+
+
+def snapshot():
+    """Накопленная статистика процесса по именам URL."""
+
+    with _lock:
+        return {name: stats.as_dict()
+                for name, stats in sorted(_views.items())}
+
+
+def reset():
+    with _lock:
+        _views.clear()
@@ -0,0 +1,114 @@
+import logging
+import random
+from contextlib import ExitStack
+
+from django.db import connections
+
+from . import metrics, profiling, replicas
+
+logger = logging.getLogger('core.metrics')
+
+
+def server_timing(values):
+    return ', '.join((
+        f'db;dur={values["db_ms"]:.1f};desc="{values["db_queries"]} SQL"',
+        f'cache;desc="{values["cache_hits"]} hit, '
+        f'{values["cache_misses"]} miss"',
+        f'tpl;dur={values["template_ms"]:.1f}',
+        f'total;dur={values["total_ms"]:.1f}',
+    ))
+
+
+class MetricsMiddleware:
+    """
+    Замеряет каждый запрос: добавляет заголовок Server-Timing, пишет
+    строку в логгер core.metrics и копит гистограммы по имени URL,
+    см. core.metrics. Стоит первым в MIDDLEWARE, чтобы учитывать
+    запросы к базе и кешу остальных middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with metrics.recording() as recorder, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        values = recorder.as_dict()
+        match = getattr(request, 'resolver_match', None)
+        name = match.view_name if match else 'unresolved'
+        metrics.add(name, values, response.status_code)
+
+        response['Server-Timing'] = server_timing(values)
+        logger.info(
+            'view=%s method=%s path=%s status=%s total_ms=%.1f '
+            'db_queries=%d db_ms=%.1f cache_hits=%d cache_misses=%d '
+            'template_ms=%.1f',
+            name, request.method, request.path, response.status_code,
+            values['total_ms'], values['db_queries'], values['db_ms'],
+            values['cache_hits'], values['cache_misses'],
+            values['template_ms'],
+            extra={'view': name, 'status': response.status_code, **values},
+        )
+        return response
+
+
+class ReplicaMiddleware:
+    """
+    Отправляет чтения безопасных запросов на реплику, а после POST
+    или записи ставит cookie, по которому следующие запросы читатель
+    делает с основной базы и видит свои изменения, см. core.replicas.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with replicas.reading(replicas.choose(request)) as state:
+            response = self.get_response(request)
+
+        if replicas.available() and (
+                state.wrote or request.method not in ('GET', 'HEAD')):
+            response.set_cookie(replicas.PIN_COOKIE, '1',
+                                max_age=replicas.pin_seconds(),
+                                httponly=True)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует представление и отрисовку шаблона по запросу staff
+    с токеном или по выборке PROFILING_SAMPLE_RATE, см. core.profiling.
+    Имя сохраненного профиля возвращается в заголовке X-Profile-Id.
+    Стоит после AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def requested(self, request):
+        value = (request.GET.get('profile')
+                 or request.META.get('HTTP_X_PROFILE'))
+        if value and request.user.is_staff:
+            return profiling.valid_token(value)
+        rate = profiling.option('SAMPLE_RATE', 0)
+        return bool(rate) and random.random() < rate
+
+    def __call__(self, request):
+        if not self.requested(request):
+            return self.get_response(request)
+
+        profiler = profiling.profiler()
+        profiler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+
+        match = getattr(request, 'resolver_match', None)
+        name = profiling.save(
+            profiler, match.view_name if match else 'unresolved')
+        response['X-Profile-Id'] = name
+        return response
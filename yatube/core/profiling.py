@@ -0,0 +1,175 @@
+"""
+Профилирование отдельных запросов в продакшене.
+
+Запрос профилируется, если staff-пользователь передал подписанный
+токен (?profile=<токен> или заголовок X-Profile) или если он попал
+в случайную выборку PROFILING_SAMPLE_RATE. Сэмплер раз в
+PROFILING_INTERVAL секунд снимает стек потока запроса и пишет
+свернутые стеки (формат flamegraph.pl и speedscope) в .collapsed;
+движок 'cprofile' вместо этого сохраняет .prof для pstats и snakeviz.
+Каталог PROFILING_DIR ограничен по числу файлов и общему размеру.
+"""
+
+import cProfile
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+SALT = 'core.profiling'
+NAME = re.compile(r'^[\w.-]+\.(collapsed|prof)$')
+
+
+def option(name, default):
+    return getattr(settings, f'PROFILING_{name}', default)
+
+
+def directory():
+    return option('DIR', os.path.join(settings.BASE_DIR, 'profiles'))
+
+
+def token():
+    """Токен, включающий профилирование запроса staff-пользователя."""
+
+    return signing.TimestampSigner(salt=SALT).sign('profile')
+
+
+def valid_token(value):
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(
+            value, max_age=option('TOKEN_MAX_AGE', 24 * 3600))
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def label(code):
+    """Имя кадра для свернутого стека: функция и путь от корня проекта."""
+
+    path = code.co_filename
+    if path.startswith(settings.BASE_DIR):
+        path = os.path.relpath(path, settings.BASE_DIR)
+    elif 'site-packages' in path:
+        path = path.rsplit('site-packages' + os.sep, 1)[1]
+    return f'{code.co_name} ({path}:{code.co_firstlineno})'
+
+
+class Sampler:
+    """Статистический профайлер одного потока."""
+
+    extension = 'collapsed'
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def start(self):
+        self.thread_id = threading.get_ident()
+        # кадры выше вызвавшего start (сервер, middleware) не нужны
+        self.root = sys._getframe(1)
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root:
+                stack.append(label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as stream:
+            for stack, count in self.stacks.most_common():
+                stream.write(f'{stack} {count}\n')
+
+
+class Profiler:
+    extension = 'prof'
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+def profiler():
+    if option('ENGINE', 'sample') == 'cprofile':
+        return Profiler()
+    return Sampler(option('INTERVAL', 0.001))
+
+
+def save(profiler, view_name):
+    """Сохраняет профиль и возвращает имя файла."""
+
+    path = directory()
+    os.makedirs(path, exist_ok=True)
+    view_name = re.sub(r'[^\w.-]', '_', view_name)
+    name = (f'{time.strftime("%Y%m%d-%H%M%S")}-{view_name}-'
+            f'{secrets.token_hex(4)}.{profiler.extension}')
+    profiler.dump(os.path.join(path, name))
+    prune()
+    return name
+
+
+def profiles():
+    """Сохраненные профили, новые первыми."""
+
+    path = directory()
+    try:
+        names = [name for name in os.listdir(path) if NAME.match(name)]
+    except FileNotFoundError:
+        return []
+
+    entries = []
+    for name in names:
+        stat = os.stat(os.path.join(path, name))
+        entries.append({'name': name, 'size': stat.st_size,
+                        'modified': stat.st_mtime})
+    entries.sort(key=lambda entry: entry['modified'], reverse=True)
+    return entries
+
+
+def prune():
+    """Удаляет старые профили сверх PROFILING_MAX_FILES и MAX_BYTES."""
+
+    max_files = option('MAX_FILES', 200)
+    max_bytes = option('MAX_BYTES', 50 * 1024 ** 2)
+
+    total = 0
+    for index, entry in enumerate(profiles()):
+        total += entry['size']
+        if index >= max_files or total > max_bytes:
+            try:
+                os.remove(os.path.join(directory(), entry['name']))
+            except FileNotFoundError:
+                pass
+
+
+def path(name):
+    """Путь к профилю по имени; None для чужих и несуществующих имен."""
+
+    if not NAME.match(name):
+        return None
+    full = os.path.join(directory(), name)
+    return full if os.path.isfile(full) else None
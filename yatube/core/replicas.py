@@ -0,0 +1,160 @@
+"""
+Чтение с реплик: ReplicaRouter отправляет чтения безопасных запросов
+(GET, HEAD) на одну из реплик REPLICA_DATABASES, а все записи - на
+основную базу.
+
+Реплика отстает от основной базы, поэтому читатель видит свои записи
+так: запрос с POST и любой запрос, который что-то записал, целиком
+читает основную базу, а ReplicaMiddleware ставит cookie PIN_COOKIE на
+REPLICA_PIN_SECONDS, и следующие запросы этого браузера тоже читают
+основную базу. Вне запросов (команды, фоновые потоки миниатюр) чтение
+всегда идет с основной базы.
+
+Локально реплики - SQLite-файлы, которые копирует команда
+sync_replicas: она заменяет настоящую репликацию.
+
+Кеши лент и страниц кладут прочитанное в ключи с source(): основная
+база и каждая реплика пишут в свои ключи, так что читатель основной
+базы не получит страницу, собранную на отстающей реплике. Ключи
+реплики включают метку ее последней синхронизации, и прочитанное
+с нее живет в кеше не дольше, чем реплика отстает.
+"""
+
+import random
+import secrets
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'primary_pin'
+
+_local = threading.local()
+
+
+def aliases():
+    return list(getattr(settings, 'REPLICA_DATABASES', ()))
+
+
+def available():
+    """
+    Реплики с собственным файлом. В тестах реплики - зеркала default
+    с тем же файлом, и чтение идет через основное соединение, чтобы
+    видеть данные из транзакции теста.
+    """
+
+    primary = connections.databases[DEFAULT_DB_ALIAS]['NAME']
+    return [alias for alias in aliases()
+            if connections.databases[alias]['NAME'] != primary]
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+
+class State:
+    def __init__(self, alias):
+        self.alias = alias
+        self.wrote = False
+
+
+def current():
+    """Состояние текущего запроса или None вне запроса."""
+
+    return getattr(_local, 'state', None)
+
+
+@contextmanager
+def reading(alias):
+    """Чтения внутри блока идут на alias (None - основная база)."""
+
+    state = State(alias)
+    previous, _local.state = current(), state
+    try:
+        yield state
+    finally:
+        _local.state = previous
+
+
+def reads_replica():
+    """Псевдоним реплики, с которой сейчас идут чтения, или None."""
+
+    state = current()
+    if state is not None and state.alias and not state.wrote:
+        return state.alias
+    return None
+
+
+def _synced_key(alias):
+    return f'replicas:synced:{alias}'
+
+
+def source():
+    """
+    Метка данных, которые сейчас читаются, для ключей кеша: псевдоним
+    основной базы или реплики вместе с меткой последней синхронизации.
+    """
+
+    alias = reads_replica()
+    if alias is None:
+        return DEFAULT_DB_ALIAS
+    key = _synced_key(alias)
+    synced = cache.get(key)
+    if synced is None:
+        cache.add(key, secrets.token_hex(4), None)
+        synced = cache.get(key)
+    return f'{alias}@{synced}'
+
+
+def choose(request):
+    """Реплика для запроса или None, если он читает основную базу."""
+
+    replicas = available()
+    if (not replicas or request.method not in ('GET', 'HEAD')
+            or PIN_COOKIE in request.COOKIES):
+        return None
+    return random.choice(replicas)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return reads_replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = current()
+        if state is not None:
+            # после записи запрос читает только основную базу
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # на всех псевдонимах одни и те же данные
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # схема попадает на реплики вместе с данными, см. sync
+        return db == DEFAULT_DB_ALIAS
+
+
+def copy(source, target):
+    """
+    Копирует SQLite-базу source в target через backup API: копия
+    согласована, а читатели target ждут только на время записи страниц,
+    не теряя открытых соединений.
+    """
+
+    with closing(sqlite3.connect(source)) as primary, \
+            closing(sqlite3.connect(target, timeout=30)) as replica:
+        primary.backup(replica)
+
+
+def sync(alias):
+    """Обновляет реплику alias копией основной базы."""
+
+    copy(connections[DEFAULT_DB_ALIAS].settings_dict['NAME'],
+         connections[alias].settings_dict['NAME'])
+    # прочитанное с прежней копии перестает читаться из кеша
+    cache.set(_synced_key(alias), secrets.token_hex(4), None)
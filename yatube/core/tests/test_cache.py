@@ -0,0 +1,140 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache import SQLiteCache
+from posts.models import Post
+
+
+User = get_user_model()
+
+
+def incr_many(path, times):
+    backend = SQLiteCache(path, {})
+    for _ in range(times):
+        backend.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'cache.sqlite3')
+        self.cache = self.worker()
+
+    def worker(self, **params):
+        """Отдельный экземпляр бэкенда, как в другом воркере."""
+
+        return SQLiteCache(self.path, params)
+
+    def test_get_set_delete(self):
+        self.cache.set('key', {'value': [1, 2]})
+        self.cache.set_many({'a': 1, 'b': 2})
+
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2]})
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']),
+                         {'a': 1, 'b': 2})
+
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+
+    def test_expiry(self):
+        self.cache.set('short', 1, 0.05)
+        self.cache.set('forever', 1, None)
+        self.cache.set('skipped', 1, 0)
+        time.sleep(0.1)
+
+        self.assertFalse(self.cache.has_key('short'))
+        self.assertTrue(self.cache.has_key('forever'))
+        self.assertFalse(self.cache.has_key('skipped'))
+        self.assertTrue(self.cache.add('short', 2))
+
+    def test_workers_share_entries(self):
+        """Запись и сброс в одном воркере видны в другом."""
+
+        other = self.worker()
+        self.cache.set('key', 'value')
+        self.assertEqual(other.get('key'), 'value')
+
+        self.assertFalse(other.add('key', 'other'))
+        other.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_prefix_and_version(self):
+        site = self.worker(KEY_PREFIX='site', VERSION=2)
+        site.set('key', 'new')
+        self.cache.set('key', 'other site')
+
+        self.assertEqual(site.get('key'), 'new')
+        self.assertIsNone(site.get('key', version=1))
+        self.assertEqual(self.cache.get('key'), 'other site')
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0, None)
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=incr_many, args=(self.path, 50))
+                     for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        self.assertEqual(self.cache.get('counter'), 200)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_cull(self):
+        backend = self.worker(OPTIONS={'MAX_ENTRIES': 50,
+                                       'CULL_FREQUENCY': 2})
+        for i in range(150):
+            backend.set(f'key{i}', i)
+
+        self.assertLessEqual(
+            len(backend.get_many(f'key{i}' for i in range(150))), 100)
+        self.assertEqual(backend.get('key149'), 149)
+
+
+class SharedCacheViewTests(TestCase):
+    """Кеши постов работают поверх общего кеша так же, как в памяти."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ivan')
+        Post.objects.create(text='Тестовый текст', author=cls.author)
+
+    def setUp(self):
+        directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.settings = override_settings(CACHES={'default': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+            'KEY_PREFIX': 'yatube',
+        }})
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        self.guest_client = Client()
+
+    def test_page_cache_and_invalidation(self):
+        address = reverse('posts:index')
+        self.guest_client.get(address)
+
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(address)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertIsInstance(caches['default'], SQLiteCache)
+
+        Post.objects.create(text='Свежий пост', author=self.author)
+
+        response = self.guest_client.get(address)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Свежий пост')
@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post
+
+
+User = get_user_model()
+
+
+class HistogramTests(TestCase):
+    def test_quantiles_are_bucket_bounds(self):
+        histogram = metrics.Histogram()
+        for value in (0.5, 3, 4, 7, 40):
+            histogram.add(value)
+
+        self.assertEqual(histogram.quantile(0.5), 5)
+        self.assertEqual(histogram.quantile(0.99), 50)
+        self.assertEqual(histogram.as_dict()['buckets']['5'], 2)
+
+    def test_overflow_and_empty(self):
+        histogram = metrics.Histogram()
+        self.assertIsNone(histogram.quantile(0.5))
+
+        histogram.add(60000)
+        self.assertIsNone(histogram.quantile(0.5))
+        self.assertEqual(histogram.as_dict()['buckets']['inf'], 1)
+
+
+class MiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ivan')
+        cls.admin = User.objects.create_user(username='admin',
+                                             is_staff=True)
+        Post.objects.create(text='Тестовый текст', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.guest_client = Client()
+
+    def test_server_timing_header(self):
+        """Ответ несет Server-Timing с базой, кешем, шаблонами и итогом."""
+
+        response = self.guest_client.get(reverse('posts:index'))
+
+        timing = response['Server-Timing']
+        for name in ('db;dur=', 'cache;desc=', 'tpl;dur=', 'total;dur='):
+            with self.subTest(name=name):
+                self.assertIn(name, timing)
+
+    def test_log_line(self):
+        with self.assertLogs('core.metrics', 'INFO') as logs:
+            self.guest_client.get(reverse('posts:index'))
+
+        record = logs.records[0]
+        self.assertEqual(record.view, 'posts:index')
+        self.assertEqual(record.status, 200)
+        self.assertGreater(record.db_queries, 0)
+        self.assertIn('view=posts:index', record.getMessage())
+
+    @override_settings(POSTS_PAGE_CACHE_TIMEOUT=0)
+    def test_cache_hits_and_misses(self):
+        """Второй запрос ленты берет страницу из кеша."""
+
+        address = reverse('posts:index')
+        with self.assertLogs('core.metrics', 'INFO') as logs:
+            self.guest_client.get(address)
+            self.guest_client.get(address)
+
+        first, second = logs.records
+        self.assertGreater(first.cache_misses, 0)
+        self.assertGreater(second.cache_hits, first.cache_hits)
+        self.assertLess(second.db_queries, first.db_queries)
+
+    def test_histograms_by_url_name(self):
+        self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': 'ivan'}))
+        self.guest_client.get('/no/such/page/at/all/')
+
+        stats = metrics.snapshot()
+
+        self.assertEqual(stats['posts:index']['requests'], 2)
+        self.assertEqual(stats['posts:index']['total_ms']['count'], 2)
+        self.assertGreater(stats['posts:index']['template_ms']['mean'], 0)
+        self.assertEqual(stats['posts:profile']['requests'], 1)
+        self.assertEqual(stats['unresolved']['requests'], 1)
+
+    def test_stats_endpoint_is_staff_only(self):
+        address = reverse('core:metrics')
+
+        response = self.guest_client.get(address)
+        self.assertEqual(response.status_code, 302)
+
+        admin_client = Client()
+        admin_client.force_login(self.admin)
+        self.guest_client.get(reverse('posts:index'))
+        response = admin_client.get(address)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['posts:index']['requests'], 1)
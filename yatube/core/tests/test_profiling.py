@@ -0,0 +1,127 @@
+import os
+import pstats
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import profiling
+
+
+User = get_user_model()
+
+
+def busy(seconds):
+    finish = time.perf_counter() + seconds
+    while time.perf_counter() < finish:
+        pass
+
+
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_user(username='admin',
+                                             is_staff=True)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.settings = override_settings(PROFILING_DIR=self.directory)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+        self.guest_client = Client()
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def test_staff_token_profiles_request(self):
+        """Staff с токеном получает профиль запроса."""
+
+        address = reverse('posts:index')
+        response = self.admin_client.get(
+            address, {'profile': profiling.token()})
+
+        name = response['X-Profile-Id']
+        self.assertIn('posts_index', name)
+        self.assertTrue(name.endswith('.collapsed'))
+        self.assertIsNotNone(profiling.path(name))
+
+        response = self.admin_client.get(
+            address, HTTP_X_PROFILE=profiling.token())
+        self.assertIn('X-Profile-Id', response)
+
+    def test_token_requires_staff_and_signature(self):
+        address = reverse('posts:index')
+
+        response = self.guest_client.get(
+            address, {'profile': profiling.token()})
+        self.assertNotIn('X-Profile-Id', response)
+
+        response = self.admin_client.get(address, {'profile': 'forged'})
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(profiling.profiles(), [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampling_rate(self):
+        response = self.guest_client.get(reverse('posts:index'))
+
+        self.assertIn('X-Profile-Id', response)
+
+    def test_sampler_collapsed_stacks(self):
+        """Свернутые стеки начинаются ниже вызвавшего start кадра."""
+
+        sampler = profiling.Sampler(0.001)
+        sampler.start()
+        busy(0.05)
+        sampler.stop()
+        name = profiling.save(sampler, 'test')
+
+        with open(profiling.path(name), encoding='utf-8') as stream:
+            lines = stream.read().splitlines()
+
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertTrue(stack.startswith('busy (core/tests/'))
+        self.assertGreater(int(count), 0)
+
+    @override_settings(PROFILING_ENGINE='cprofile')
+    def test_cprofile_engine(self):
+        response = self.admin_client.get(
+            reverse('posts:index'), {'profile': profiling.token()})
+
+        name = response['X-Profile-Id']
+        self.assertTrue(name.endswith('.prof'))
+        stats = pstats.Stats(profiling.path(name))
+        self.assertTrue(any(
+            function == 'index' for _, _, function in stats.stats))
+
+    @override_settings(PROFILING_MAX_FILES=3)
+    def test_directory_is_bounded(self):
+        for number in range(5):
+            profiling.save(profiling.Sampler(0.001), f'view{number}')
+
+        self.assertEqual(len(os.listdir(self.directory)), 3)
+
+    def test_export_views(self):
+        name = profiling.save(profiling.Sampler(0.001), 'test')
+        address = reverse('core:profile', kwargs={'name': name})
+
+        response = self.guest_client.get(address)
+        self.assertEqual(response.status_code, 302)
+
+        response = self.admin_client.get(reverse('core:profiles'))
+        self.assertTrue(profiling.valid_token(response.json()['token']))
+        self.assertEqual(response.json()['profiles'][0]['name'], name)
+
+        response = self.admin_client.get(address)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+        response = self.admin_client.get(
+            reverse('core:profile', kwargs={'name': '..prof'}))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,152 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from contextlib import closing
+from unittest import mock
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.db import connections
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import replicas
+from core.middleware import ReplicaMiddleware
+from posts.models import Post
+
+router = replicas.ReplicaRouter()
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+class RouterTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # реплика с отдельным файлом; соединение с ней не открывается
+        cls.configured = connections.databases.get('replica1')
+        connections.databases['replica1'] = {
+            **connections.databases['default'],
+            'NAME': os.path.join(settings.BASE_DIR, 'db.replica1.sqlite3'),
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.configured is None:
+            del connections.databases['replica1']
+        else:
+            connections.databases['replica1'] = cls.configured
+        super().tearDownClass()
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def handle(self, request, write=False):
+        """Ответ middleware и база, с которой читало представление."""
+
+        used = []
+
+        def view(request):
+            if write:
+                router.db_for_write(Post)
+            used.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        response = ReplicaMiddleware(view)(request)
+        return response, used[0]
+
+    def test_outside_request_reads_primary(self):
+        self.assertEqual(router.db_for_read(Post), 'default')
+        self.assertEqual(router.db_for_write(Post), 'default')
+
+    def test_get_reads_replica(self):
+        response, alias = self.handle(self.factory.get('/'))
+
+        self.assertEqual(alias, 'replica1')
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+    def test_post_reads_primary_and_pins(self):
+        response, alias = self.handle(self.factory.post('/'))
+
+        self.assertEqual(alias, 'default')
+        cookie = response.cookies[replicas.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], replicas.pin_seconds())
+
+    def test_pinned_reader_reads_primary(self):
+        request = self.factory.get('/')
+        request.COOKIES[replicas.PIN_COOKIE] = '1'
+
+        self.assertEqual(self.handle(request)[1], 'default')
+
+    def test_write_in_get_switches_to_primary(self):
+        """После записи запрос читает то, что сам записал."""
+
+        response, alias = self.handle(self.factory.get('/'), write=True)
+
+        self.assertEqual(alias, 'default')
+        self.assertIn(replicas.PIN_COOKIE, response.cookies)
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_without_replicas(self):
+        response, alias = self.handle(self.factory.post('/'))
+
+        self.assertEqual(alias, 'default')
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+    def test_test_mirror_reads_primary(self):
+        """Зеркало с файлом основной базы не считается репликой."""
+
+        mirror = connections.databases['replica1']
+        connections.databases['replica1'] = connections.databases['default']
+        self.addCleanup(connections.databases.__setitem__, 'replica1', mirror)
+
+        response, alias = self.handle(self.factory.post('/'))
+
+        self.assertEqual(alias, 'default')
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+    def test_cache_source(self):
+        """Прочитанное с реплики кешируется в свои ключи до синхронизации."""
+
+        with replicas.reading(None):
+            self.assertEqual(replicas.source(), 'default')
+
+        with replicas.reading('replica1') as state:
+            source = replicas.source()
+            self.assertTrue(source.startswith('replica1@'))
+            self.assertEqual(replicas.source(), source)
+
+            with mock.patch.object(replicas, 'copy'):
+                replicas.sync('replica1')
+            self.assertNotEqual(replicas.source(), source)
+
+            state.wrote = True
+            self.assertEqual(replicas.source(), 'default')
+
+    def test_migrations_only_on_primary(self):
+        self.assertTrue(router.allow_migrate('default', 'posts'))
+        self.assertFalse(router.allow_migrate('replica1', 'posts'))
+
+
+class CopyTests(SimpleTestCase):
+    def test_copy_updates_open_replica(self):
+        directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        source = os.path.join(directory, 'primary.sqlite3')
+        target = os.path.join(directory, 'replica.sqlite3')
+
+        with closing(sqlite3.connect(source)) as primary, \
+                closing(sqlite3.connect(target)) as replica:
+            primary.execute('CREATE TABLE post (text TEXT)')
+            primary.execute("INSERT INTO post VALUES ('первый')")
+            primary.commit()
+            replicas.copy(source, target)
+            self.assertEqual(
+                replica.execute('SELECT COUNT(*) FROM post').fetchone(), (1,))
+
+            primary.execute("INSERT INTO post VALUES ('второй')")
+            primary.commit()
+            self.assertEqual(
+                replica.execute('SELECT COUNT(*) FROM post').fetchone(), (1,))
+            replicas.copy(source, target)
+            self.assertEqual(
+                replica.execute('SELECT COUNT(*) FROM post').fetchone(), (2,))
@@ -0,0 +1,54 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.db import connections
+from django.test import SimpleTestCase, override_settings
+
+from core.backends.sqlite3.base import DatabaseWrapper
+
+
+class SQLiteBackendTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'db.sqlite3')
+        self.database = DatabaseWrapper(
+            {**connections.databases['default'], 'NAME': self.path},
+            alias='file')
+        self.addCleanup(self.database.close)
+
+    def pragma(self, name):
+        with self.database.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_from_settings(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'),
+                         settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(self.pragma('cache_size'),
+                         settings.SQLITE_PRAGMAS['cache_size'])
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234})
+    def test_pragmas_apply_to_new_connections(self):
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
+
+    def test_atomic_takes_write_lock_at_begin(self):
+        """BEGIN IMMEDIATE: чужой писатель ждет, даже пока мы только читаем."""
+
+        with self.database.cursor() as cursor:
+            cursor.execute('CREATE TABLE post (text TEXT)')
+
+        other = sqlite3.connect(self.path, timeout=0)
+        self.addCleanup(other.close)
+        # так atomic() начинает транзакцию в режиме autocommit
+        self.database._start_transaction_under_autocommit()
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                other.execute("INSERT INTO post VALUES ('чужой')")
+        finally:
+            self.database.connection.rollback()
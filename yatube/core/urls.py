@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import views
+
+
+app_name = 'core'
+
+urlpatterns = [
+    path('metrics/', views.metrics_stats, name='metrics'),
+    path('profiles/', views.profile_list, name='profiles'),
+    path('profiles/<str:name>/', views.profile_detail, name='profile'),
+]
@@ -0,0 +1,31 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, JsonResponse
+
+from . import metrics, profiling
+
+
+@staff_member_required
+def metrics_stats(request):
+    return JsonResponse(metrics.snapshot())
+
+
+@staff_member_required
+def profile_list(request):
+    """Токен для ?profile= и список сохраненных профилей."""
+
+    return JsonResponse({
+        'token': profiling.token(),
+        'profiles': profiling.profiles(),
+    })
+
+
+@staff_member_required
+def profile_detail(request, name):
+    path = profiling.path(name)
+    if path is None:
+        raise Http404
+    if name.endswith('.collapsed'):
+        return FileResponse(open(path, 'rb'), as_attachment=True,
+                            content_type='text/plain; charset=utf-8')
+    return FileResponse(open(path, 'rb'), as_attachment=True,
+                        content_type='application/octet-stream')
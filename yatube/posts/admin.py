@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Post, Group, Follow, Comment
+from .models import Post, Group, Follow, Comment, Like
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -24,7 +24,12 @@ class CommentAdmin(admin.ModelAdmin):
     list_display = ('post_id', 'post', 'author', 'text')
 
 
+class LikeAdmin(admin.ModelAdmin):
+    list_display = ('user', 'post', 'created')
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Follow, FollowAdmin)
 admin.site.register(Comment, CommentAdmin)
+admin.site.register(Like, LikeAdmin)
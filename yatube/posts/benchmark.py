@@ -0,0 +1,277 @@
+"""
+Нагрузочные замеры представлений posts через тестовый клиент:
+задержка (перцентили), число запросов к БД и пик памяти на запрос.
+Результаты сравниваются с сохраненным JSON-эталоном.
+
+measure_writes отдельно замеряет пропускную способность записи
+add_comment и new_post несколькими потоками-писателями при разных
+настройках SQLite (см. core.backends.sqlite3).
+"""
+
+import gc
+import statistics
+import threading
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Group, Post, User
+from .seed import Seeder
+
+# метрики, по которым ищутся регрессии, и допуск на шум в абсолютных
+# единицах: разница меньше него не считается регрессией. Перцентили
+# записываются, но слишком шумны для автоматической проверки
+METRICS = {
+    'best_ms': 0.5,
+    'queries': 0,
+    'peak_kb': 64,
+}
+
+ROUNDS = 3
+
+# SQLite и Django по умолчанию: журнал отката, fsync на каждый коммит,
+# отложенный BEGIN и новое соединение на каждый запрос
+DEFAULT_SQLITE = {
+    'pragmas': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+    'transaction_mode': '',
+    'conn_max_age': 0,
+}
+
+WRITE_VIEWS = ('add_comment', 'new_post')
+
+# замеры сбрасывают кеш и наполняют его страницами синтетической базы,
+# поэтому работают со своим кешем в памяти, а не с общим кешем сайта
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.LocMemCache',
+        'LOCATION': 'benchmark',
+        'KEY_PREFIX': 'benchmark',
+    },
+}
+
+
+def isolated_cache():
+    return override_settings(CACHES=CACHES)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(round(fraction * (len(ordered) - 1)), len(ordered) - 1)
+    return ordered[index]
+
+
+def seed_scale(posts, seed=None):
+    """Данные для замера: на десять постов один пользователь."""
+
+    users = max(10, posts // 10)
+    Seeder(seed=seed).seed(users=users, groups=5, posts=posts,
+                           comments=posts, follows=20)
+
+
+def targets():
+    """
+    Адреса замеров на текущих данных: лента самого активного читателя,
+    профиль самого популярного автора и его самый обсуждаемый пост.
+    """
+
+    reader = User.objects.annotate(
+        following_total=Count('follower')).order_by(
+        '-following_total').first()
+    author = User.objects.annotate(
+        followers_total=Count('following')).order_by(
+        '-followers_total').first()
+    post = Post.objects.filter(author=author).order_by(
+        '-comment_count').first() or Post.objects.first()
+    group = Group.objects.annotate(
+        posts_total=Count('posts')).order_by('-posts_total').first()
+
+    post_address = {'username': post.author.username, 'post_id': post.id}
+    return reader, {
+        'index': ('get', reverse('posts:index'), None),
+        'group_posts': ('get', reverse(
+            'posts:group_list', kwargs={'slug': group.slug}), None),
+        'profile': ('get', reverse(
+            'posts:profile', kwargs={'username': author.username}), None),
+        'post_view': ('get', reverse('posts:post', kwargs=post_address),
+                      None),
+        'follow_index': ('get', reverse('posts:follow_index'), None),
+        'add_comment': ('post', reverse(
+            'posts:add_comment', kwargs=post_address),
+            {'text': 'Комментарий из замера'}),
+        'new_post': ('post', reverse('posts:new_post'),
+                     {'text': 'Пост из замера'}),
+    }
+
+
+def measure(client, method, address, data, repeat, warm=False):
+    def request():
+        if not warm:
+            cache.clear()
+        response = getattr(client, method)(address, data)
+        if response.status_code >= 400:
+            raise AssertionError(f'{address}: {response.status_code}')
+
+    request()
+
+    # сборщик мусора не должен срабатывать посреди замера; повторы
+    # разбиты на раунды, и лучшая из медиан раундов меньше всего
+    # зависит от соседней нагрузки на машину
+    timings, medians = [], []
+    for _ in range(ROUNDS):
+        gc.collect()
+        gc.disable()
+        try:
+            rounds = []
+            for _ in range(max(1, repeat // ROUNDS)):
+                started = time.perf_counter()
+                request()
+                rounds.append((time.perf_counter() - started) * 1000)
+        finally:
+            gc.enable()
+        timings += rounds
+        medians.append(statistics.median(rounds))
+
+    with CaptureQueriesContext(connection) as captured:
+        request()
+    # captured_queries читает connection.queries, который очищается
+    # в начале каждого запроса, поэтому число снимается сразу
+    queries = len(captured.captured_queries)
+
+    tracemalloc.start()
+    try:
+        request()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'p50_ms': round(statistics.median(timings), 3),
+        'p90_ms': round(percentile(timings, 0.9), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'best_ms': round(min(medians), 3),
+        'queries': queries,
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run(repeat=30, warm=False, views=None, log=None):
+    """Замеряет все представления на данных, уже лежащих в базе."""
+
+    log = log or (lambda message: None)
+    reader, addresses = targets()
+    client = Client()
+    client.force_login(reader)
+
+    results = {}
+    for name, (method, address, data) in addresses.items():
+        if views and name not in views:
+            continue
+        results[name] = measure(client, method, address, data,
+                                repeat, warm)
+        log(f'{name:>14}: {results[name]}')
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Регрессии относительно эталона: метрика выросла больше чем
+    на threshold (доля) и больше допуска на шум. Число запросов
+    детерминировано, поэтому любой его рост - регрессия.
+    """
+
+    regressions = []
+    for scale, views in results.items():
+        for view, metrics in views.items():
+            base = baseline.get(scale, {}).get(view)
+            if not base:
+                continue
+            for metric, slack in METRICS.items():
+                old, new = base.get(metric), metrics.get(metric)
+                if old is None or new is None:
+                    continue
+                limit = old if metric == 'queries' else old * (1 + threshold)
+                if new > limit and new - old > slack:
+                    regressions.append(
+                        f'{scale}/{view}: {metric} {old} -> {new}')
+    return regressions
+
+
+def sqlite_profiles():
+    """Настройки SQLite до и после настройки из settings."""
+
+    return {
+        'default': DEFAULT_SQLITE,
+        'tuned': {
+            'pragmas': settings.SQLITE_PRAGMAS,
+            'transaction_mode': settings.SQLITE_TRANSACTION_MODE,
+            'conn_max_age': settings.DATABASES[DEFAULT_DB_ALIAS].get(
+                'CONN_MAX_AGE', 0),
+        },
+    }
+
+
+def measure_writes(profile, writers=4, requests=50):
+    """
+    `writers` потоков по очереди отправляют add_comment и new_post,
+    каждый своим клиентом и своим соединением с базой. Ошибка запроса
+    (например, "database is locked") считается, но замер не прерывает.
+    """
+
+    reader, addresses = targets()
+    database = connections.databases[DEFAULT_DB_ALIAS]
+    conn_max_age = database.get('CONN_MAX_AGE', 0)
+    timings, errors = [], []
+    lock = threading.Lock()
+
+    def write():
+        client = Client()
+        client.force_login(reader)
+        try:
+            for number in range(requests):
+                method, address, data = addresses[
+                    WRITE_VIEWS[number % len(WRITE_VIEWS)]]
+                started = time.perf_counter()
+                try:
+                    response = getattr(client, method)(address, data)
+                    failed = response.status_code >= 400
+                except Exception:
+                    failed = True
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    (errors if failed else timings).append(elapsed)
+        finally:
+            connection.close()
+
+    # новые соединения должны открыться уже с настройками профиля
+    connections.close_all()
+    database['CONN_MAX_AGE'] = profile['conn_max_age']
+    try:
+        with override_settings(
+                SQLITE_PRAGMAS=profile['pragmas'],
+                SQLITE_TRANSACTION_MODE=profile['transaction_mode']):
+            threads = [threading.Thread(target=write)
+                       for _ in range(writers)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+    finally:
+        database['CONN_MAX_AGE'] = conn_max_age
+        connections.close_all()
+
+    return {
+        'writes_per_s': round(len(timings) / elapsed, 1),
+        'p50_ms': round(statistics.median(timings), 3) if timings else None,
+        'p99_ms': round(percentile(timings, 0.99), 3) if timings else None,
+        'errors': len(errors),
+    }
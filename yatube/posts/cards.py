@@ -0,0 +1,123 @@
+"""
+Кеш отрисованных карточек постов, общий для всех читателей.
+
+Ключ карточки - id поста и его версия, поэтому устаревшие карточки
+не сбрасываются, а просто перестают читаться. Версию поднимает любое
+изменение, видимое в карточке: правка поста, комментарий, готовая
+миниатюра, переименование группы или автора, см. posts.signals.
+
+Кнопка «Редактировать» в кеше хранится у всех карточек внутри
+маркеров <!--edit:id автора-->...<!--/edit--> и после чтения из кеша
+оставляется только автору поста. Маркер <!--like:id поста:адрес-->
+заменяется кнопкой лайка с числом лайков, см. posts.likes.
+"""
+
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from . import feed_cache, likes
+from .models import Post
+
+TEMPLATE = 'includes/post_item.html'
+
+EDIT = re.compile(r'<!--edit:(\d+)-->(.*?)<!--/edit-->', re.DOTALL)
+
+LIKE = re.compile(r'<!--like:(\d+):([^>]*?)-->')
+
+
+def timeout():
+    return getattr(settings, 'POSTS_CARD_TIMEOUT', 24 * 3600)
+
+
+def key(post_id, version, full=False):
+    return f'posts:card:{post_id}:{version}:{"full" if full else "short"}'
+
+
+def bump(**filters):
+    """Поднимает версию карточек постов, подходящих под фильтр."""
+
+    Post.objects.filter(**filters).update(**changed())
+    # страницы лент в кеше помнят версии своих карточек
+    feed_cache.invalidate()
+
+
+def changed():
+    """Поля для UPDATE-а, меняющего видимое в карточке поста."""
+
+    return {'version': F('version') + 1, 'updated_at': timezone.now()}
+
+
+def like_button(url, count, liked, csrf_token):
+    if csrf_token is None:
+        return format_html('<span class="text-muted">&#9829; {}</span>',
+                           count)
+    return format_html(
+        '<form method="post" action="{}" class="d-inline like-form">'
+        '<input type="hidden" name="csrfmiddlewaretoken" value="{}">'
+        '<button type="submit" class="btn btn-sm {}">&#9829; '
+        '<span class="like-count">{}</span></button></form>',
+        url, csrf_token, 'btn-danger' if liked else 'btn-outline-danger',
+        count)
+
+
+def personalize(html, user, csrf_token=None):
+    """
+    Оставляет кнопки редактирования только на карточках автора
+    и подставляет лайки: число всем, кнопку - вошедшим читателям.
+    """
+
+    user_id = str(user.pk) if user is not None and user.pk else None
+    html = EDIT.sub(
+        lambda match: match.group(2) if match.group(1) == user_id else '',
+        html)
+
+    post_ids = [int(post_id) for post_id, _ in LIKE.findall(html)]
+    if not post_ids:
+        return html
+    totals = likes.counts(post_ids)
+    chosen = likes.liked(user, post_ids) if csrf_token else set()
+    return LIKE.sub(
+        lambda match: like_button(
+            match.group(2), totals[int(match.group(1))],
+            int(match.group(1)) in chosen, csrf_token),
+        html)
+
+
+def render(posts, user=None, full=False, csrf_token=None):
+    """
+    Карточки постов одним запросом к кешу. Страницы ленты из
+    posts.feed_cache знают версии постов заранее (page.cards), и при
+    попадании в кеш выборка постов не выполняется вовсе.
+    """
+
+    known = getattr(posts, 'cards', None)
+    objects = None
+    if known is None:
+        objects = {post.pk: post for post in posts}
+        known = [(post.pk, post.version) for post in objects.values()]
+
+    keys = [key(post_id, version, full) for post_id, version in known]
+    found = cache.get_many(keys)
+
+    if len(found) < len(keys):
+        if objects is None:
+            objects = {post.pk: post for post in posts}
+        template = get_template(TEMPLATE)
+        rendered = {
+            card_key: template.render({'post': objects[post_id],
+                                       'post_view': full})
+            for (post_id, _), card_key in zip(known, keys)
+            if card_key not in found and post_id in objects
+        }
+        cache.set_many(rendered, timeout())
+        found.update(rendered)
+
+    html = ''.join(found[card_key] for card_key in keys if card_key in found)
+    return mark_safe(personalize(html, user, csrf_token))
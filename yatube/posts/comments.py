@@ -0,0 +1,104 @@
+"""
+Комментарии к посту отдаются страницами веток по ключу (created, id)
+корневых комментариев: страница поста показывает первую, следующие
+подгружаются по запросу (см. views.post_comments), поэтому размер
+страницы поста ограничен при любом числе комментариев.
+
+Ответы хранятся материализованным путем (Comment.path): все ответы
+веток страницы читаются одним запросом по диапазонам индекса
+(post, path) и раскладываются в дерево за один проход.
+"""
+
+from django.conf import settings
+from django.db.models import CharField, Q, Value
+from django.db.models.functions import Cast, Concat, LPad
+
+from .models import Comment
+from .paginator import CursorPaginator
+
+ORDERING = ('-created', '-id')
+
+FIELDS = ('text', 'created', 'parent', 'path', 'author__username')
+
+# глубже ответы не вкладываются, а становятся соседями родителя;
+# путь такой глубины заведомо помещается в Comment.path
+MAX_DEPTH = 8
+
+# больше любого символа пути (цифры и '/'): верхняя граница диапазона ветки
+PATH_END = '~'
+
+
+def per_page():
+    return getattr(settings, 'COMMENTS_PER_PAGE', 20)
+
+
+def segment(comment_id):
+    return f'{comment_id:010d}/'
+
+
+def depth(comment):
+    """Глубина в ветке: 0 у корневого комментария."""
+
+    return comment.path.count('/') - 1
+
+
+def make_path(comment, parent=None):
+    return (parent.path if parent is not None else '') + segment(comment.pk)
+
+
+def reply_parent(parent):
+    """Комментарий, к которому на самом деле прикрепится ответ."""
+
+    if depth(parent) >= MAX_DEPTH and parent.parent_id:
+        return parent.parent
+    return parent
+
+
+def fill_root_paths():
+    """Пути комментариев, созданных мимо сигналов (bulk_create)."""
+
+    Comment.objects.filter(path='').update(path=Concat(
+        LPad(Cast('id', CharField()), 10, Value('0')), Value('/')))
+
+
+def thread(roots, replies):
+    """
+    Корни в порядке страницы, за каждым - его ответы в порядке обхода
+    в глубину, у каждого комментария - depth для отступа. Сортировка
+    по пути ставит родителя раньше детей, поэтому хватает одного прохода.
+    """
+
+    branches = {}
+    for root in roots:
+        root.depth = 0
+        branches[root.path] = [root]
+    for reply in sorted(replies, key=lambda comment: comment.path):
+        reply.depth = depth(reply)
+        branches[reply.path[:len(segment(0))]].append(reply)
+    return [comment for root in roots for comment in branches[root.path]]
+
+
+def get_page(post_id, cursor=None):
+    """
+    Страница веток: корни по индексу comment_post_root_idx, их ответы -
+    одним запросом по диапазонам путей; авторы приходят теми же
+    запросами. Битый курсор открывает первую страницу.
+    """
+
+    comments = Comment.objects.select_related('author').only(*FIELDS)
+    page = CursorPaginator(comments.filter(post_id=post_id, parent=None),
+                           per_page(), ORDERING).get_page(cursor)
+
+    replies = []
+    if page.object_list:
+        # post_id в каждой ветви OR: так SQLite ищет каждый диапазон
+        # по индексу (post, path), а не перебирает все комментарии поста
+        ranges = Q()
+        for root in page.object_list:
+            ranges |= Q(post_id=post_id, path__gt=root.path,
+                        path__lt=root.path + PATH_END)
+        # без ORDER BY: сортировка по пути в памяти дешевле временного
+        # B-дерева в SQLite
+        replies = comments.filter(ranges).order_by()
+    page.object_list = thread(page.object_list, replies)
+    return page
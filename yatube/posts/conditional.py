@@ -0,0 +1,137 @@
+"""
+Условные GET-запросы для страниц постов и лент: ETag и Last-Modified
+считаются до представления несколькими запросами по индексам,
+и при совпадении отдается 304 без выборки постов и отрисовки.
+
+Last-Modified - самое позднее изменение показанных на странице постов
+(и удаление любого поста, см. feed_cache.deleted_at) или сброс тегов
+страницы в posts.page_cache: так учитываются перенос поста в другое
+сообщество и подписки, меняющие карточку автора. ETag точнее:
+в нем версия кеша лент, счетчики автора и читатель, так как шапка
+и кнопки подписки у каждого свои, а также эпоха лайков и версия
+лайков читателя (см. posts.likes). ETag слабый: токен CSRF в форме
+отличается от отрисовки к отрисовке.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.db.models import Max
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import feed_cache, likes, page_cache
+from .models import Comment, Group, Post, User, UserStats
+
+
+def latest(*values):
+    return max((value for value in values if value), default=None)
+
+
+def _one(queryset):
+    # строка по уникальному ключу: без ORDER BY, который добавил бы first()
+    return next(iter(queryset.order_by()[:1]), None)
+
+
+def _modified(posts):
+    return posts.aggregate(value=Max('updated_at'))['value']
+
+
+def _author_stats(author_id):
+    return UserStats.objects.filter(pk=author_id).values_list(
+        'posts_count', 'followers_count', 'following_count').first()
+
+
+def index(request):
+    # на главной видны все посты, и время их последнего изменения
+    # уже известно кешу лент: страница из кеша обходится без базы
+    return (
+        (feed_cache.version(), feed_cache.page_key(request)),
+        feed_cache.changed_at(),
+    )
+
+
+def group_posts(request, slug):
+    group = _one(Group.objects.filter(slug=slug).values('pk', 'updated_at'))
+    if group is None:
+        return None, None
+    return (
+        (feed_cache.version(), feed_cache.page_key(request)),
+        latest(group['updated_at'],
+               _modified(Post.objects.filter(group_id=group['pk'])),
+               feed_cache.deleted_at(),
+               page_cache.changed_at(page_cache.group_posts(request, slug))),
+    )
+
+
+def profile(request, username):
+    author_id = _one(User.objects.filter(username=username).values_list(
+        'pk', flat=True))
+    if author_id is None:
+        return None, None
+    return (
+        (feed_cache.version(), feed_cache.page_key(request),
+         _author_stats(author_id)),
+        latest(_modified(Post.objects.filter(author_id=author_id)),
+               feed_cache.deleted_at(),
+               page_cache.changed_at(page_cache.profile(request, username))),
+    )
+
+
+def post_view(request, username, post_id):
+    post = _one(Post.objects.filter(
+        pk=post_id, author__username=username).values(
+        'author_id', 'version', 'updated_at'))
+    if post is None:
+        return None, None
+    comments = Comment.objects.filter(post_id=post_id).aggregate(
+        value=Max('updated_at'))['value']
+    return (
+        (post['version'], _author_stats(post['author_id'])),
+        latest(post['updated_at'], comments, page_cache.changed_at(
+            page_cache.post_view(request, username, post_id))),
+    )
+
+
+def _state(request, freshness, args, kwargs):
+    """ETag и Last-Modified считаются один раз на запрос."""
+
+    if not hasattr(request, '_conditional'):
+        parts, modified = freshness(request, *args, **kwargs)
+        etag = None
+        if parts is not None:
+            digest = hashlib.md5(repr((
+                request.user.pk, likes.epoch(),
+                likes.user_version(request.user), parts,
+            )).encode()).hexdigest()
+            etag = f'W/"{digest}"'
+        request._conditional = (etag, modified)
+    return request._conditional
+
+
+def conditional(freshness):
+    """
+    Декоратор представления: condition() с ETag и Last-Modified
+    из freshness(request, ...) -> (части ETag, время изменения).
+    Cache-Control: no-cache заставляет браузер и прокси каждый раз
+    переспрашивать сервер, а не угадывать свежесть по Last-Modified.
+    """
+
+    def etag(request, *args, **kwargs):
+        return _state(request, freshness, args, kwargs)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return _state(request, freshness, args, kwargs)[1]
+
+    def decorator(view):
+        conditional_view = condition(etag, last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,156 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.utils import timezone
+
+from core import replicas
+
+from .paginator import (
+    DEFAULT_ORDERING, CursorPage, CursorPaginator, paginate
+)
+
+VERSION_KEY = 'posts:feed:version'
+HITS_KEY = 'posts:feed:hits'
+MISSES_KEY = 'posts:feed:misses'
+CHANGED_KEY = 'posts:feed:changed_at'
+DELETED_KEY = 'posts:feed:deleted_at'
+
+
+def timeout():
+    return getattr(settings, 'FEED_CACHE_TIMEOUT', 300)
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, None):
+            return 1
+        return cache.incr(key)
+
+
+def version():
+    """Текущая версия лент, входит во все ключи кеша лент."""
+
+    value = cache.get(VERSION_KEY)
+    if value is None:
+        cache.add(VERSION_KEY, 1, None)
+        value = cache.get(VERSION_KEY, 1)
+    return value
+
+
+def invalidate():
+    """Сбрасывает все закешированные страницы лент сменой версии."""
+
+    _incr(VERSION_KEY)
+    cache.set(CHANGED_KEY, timezone.now(), None)
+
+
+def deleted():
+    """Запоминает время удаления поста для Last-Modified лент."""
+
+    cache.set(DELETED_KEY, timezone.now(), None)
+
+
+def _moment(key):
+    # если кеш потерял время, отсчет начинается с текущего момента:
+    # лучше лишний раз отдать 200, чем 304 с устаревшей страницей
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, timezone.now(), None)
+        value = cache.get(key)
+    return value
+
+
+def changed_at():
+    """Время последнего сброса кеша лент, то есть любого изменения."""
+
+    return _moment(CHANGED_KEY)
+
+
+def deleted_at():
+    """Время последнего удаления поста."""
+
+    return _moment(DELETED_KEY)
+
+
+def stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'version': version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else None,
+    }
+
+
+def page_key(request):
+    """Часть ключа, описывающая запрошенную страницу ленты."""
+
+    if 'cursor' in request.GET:
+        return f'c{request.GET["cursor"]}'
+    return f'p{request.GET.get("page", "")}'
+
+
+def _dump(page):
+    state = {
+        'ids': [obj.pk for obj in page.object_list],
+        'versions': [obj.version for obj in page.object_list],
+    }
+    if getattr(page, 'is_cursor', False):
+        state['next'] = page.next_cursor
+        state['previous'] = page.previous_cursor
+    else:
+        state['number'] = page.number
+        state['count'] = page.paginator.count
+    return state
+
+
+def _load(state, queryset, per_page):
+    # выборка ленивая: если карточки страницы тоже есть в кеше,
+    # posts.cards не обратится к базе вовсе
+    object_list = queryset.filter(
+        pk__in=state['ids']).order_by(*DEFAULT_ORDERING)
+
+    if 'number' not in state:
+        page = CursorPage(
+            object_list,
+            CursorPaginator(queryset, per_page),
+            state['next'],
+            state['previous'],
+        )
+    else:
+        paginator = Paginator(queryset, per_page)
+        # число постов берем из кеша, чтобы не выполнять COUNT(*)
+        paginator.count = state['count']
+        page = Page(object_list, state['number'], paginator)
+
+    # версии карточек, см. posts.cards
+    if 'versions' in state:
+        page.cards = list(zip(state['ids'], state['versions']))
+    return page
+
+
+def get_page(request, name, queryset, per_page=None):
+    """
+    Страница ленты с кешированием вычисленного списка id постов.
+    При попадании в кеш выполняется один запрос по первичному ключу
+    вместо COUNT(*) и выборки с OFFSET. Страницы, прочитанные
+    с реплики, кешируются отдельно, см. core.replicas.source.
+    """
+
+    per_page = per_page or settings.POSTS_PER_PAGE
+    key = (f'posts:feed:{version()}:{replicas.source()}:'
+           f'{name}:{page_key(request)}')
+
+    state = cache.get(key)
+    if state is not None:
+        _incr(HITS_KEY)
+        return _load(state, queryset, per_page)
+
+    _incr(MISSES_KEY)
+    page = paginate(request, queryset, per_page)
+    cache.set(key, _dump(page), timeout())
+    return page
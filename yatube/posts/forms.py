@@ -1,5 +1,7 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm, Textarea
 
+from . import images
 from .models import Comment, Post
 
 
@@ -19,6 +21,13 @@ class PostForm(ModelForm):
             'image': 'Картинка',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # новая загрузка нормализуется, уже сохраненный файл не трогаем
+        if isinstance(image, UploadedFile):
+            image = images.normalize(image)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,330 @@
+import math
+import re
+from collections import Counter, defaultdict
+from itertools import chain
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from .models import Post, SearchPosting
+from .paginator import CursorPage, InvalidCursor, decode_cursor, encode_cursor
+from .stemmer import stem
+
+FTS_TABLE = 'posts_post_fts'
+
+# параметры BM25 те же, что у bm25() в FTS5
+K1 = 1.2
+B = 0.75
+
+CORPUS_KEY = 'posts:search:corpus'
+CORPUS_TIMEOUT = 300
+CORPUS_SAMPLE = 1000
+
+# число постов со словом для idf; кешируется так же, как корпус
+FREQUENCY_KEY = 'posts:search:df'
+
+# постинги ведущего слова читаются пачками; пачка - это и число
+# параметров в запросе остальных слов, а SQLite ограничивает его
+CHUNK_SIZE = 500
+
+# сколько постингов ведущего слова можно прочитать на одного кандидата
+SCAN_FACTOR = 10
+
+TOKEN = re.compile(r'\w+')
+
+_fts5 = {}
+
+
+def tokenize(text):
+    """Слова текста, приведенные к основам."""
+
+    max_length = SearchPosting._meta.get_field('term').max_length
+    return [stem(word)[:max_length] for word in TOKEN.findall(text.lower())]
+
+
+def fts5_enabled():
+    """
+    FTS5 используется, если таблицу удалось создать миграцией;
+    POSTS_SEARCH_BACKEND = 'index' принудительно включает обратный индекс.
+    """
+
+    if getattr(settings, 'POSTS_SEARCH_BACKEND', 'auto') == 'index':
+        return False
+    if connection.vendor != 'sqlite':
+        return False
+
+    name = connection.settings_dict['NAME']
+    if name not in _fts5:
+        _fts5[name] = FTS_TABLE in connection.introspection.table_names()
+    return _fts5[name]
+
+
+def index_post(post):
+    if fts5_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, body) '
+                'VALUES (%s, %s)', [post.pk, ' '.join(tokenize(post.text))])
+        return
+
+    SearchPosting.objects.filter(post_id=post.pk).delete()
+    SearchPosting.objects.bulk_create(_postings(post.pk, post.text))
+
+
+def _postings(post_id, text):
+    terms = tokenize(text)
+    for term, frequency in Counter(terms).items():
+        yield SearchPosting(term=term, post_id=post_id,
+                            frequency=frequency, length=len(terms))
+
+
+def remove_post(post_id):
+    # записи обратного индекса удаляются каскадом вместе с постом
+    if fts5_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [post_id])
+
+
+def rebuild(batch_size=1000):
+    """
+    Перестраивает активный индекс по всем постам пачками в одной
+    транзакции: FTS5 сливает сегменты при каждом коммите, и построчные
+    коммиты замедляют полную переиндексацию в десятки раз.
+    """
+
+    fts5 = fts5_enabled()
+    posts = Post.objects.order_by('id').values_list('id', 'text')
+    count = 0
+
+    with transaction.atomic():
+        if fts5:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        else:
+            SearchPosting.objects.all().delete()
+
+        batch = list(posts[:batch_size])
+        while batch:
+            if fts5:
+                with connection.cursor() as cursor:
+                    cursor.executemany(
+                        f'INSERT INTO {FTS_TABLE} (rowid, body) '
+                        'VALUES (%s, %s)',
+                        [(post_id, ' '.join(tokenize(text)))
+                         for post_id, text in batch])
+            else:
+                SearchPosting.objects.bulk_create(chain.from_iterable(
+                    _postings(post_id, text) for post_id, text in batch))
+            count += len(batch)
+            batch = list(posts.filter(id__gt=batch[-1][0])[:batch_size])
+
+    cache.delete(CORPUS_KEY)
+    return count
+
+
+def _fts5_matches(terms, after, reverse, limit):
+    match = ' '.join(f'"{term}"' for term in terms)
+    sql = (
+        'SELECT score, rowid FROM ('
+        f' SELECT rowid, -bm25({FTS_TABLE}) AS score FROM {FTS_TABLE}'
+        f' WHERE {FTS_TABLE} MATCH %s)'
+    )
+    params = [match]
+    if after is not None:
+        sign = '>' if reverse else '<'
+        sql += (f' WHERE score {sign} %s'
+                f' OR (score = %s AND rowid {sign} %s)')
+        params += [after[0], after[0], after[1]]
+    direction = 'ASC' if reverse else 'DESC'
+    sql += f' ORDER BY score {direction}, rowid {direction} LIMIT %s'
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+def corpus():
+    """
+    Число постов и средняя длина поста в словах, с кешем. Средняя
+    длина оценивается по CORPUS_SAMPLE последним постам, чтобы не
+    суммировать весь обратный индекс.
+    """
+
+    stats = cache.get(CORPUS_KEY)
+    if stats is None:
+        documents = Post.objects.count()
+        recent = Post.objects.order_by('-pub_date', '-id').values('id')
+        words = SearchPosting.objects.filter(
+            post_id__in=recent[:CORPUS_SAMPLE]).aggregate(
+            words=Sum('frequency'))['words'] or 0
+        stats = (documents, words / (min(documents, CORPUS_SAMPLE) or 1))
+        cache.set(CORPUS_KEY, stats, CORPUS_TIMEOUT)
+    return stats
+
+
+def max_candidates():
+    return getattr(settings, 'POSTS_SEARCH_MAX_CANDIDATES', 1000)
+
+
+def _document_frequencies(terms):
+    """Число постов с каждым словом: один GROUP BY по индексу (term, post)."""
+
+    keys = {term: f'{FREQUENCY_KEY}:{term}' for term in terms}
+    found = cache.get_many(keys.values())
+    missing = [term for term in terms if keys[term] not in found]
+    if missing:
+        counts = dict(SearchPosting.objects.filter(term__in=missing)
+                      .order_by().values_list('term')
+                      .annotate(total=Count('id')))
+        fresh = {keys[term]: counts.get(term, 0) for term in missing}
+        cache.set_many(fresh, CORPUS_TIMEOUT)
+        found.update(fresh)
+    return {term: found[keys[term]] for term in terms}
+
+
+def _complete(chunk, terms, others):
+    """Посты пачки постингов ведущего слова, в которых есть все слова."""
+
+    found = defaultdict(dict)
+    lengths = {}
+    for post_id, term, frequency, length in chunk:
+        found[post_id][term] = frequency
+        lengths[post_id] = length
+    if others:
+        for post_id, term, frequency in SearchPosting.objects.filter(
+                term__in=others, post_id__in=list(lengths)).values_list(
+                'post_id', 'term', 'frequency'):
+            found[post_id][term] = frequency
+
+    return [(post_id, found[post_id], lengths[post_id])
+            for post_id, _, _, _ in chunk
+            if len(found[post_id]) == len(terms)]
+
+
+def _candidates(terms, frequencies):
+    """
+    Самые новые посты со всеми словами запроса, не больше
+    POSTS_SEARCH_MAX_CANDIDATES. Постинги самого редкого слова читаются
+    пачками по убыванию id, остальные слова - только для постов пачки.
+    """
+
+    driver = min(terms, key=frequencies.get)
+    others = [term for term in terms if term != driver]
+    postings = SearchPosting.objects.values_list(
+        'post_id', 'term', 'frequency', 'length')
+    limit = max_candidates()
+
+    candidates = {}
+    scanned, last = 0, None
+    while len(candidates) < limit and scanned < limit * SCAN_FACTOR:
+        chunk = postings.filter(term=driver)
+        if last is not None:
+            chunk = chunk.filter(post_id__lt=last)
+        chunk = list(chunk.order_by('-post_id')[:CHUNK_SIZE])
+        if not chunk:
+            break
+        scanned += len(chunk)
+        last = chunk[-1][0]
+
+        for post_id, found, length in _complete(chunk, terms, others):
+            candidates[post_id] = (found, length)
+            if len(candidates) == limit:
+                break
+        if len(chunk) < CHUNK_SIZE:
+            break
+    return candidates
+
+
+def _index_matches(terms, after, reverse, limit):
+    """
+    BM25 по обратному индексу, как и в FTS5, только для постов со всеми
+    словами запроса. Ранжируются не все совпадения, а ограниченный
+    набор самых новых из них (см. _candidates), поэтому стоимость
+    страницы не растет с числом совпадений.
+    """
+
+    # частоты из кеша могут отставать: они влияют только на idf
+    # и выбор ведущего слова, совпадения проверяются по постингам
+    frequencies = _document_frequencies(terms)
+    documents, average = corpus()
+    documents = max(documents, *frequencies.values())
+    idf = {
+        term: math.log((documents - count + 0.5) / (count + 0.5) + 1)
+        for term, count in frequencies.items()
+    }
+
+    rows = []
+    candidates = _candidates(terms, frequencies)
+    for post_id, (terms_, length) in candidates.items():
+        norm = K1 * (1 - B + B * length / (average or 1))
+        score = sum(
+            idf[term] * frequency * (K1 + 1) / (frequency + norm)
+            for term, frequency in terms_.items()
+        )
+        rows.append((score, post_id))
+
+    if after is not None:
+        after = tuple(after)
+        rows = [row for row in rows
+                if (row > after if reverse else row < after)]
+    rows.sort(reverse=not reverse)
+    return rows[:limit]
+
+
+class SearchPaginator:
+    """
+    Keyset-пагинация выдачи по ключу (релевантность, id):
+    курсоры такие же, как у лент, см. posts.paginator.
+    """
+
+    def __init__(self, query, per_page):
+        self.terms = list(dict.fromkeys(tokenize(query)))
+        self.per_page = int(per_page)
+
+    def get_page(self, cursor=None):
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
+
+    def page(self, cursor=None):
+        reverse, after = False, None
+        if cursor:
+            reverse, after = decode_cursor(cursor)
+            if (len(after) != 2
+                    or not isinstance(after[0], (int, float))
+                    or not isinstance(after[1], int)):
+                raise InvalidCursor(cursor)
+
+        rows = []
+        if self.terms:
+            matches = _fts5_matches if fts5_enabled() else _index_matches
+            rows = matches(self.terms, after, reverse, self.per_page + 1)
+
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                next_cursor = encode_cursor(rows[-1])
+            if cursor and (has_more or not reverse):
+                previous_cursor = encode_cursor(rows[0], reverse=True)
+
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [post_id for _, post_id in rows])
+        object_list = [posts[post_id] for _, post_id in rows
+                       if post_id in posts]
+        return CursorPage(object_list, self, next_cursor, previous_cursor)
+
+
+def get_page(request, query, per_page=None):
+    per_page = per_page or settings.POSTS_PER_PAGE
+    return SearchPaginator(query, per_page).get_page(
+        request.GET.get('cursor'))
@@ -0,0 +1,125 @@
+import io
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps
+
+# форматы, которые перекодируются с потерями и понимают quality
+LOSSY_FORMATS = ('JPEG', 'WEBP')
+
+# шаг и нижняя граница качества при подгонке под лимит размера
+QUALITY_STEP = 10
+MIN_QUALITY = 50
+
+
+def max_dimension():
+    return getattr(settings, 'POSTS_IMAGE_MAX_DIMENSION', 2560)
+
+
+def max_pixels():
+    return getattr(settings, 'POSTS_IMAGE_MAX_PIXELS', 40_000_000)
+
+
+def max_upload_size():
+    return getattr(settings, 'POSTS_IMAGE_MAX_UPLOAD_SIZE', 20 * 1024 ** 2)
+
+
+def max_bytes():
+    return getattr(settings, 'POSTS_IMAGE_MAX_BYTES', 2 * 1024 ** 2)
+
+
+def quality():
+    return getattr(settings, 'POSTS_IMAGE_QUALITY', 85)
+
+
+def _open(upload):
+    """
+    Открывает загрузку, читая только заголовок: размеры проверяются
+    до декодирования пикселей, так что «бомба» не успевает развернуться
+    в памяти.
+    """
+
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except Image.DecompressionBombError:
+        raise ValidationError('Картинка слишком большая.')
+
+    width, height = image.size
+    if width * height > max_pixels():
+        image.close()
+        raise ValidationError(
+            'Картинка слишком большая: %(width)s×%(height)s.',
+            params={'width': width, 'height': height},
+        )
+    return image
+
+
+def _encode(image, format_, quality_):
+    params = {'format': format_, 'optimize': True}
+    if format_ in LOSSY_FORMATS:
+        params['quality'] = quality_
+    if format_ == 'JPEG':
+        params['progressive'] = True
+    # цветовой профиль оставляем, остальные метаданные (EXIF, GPS) - нет
+    if image.info.get('icc_profile'):
+        params['icc_profile'] = image.info['icc_profile']
+
+    buffer = io.BytesIO()
+    image.save(buffer, **params)
+    return buffer.getvalue()
+
+
+def normalize(upload):
+    """
+    Приводит загруженную картинку к разумному виду: уменьшает до
+    POSTS_IMAGE_MAX_DIMENSION по большей стороне, поворачивает по EXIF
+    и перекодирует без метаданных с качеством POSTS_IMAGE_QUALITY.
+    Если результат не влезает в POSTS_IMAGE_MAX_BYTES, качество
+    снижается ступенями, а затем загрузка отклоняется.
+    Имя файла и формат сохраняются.
+    """
+
+    if upload.size > max_upload_size():
+        raise ValidationError('Файл картинки слишком большой.')
+
+    limit = max_dimension()
+    image = _open(upload)
+    format_ = image.format
+
+    # MPO - это JPEG с дополнительными кадрами (так сохраняют снимки
+    # многие телефоны): нормализуется первый кадр, остальные отбрасываются
+    if format_ == 'MPO':
+        format_ = 'JPEG'
+    # анимацию перекодировать покадрово дорого, ее только проверяем;
+    # байты читаются до close(), потому что у многокадровых картинок
+    # Pillow закрывает вместе с собой и файл загрузки
+    elif getattr(image, 'is_animated', False):
+        upload.seek(0)
+        data = upload.read()
+        image.close()
+        if len(data) > max_bytes():
+            raise ValidationError('Файл картинки слишком большой.')
+        return SimpleUploadedFile(upload.name, data,
+                                  content_type=upload.content_type)
+
+    with image:
+        if format_ == 'JPEG':
+            # JPEG декодируется сразу в уменьшенном масштабе (1/2 ... 1/8)
+            image.draft(image.mode, (limit, limit))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((limit, limit), Image.LANCZOS)
+
+        quality_ = quality()
+        data = _encode(image, format_, quality_)
+        while (len(data) > max_bytes() and format_ in LOSSY_FORMATS
+               and quality_ - QUALITY_STEP >= MIN_QUALITY):
+            quality_ -= QUALITY_STEP
+            data = _encode(image, format_, quality_)
+
+    if len(data) > max_bytes():
+        raise ValidationError('Файл картинки слишком большой.')
+
+    return SimpleUploadedFile(upload.name, data,
+                              content_type=upload.content_type)
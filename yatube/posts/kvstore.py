@@ -0,0 +1,189 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from sorl.thumbnail.helpers import deserialize
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import KVStoreBase, add_prefix
+
+# сколько ключей держать в памяти процесса
+LRU_SIZE = 4096
+
+# как часто проверять, не менял ли хранилище другой процесс, в секундах
+SYNC_INTERVAL = 1.0
+
+# ограничение SQLite на число параметров в одном запросе
+CHUNK_SIZE = 500
+
+MISSING = object()
+
+
+def path():
+    """
+    Файл хранилища лежит вне MEDIA_ROOT: этот каталог раздается
+    публично, а в хранилище есть имена и удаленных картинок.
+    """
+
+    return getattr(settings, 'THUMBNAIL_KVSTORE_PATH', None) or os.path.join(
+        settings.BASE_DIR, 'thumbnails.sqlite3')
+
+
+class LRU:
+    def __init__(self, size):
+        self.size = size
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.data.get(key, MISSING)
+            if value is not MISSING:
+                self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.size:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class KVStore(KVStoreBase):
+    """
+    Хранилище метаданных sorl-thumbnail без обращений к основной БД:
+    LRU в памяти процесса перед отдельным SQLite-файлом в режиме WAL.
+    Отсутствие ключа тоже запоминается, чтобы промахи не ходили на диск.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.local = threading.local()
+        self.lru = LRU(getattr(settings, 'THUMBNAIL_KVSTORE_LRU_SIZE',
+                               LRU_SIZE))
+        self.path = None
+        self.data_version = None
+        self.synced_at = 0
+
+    @property
+    def connection(self):
+        current = path()
+        if current != self.path:
+            # путь сменился (например, в тестах) - кеш процесса устарел
+            self.path = current
+            self.data_version = None
+            self.lru.clear()
+
+        connection = getattr(self.local, 'connections', {}).get(current)
+        if connection is None:
+            os.makedirs(os.path.dirname(current), exist_ok=True)
+            connection = sqlite3.connect(current, timeout=10,
+                                         isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS kvstore '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID'
+            )
+            self.local.connections = {current: connection}
+        return connection
+
+    def sync(self):
+        """
+        Сбрасывает LRU, если файл изменил другой процесс или поток:
+        PRAGMA data_version меняется после чужих коммитов.
+        """
+
+        connection = self.connection
+        now = time.monotonic()
+        if now - self.synced_at < SYNC_INTERVAL:
+            return connection
+
+        self.synced_at = now
+        version = connection.execute('PRAGMA data_version').fetchone()[0]
+        if self.data_version is not None and version != self.data_version:
+            self.lru.clear()
+        self.data_version = version
+        return connection
+
+    def prefetch(self, image_files):
+        """
+        Загружает в LRU записи исходных картинок и всех их миниатюр
+        двумя запросами, чтобы последующие get_thumbnail не ходили
+        в хранилище по одному ключу.
+        """
+
+        keys = set()
+        for image_file in image_files:
+            if not isinstance(image_file, ImageFile):
+                image_file = ImageFile(image_file)
+            keys.add(add_prefix(image_file.key))
+            keys.add(add_prefix(image_file.key, 'thumbnails'))
+
+        values = self._load(keys)
+
+        thumbnail_keys = set()
+        for key, value in values.items():
+            if value is not None and '||thumbnails||' in key:
+                thumbnail_keys.update(
+                    add_prefix(thumbnail_key)
+                    for thumbnail_key in deserialize(value) or []
+                )
+        self._load(thumbnail_keys)
+
+    def _load(self, keys):
+        connection = self.sync()
+        keys = [key for key in keys if self.lru.get(key) is MISSING]
+
+        found = {}
+        for start in range(0, len(keys), CHUNK_SIZE):
+            chunk = keys[start:start + CHUNK_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            rows = connection.execute(
+                'SELECT key, value FROM kvstore '
+                f'WHERE key IN ({placeholders})', chunk)
+            found.update(rows.fetchall())
+
+        for key in keys:
+            self.lru.set(key, found.get(key))
+        return found
+
+    def _get_raw(self, key):
+        self.sync()
+        value = self.lru.get(key)
+        if value is MISSING:
+            value = self._load([key]).get(key)
+        return value
+
+    def _set_raw(self, key, value):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO kvstore (key, value) VALUES (?, ?)',
+            (key, value),
+        )
+        self.lru.set(key, value)
+
+    def _delete_raw(self, *keys):
+        connection = self.connection
+        keys = list(keys)
+        for start in range(0, len(keys), CHUNK_SIZE):
+            chunk = keys[start:start + CHUNK_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            connection.execute(
+                f'DELETE FROM kvstore WHERE key IN ({placeholders})', chunk)
+        for key in keys:
+            self.lru.set(key, None)
+
+    def _find_keys_raw(self, prefix):
+        rows = self.connection.execute(
+            'SELECT key FROM kvstore WHERE key >= ? AND key < ?',
+            (prefix, prefix + '\uffff'),
+        )
+        return [key for key, in rows.fetchall()]
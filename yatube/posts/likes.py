@@ -0,0 +1,150 @@
+"""
+Лайки постов. Like хранит, кто что лайкнул (одна строка на пару
+пользователь - пост), а число лайков живет в шардированном счетчике
+LikeCounter: сигналы posts.signals прибавляют к случайному шарду,
+чтение суммирует шарды и кеширует сумму.
+
+Число лайков не входит в кешируемую карточку поста: карточка хранит
+маркер <!--like:id поста:адрес-->, который posts.cards заменяет
+кнопкой с числом и состоянием для читателя. Кешированные страницы
+и ETag-и учитывают эпоху лайков (см. epoch), поэтому чужие лайки
+видны с опозданием не больше POSTS_LIKES_TIMEOUT, а свои - сразу.
+"""
+
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import Like, LikeCounter
+
+PREFIX = 'posts:likes'
+
+
+def shards():
+    return getattr(settings, 'POSTS_LIKE_SHARDS', 8)
+
+
+def timeout():
+    return getattr(settings, 'POSTS_LIKES_TIMEOUT', 60)
+
+
+def count_key(post_id):
+    return f'{PREFIX}:count:{post_id}'
+
+
+def user_key(user_id):
+    return f'{PREFIX}:user:{user_id}'
+
+
+def epoch():
+    """Номер текущего окна POSTS_LIKES_TIMEOUT секунд."""
+
+    return int(time.time() // max(timeout(), 1))
+
+
+def user_version(user):
+    """Меняется после каждого лайка пользователя, см. conditional."""
+
+    if not user.is_authenticated:
+        return None
+    return cache.get(user_key(user.pk), 0)
+
+
+def bump(post_id, delta):
+    """Прибавляет delta к случайному шарду счетчика поста."""
+
+    shard = random.randrange(shards())
+    counters = LikeCounter.objects.filter(post_id=post_id)
+    if not counters.filter(shard=shard).update(count=F('count') + delta):
+        if delta > 0:
+            try:
+                with transaction.atomic():
+                    LikeCounter.objects.create(post_id=post_id, shard=shard,
+                                               count=delta)
+            except IntegrityError:
+                # шард создал параллельный лайк
+                counters.filter(shard=shard).update(count=F('count') + delta)
+        else:
+            # снятие лайка не создает шардов: пост мог удаляться вместе
+            # со счетчиками, а вычесть можно из любого шарда
+            counter_id = counters.values_list('pk', flat=True).first()
+            if counter_id is not None:
+                LikeCounter.objects.filter(pk=counter_id).update(
+                    count=F('count') + delta)
+
+    # второй сброс после коммита убирает сумму, которую параллельное
+    # чтение успело закешировать по еще не закоммиченным шардам
+    key = count_key(post_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def counts(post_ids):
+    """
+    Число лайков постов: из кеша, а промахи - одним запросом с суммой
+    шардов по индексу (post, shard).
+    """
+
+    keys = {count_key(post_id): post_id for post_id in post_ids}
+    found = cache.get_many(keys)
+    missing = [post_id for key, post_id in keys.items() if key not in found]
+    if missing:
+        sums = dict(LikeCounter.objects.filter(
+            post_id__in=missing).order_by().values('post_id').annotate(
+            total=Sum('count')).values_list('post_id', 'total'))
+        fresh = {count_key(post_id): sums.get(post_id, 0)
+                 for post_id in missing}
+        cache.set_many(fresh, timeout())
+        found.update(fresh)
+    return {post_id: found[key] for key, post_id in keys.items()}
+
+
+def liked(user, post_ids):
+    """Посты из post_ids, которые лайкнул пользователь."""
+
+    if user is None or not user.is_authenticated or not post_ids:
+        return set()
+    return set(Like.objects.filter(
+        user=user, post_id__in=post_ids).values_list('post_id', flat=True))
+
+
+def toggle(user, post_id):
+    """Ставит или снимает лайк; возвращает, стоит ли он теперь."""
+
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(user=user, post_id=post_id).delete()
+        if not deleted:
+            try:
+                with transaction.atomic():
+                    Like.objects.create(user=user, post_id=post_id)
+            except IntegrityError:
+                # лайк уже поставил параллельный запрос
+                pass
+
+    key = user_key(user.pk)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+    return not deleted
+
+
+def rebuild_all():
+    """
+    Пересчитывает счетчики всех постов из Like одним GROUP BY, например
+    после массовой загрузки: у каждого поста с лайками один шард.
+    """
+
+    totals = Like.objects.order_by().values_list('post_id').annotate(
+        total=Count('id'))
+    with transaction.atomic():
+        LikeCounter.objects.all().delete()
+        LikeCounter.objects.bulk_create(
+            LikeCounter(post_id=post_id, shard=0, count=total)
+            for post_id, total in totals.iterator()
+        )
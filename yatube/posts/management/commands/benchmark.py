@@ -0,0 +1,76 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment, teardown_test_environment
+)
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Замеряет представления posts на синтетических данных '
+            'нескольких объемов и сравнивает с эталоном')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='1000,10000',
+                            help='Число постов через запятую')
+        parser.add_argument('--repeat', type=int, default=30,
+                            help='Запросов на представление')
+        parser.add_argument('--views', default='',
+                            help='Только эти представления, через запятую')
+        parser.add_argument('--warm', action='store_true',
+                            help='Не сбрасывать кеш между запросами')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--baseline', default='benchmark.json',
+                            help='JSON-файл эталона')
+        parser.add_argument('--save', action='store_true',
+                            help='Записать результаты как новый эталон')
+        parser.add_argument('--threshold', type=float, default=0.5,
+                            help='Допустимый рост метрик, доля')
+
+    def handle(self, *args, **options):
+        scales = [int(scale) for scale in options['scales'].split(',')]
+        views = [view for view in options['views'].split(',') if view]
+
+        # замеры идут на отдельной тестовой базе и своем кеше, рабочие
+        # не трогаются; DEBUG выключен, как в продакшене и в тестах
+        setup_test_environment(debug=False)
+        results = {}
+        try:
+            with benchmark.isolated_cache():
+                for scale in scales:
+                    old_name = connection.creation.create_test_db(
+                        verbosity=0, autoclobber=True)
+                    try:
+                        self.stdout.write(f'== {scale} постов')
+                        benchmark.seed_scale(scale, seed=options['seed'])
+                        results[str(scale)] = benchmark.run(
+                            repeat=options['repeat'], warm=options['warm'],
+                            views=views, log=self.stdout.write)
+                    finally:
+                        connection.creation.destroy_test_db(old_name,
+                                                            verbosity=0)
+        finally:
+            teardown_test_environment()
+
+        path = options['baseline']
+        if options['save']:
+            with open(path, 'w', encoding='utf-8') as stream:
+                json.dump(results, stream, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Эталон записан в {path}'))
+            return
+
+        if not os.path.exists(path):
+            self.stdout.write(f'Эталона {path} нет, сравнивать не с чем')
+            return
+
+        with open(path, encoding='utf-8') as stream:
+            baseline = json.load(stream)
+        regressions = benchmark.compare(results, baseline,
+                                        options['threshold'])
+        if regressions:
+            raise CommandError('Регрессии:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment, teardown_test_environment
+)
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность записи add_comment '
+            'и new_post при настройках SQLite по умолчанию и из settings')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000,
+                            help='Постов в базе замера')
+        parser.add_argument('--writers', type=int, default=4,
+                            help='Параллельных писателей')
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Запросов на писателя')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        # конкурентная запись требует базы в файле: тестовая база
+        # SQLite по умолчанию живет в памяти и fsync не делает
+        directory = tempfile.mkdtemp()
+        connection.settings_dict['TEST']['NAME'] = os.path.join(
+            directory, 'benchmark.sqlite3')
+        setup_test_environment(debug=False)
+        results = {}
+        try:
+            with benchmark.isolated_cache():
+                old_name = connection.creation.create_test_db(
+                    verbosity=0, autoclobber=True)
+                try:
+                    benchmark.seed_scale(options['posts'],
+                                         seed=options['seed'])
+                    for name, profile in benchmark.sqlite_profiles().items():
+                        results[name] = benchmark.measure_writes(
+                            profile, writers=options['writers'],
+                            requests=options['requests'])
+                        self.stdout.write(f'{name:>8}: {results[name]}')
+                finally:
+                    connection.creation.destroy_test_db(old_name,
+                                                        verbosity=0)
+        finally:
+            teardown_test_environment()
+            shutil.rmtree(directory, ignore_errors=True)
+
+        before, after = results['default'], results['tuned']
+        if before['writes_per_s']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Запись быстрее в '
+                f'{after["writes_per_s"] / before["writes_per_s"]:.1f} раза, '
+                f'ошибок: {before["errors"]} -> {after["errors"]}'))
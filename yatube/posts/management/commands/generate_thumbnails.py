@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+# сколько постов подгружать из хранилища миниатюр за раз
+BATCH_SIZE = 200
+
+
+class Command(BaseCommand):
+    help = ('Строит миниатюры для постов, у которых их еще нет '
+            'или не удалось построить')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Перестроить миниатюры всех постов')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            posts = posts.filter(thumbnail='') | thumbnails.failed()
+
+        count = 0
+        batch = list(posts.only('id', 'image').order_by('id')[:BATCH_SIZE])
+        while batch:
+            thumbnails.prefetch(post.image for post in batch)
+            for post in batch:
+                if thumbnails.build(post.id):
+                    count += 1
+            batch = list(posts.only('id', 'image').filter(
+                id__gt=batch[-1].id).order_by('id')[:BATCH_SIZE])
+
+        self.stdout.write(self.style.SUCCESS(f'Построено миниатюр: {count}'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import fulltext
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов'
+
+    def handle(self, *args, **options):
+        backend = 'FTS5' if fulltext.fts5_enabled() else 'обратный индекс'
+        count = fulltext.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {count} ({backend})'))
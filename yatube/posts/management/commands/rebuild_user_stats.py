@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import page_cache, stats
+from posts.models import UserStats
+
+User = get_user_model()
+
+FIELDS = ('posts_count', 'followers_count', 'following_count')
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики постов и подписок пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать расхождения')
+
+    def handle(self, *args, **options):
+        current = {
+            row['user_id']: row
+            for row in UserStats.objects.values('user_id', *FIELDS)
+        }
+
+        drifted = 0
+        users = User.objects.values_list('id', 'username')
+        for user_id, username in users.iterator():
+            expected = stats.compute(user_id)
+            row = current.get(user_id)
+            if row and all(row[f] == expected[f] for f in FIELDS):
+                continue
+
+            drifted += 1
+            self.stdout.write(f'user {user_id}: {row} -> {expected}')
+            if not options['dry_run']:
+                stats.rebuild(user_id)
+                page_cache.invalidate(f'author:{username}')
+
+        self.stdout.write(self.style.SUCCESS(f'Расхождений: {drifted}'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from posts import cards, feed_cache, page_cache
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Сверяет Post.comment_count с фактическим числом комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать расхождения')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.order_by().annotate(
+            actual=Count('comments')).values_list(
+            'id', 'comment_count', 'actual')
+
+        fixed = []
+        for post_id, stored, actual in posts.iterator():
+            if stored == actual:
+                continue
+
+            fixed.append(post_id)
+            self.stdout.write(f'post {post_id}: {stored} -> {actual}')
+            if not options['dry_run']:
+                # счетчик виден в карточке, поэтому поднимаем и ее версию
+                Post.objects.filter(pk=post_id).update(
+                    comment_count=actual, **cards.changed())
+
+        if fixed and not options['dry_run']:
+            feed_cache.invalidate()
+            tags = set()
+            for post in Post.objects.select_related('author', 'group').filter(
+                    pk__in=fixed).iterator():
+                tags.update(page_cache.post_tags(post))
+            page_cache.invalidate(*tags)
+
+        self.stdout.write(self.style.SUCCESS(f'Расхождений: {len(fixed)}'))
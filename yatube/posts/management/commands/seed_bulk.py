@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import seed
+
+
+class Command(BaseCommand):
+    help = ('Генерирует синтетических пользователей, посты, комментарии '
+            'и подписки, выгружает и загружает их в JSON Lines')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=0)
+        parser.add_argument('--groups', type=int, default=0)
+        parser.add_argument('--posts', type=int, default=0)
+        parser.add_argument('--comments', type=int, default=0)
+        parser.add_argument('--follows', type=float, default=0,
+                            help='Среднее число подписок на пользователя')
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Показатель распределения популярности')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней разбросать даты')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Зерно генератора для воспроизводимости')
+        parser.add_argument('--batch-size', type=int,
+                            default=seed.BATCH_SIZE)
+        parser.add_argument('--load', metavar='FILE',
+                            help='Загрузить выгрузку JSON Lines')
+        parser.add_argument('--export', metavar='FILE',
+                            help='Выгрузить базу в JSON Lines')
+
+    def log(self, message):
+        self.stdout.write(f'[{time.monotonic() - self.started:7.1f}s] '
+                          f'{message}')
+
+    def handle(self, *args, **options):
+        self.started = time.monotonic()
+        generate = any(options[name] for name in
+                       ('users', 'groups', 'posts', 'comments'))
+        if options['load'] and generate:
+            raise CommandError('--load нельзя совмещать с генерацией')
+        if not (generate or options['load'] or options['export']):
+            raise CommandError('Нечего делать: укажите объемы, '
+                               '--load или --export')
+
+        if options['load']:
+            with open(options['load'], encoding='utf-8') as stream:
+                total = seed.load(stream, options['batch_size'], self.log)
+            self.log(f'загружено записей: {total}')
+
+        if generate:
+            seeder = seed.Seeder(seed=options['seed'],
+                                 batch_size=options['batch_size'],
+                                 exponent=options['zipf'],
+                                 days=options['days'],
+                                 log=self.log)
+            seeder.seed(users=options['users'], groups=options['groups'],
+                        posts=options['posts'],
+                        comments=options['comments'],
+                        follows=options['follows'])
+
+        if options['export']:
+            with open(options['export'], 'w', encoding='utf-8') as stream:
+                total = seed.export(stream, self.log)
+            self.log(f'выгружено записей: {total}')
+
+        self.stdout.write(self.style.SUCCESS('Готово'))
@@ -0,0 +1,110 @@
+import json
+import posixpath
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from posts.kvstore import path
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Удаляет осиротевшие записи хранилища миниатюр '
+            'и файлы media/cache, на которые никто не ссылается')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, что будет удалено')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.prefix = thumbnail_settings.THUMBNAIL_PREFIX
+        kvstore = default.kvstore
+
+        entries = self.collect_entries(kvstore)
+        if not self.dry_run:
+            kvstore.cleanup()
+        files = self.collect_files(kvstore)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей: {entries}, файлов: {files}'))
+
+    def live_images(self):
+        return set(Post.objects.exclude(image='').exclude(
+            image__isnull=True).values_list('image', flat=True))
+
+    def collect_entries(self, kvstore):
+        """
+        Записи исходников, которых больше нет у постов или на диске,
+        удаляются вместе с их миниатюрами; записи миниатюр без файла -
+        по одной, чтобы sorl построил их заново.
+        """
+
+        live = self.live_images()
+        removed = 0
+        for key in list(kvstore._find_keys(identity='image')):
+            image_file = kvstore._get(key)
+            if image_file is None:
+                continue
+
+            thumbnail = image_file.name.startswith(self.prefix)
+            if image_file.exists() and (thumbnail or image_file.name in live):
+                continue
+
+            removed += 1
+            self.stdout.write(f'запись: {image_file.name}')
+            if not self.dry_run:
+                kvstore.delete(image_file, delete_thumbnails=not thumbnail)
+        return removed
+
+    def referenced_files(self, kvstore):
+        names = {
+            image_file.name
+            for image_file in map(kvstore._get,
+                                  kvstore._find_keys(identity='image'))
+            if image_file is not None
+        }
+
+        posts = Post.objects.exclude(thumbnail='').values_list(
+            'thumbnail', 'image_variants')
+        for thumbnail, variants in posts.iterator():
+            names.add(thumbnail)
+            for entries in json.loads(variants or '{}').values():
+                names.update(name for _, name in entries)
+        return names
+
+    def walk(self, storage, path):
+        try:
+            directories, files = storage.listdir(path)
+        except FileNotFoundError:
+            return
+        for name in files:
+            yield posixpath.join(path, name)
+        for directory in directories:
+            yield from self.walk(storage, posixpath.join(path, directory))
+
+    def is_store(self, storage, name):
+        """Файл самого хранилища или его WAL, если его положили в media."""
+
+        try:
+            return storage.path(name).startswith(path())
+        except NotImplementedError:
+            return False
+
+    def collect_files(self, kvstore):
+        storage = default.storage
+        referenced = self.referenced_files(kvstore)
+
+        removed = 0
+        for name in self.walk(storage, self.prefix.rstrip('/')):
+            if self.is_store(storage, name):
+                continue
+            if name in referenced:
+                continue
+
+            removed += 1
+            self.stdout.write(f'файл: {name}')
+            if not self.dry_run:
+                storage.delete(name)
+        return removed
@@ -0,0 +1,85 @@
+# Generated by Django 2.2.6 on 2026-10-17 06:07
+
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from posts.stemmer import stem
+
+# токенизатор и таблица FTS5 на момент миграции; posts.fulltext может
+# меняться, после этого индекс перестраивает rebuild_search_index
+FTS_TABLE = 'posts_post_fts'
+TOKEN = re.compile(r'\w+')
+TERM_LENGTH = 64
+
+
+def tokenize(text):
+    return [stem(word)[:TERM_LENGTH] for word in TOKEN.findall(text.lower())]
+
+
+def create_fts5(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return False
+    try:
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+            'USING fts5(body, tokenize="unicode61 remove_diacritics 2")'
+        )
+    except Exception:
+        return False
+    return True
+
+
+def fill_index(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    SearchPosting = apps.get_model('posts', 'SearchPosting')
+
+    fts5 = create_fts5(schema_editor)
+    if getattr(settings, 'POSTS_SEARCH_BACKEND', 'auto') == 'index':
+        fts5 = False
+
+    for post in Post.objects.only('id', 'text').iterator():
+        terms = tokenize(post.text)
+        if fts5:
+            schema_editor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                [post.pk, ' '.join(terms)])
+            continue
+        SearchPosting.objects.bulk_create(
+            SearchPosting(term=term, post_id=post.pk,
+                          frequency=frequency, length=len(terms))
+            for term, frequency in Counter(terms).items()
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('frequency', models.PositiveIntegerField(verbose_name='Вхождений')),
+                ('length', models.PositiveIntegerField(verbose_name='Длина поста')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='posts.Post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchposting',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='uniq_search_posting'),
+        ),
+        migrations.RunPython(fill_index, drop_index),
+    ]
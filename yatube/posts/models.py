@@ -1,3 +1,6 @@
+import json
+
+from django.core.files.storage import default_storage
 from django.db import models
 from django.contrib.auth import get_user_model
 
@@ -19,10 +22,23 @@ class Group(models.Model):
         help_text='Описание группы'
     )
 
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
+
     def __str__(self):
         return f'{self.title}'
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """
+        Выборка для карточек ленты: автор и группа подтягиваются JOIN-ом,
+        число комментариев хранится в самом посте.
+        """
+
+        return self.select_related('author', 'group').order_by(
+            '-pub_date', '-id')
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст',
@@ -31,6 +47,9 @@ class Post(models.Model):
 
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
 
+    # UPDATE-ы в обход save() ставят его сами, см. posts.cards.bump
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
+
     author = models.ForeignKey(User,
                                on_delete=models.CASCADE,
                                related_name='posts')
@@ -43,12 +62,69 @@ class Post(models.Model):
 
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
 
+    # миниатюра строится фоновым потоком, см. posts.thumbnails
+    thumbnail = models.CharField(max_length=255, blank=True, editable=False)
+
+    # {"webp": [[ширина, файл], ...], ...}, см. posts.thumbnails
+    image_variants = models.TextField(blank=True, editable=False)
+
+    comment_count = models.PositiveIntegerField('Комментариев',
+                                                default=0,
+                                                editable=False)
+
+    # растет при каждом изменении, видимом в карточке поста;
+    # входит в ключ кеша карточки, см. posts.cards
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ['-pub_date']
+        indexes = (
+            models.Index(fields=['pub_date'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', 'pub_date'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', 'pub_date'],
+                         name='post_group_pub_date_idx'),
+            # Last-Modified лент, см. posts.conditional
+            models.Index(fields=['updated_at'],
+                         name='post_updated_at_idx'),
+            models.Index(fields=['author', 'updated_at'],
+                         name='post_author_updated_at_idx'),
+            models.Index(fields=['group', 'updated_at'],
+                         name='post_group_updated_at_idx'),
+        )
 
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def thumbnail_url(self):
+        return default_storage.url(self.thumbnail) if self.thumbnail else ''
+
+    def image_srcset(self, format_):
+        variants = json.loads(self.image_variants or '{}')
+        return ', '.join(
+            f'{default_storage.url(name)} {width}w'
+            for width, name in variants.get(format_, [])
+        )
+
+    @property
+    def picture_sources(self):
+        """Источники <picture> в современных форматах, лучший первым."""
+
+        sources = []
+        for format_ in ('avif', 'webp'):
+            srcset = self.image_srcset(format_)
+            if srcset:
+                sources.append({'type': f'image/{format_}', 'srcset': srcset})
+        return sources
+
+    @property
+    def thumbnail_srcset(self):
+        return self.image_srcset('jpeg')
+
 
 class Comment(models.Model):
     post = models.ForeignKey(Post,
@@ -64,8 +140,32 @@ class Comment(models.Model):
 
     created = models.DateTimeField('Дата публикации', auto_now_add=True)
 
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
+
+    parent = models.ForeignKey('self',
+                               on_delete=models.CASCADE,
+                               related_name='replies',
+                               blank=True,
+                               null=True,
+                               verbose_name='Ответ на')
+
+    # материализованный путь: id всех предков и самого комментария по
+    # 10 цифр через '/', так что ветка - это диапазон путей с общим
+    # префиксом, а сортировка по пути дает обход дерева в глубину
+    path = models.CharField('Путь в ветке', max_length=255, blank=True,
+                            editable=False)
+
     class Meta:
         ordering = ['-created']
+        indexes = (
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+            models.Index(fields=['post', 'path'],
+                         name='comment_post_path_idx'),
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_root_idx',
+                         condition=models.Q(parent=None)),
+        )
 
     def __str__(self):
         return self.text[:15]
@@ -88,3 +188,134 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.user}'
+
+
+class UserStats(models.Model):
+    """
+    Денормализованные счетчики для карточки автора. Обновляются
+    F-выражениями при создании и удалении постов и подписок,
+    расхождения исправляет команда rebuild_user_stats.
+    """
+
+    user = models.OneToOneField(User,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='stats')
+
+    posts_count = models.PositiveIntegerField('Записей', default=0)
+
+    followers_count = models.PositiveIntegerField('Подписчиков',
+                                                  default=0,
+                                                  db_index=True)
+
+    following_count = models.PositiveIntegerField('Подписан', default=0)
+
+    def __str__(self):
+        return f'{self.user}'
+
+
+class TimelineEntry(models.Model):
+    """
+    Материализованная лента подписок: запись на каждый пост автора
+    для каждого подписчика. Заполняется при публикации поста
+    и при подписке, очищается при отписке.
+    """
+
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='timeline')
+
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='timeline_entries')
+
+    # копия Post.pub_date: страница ленты читается одним диапазоном индекса
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='uniq_timeline_entry'),
+        )
+        indexes = (
+            models.Index(fields=['user', 'pub_date', 'post'],
+                         name='timeline_user_pub_date_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.user} - {self.post_id}'
+
+
+class SearchPosting(models.Model):
+    """
+    Обратный индекс для поиска там, где нет SQLite FTS5: строка
+    на каждую основу слова в каждом посте, см. posts.fulltext.
+    """
+
+    term = models.CharField('Основа слова', max_length=64)
+
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='search_postings')
+
+    frequency = models.PositiveIntegerField('Вхождений')
+
+    # длина поста в словах: BM25 считается без обращения к постам
+    length = models.PositiveIntegerField('Длина поста')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=['term', 'post'],
+                                    name='uniq_search_posting'),
+        )
+
+    def __str__(self):
+        return self.term
+
+
+class Like(models.Model):
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='likes')
+
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='likes')
+
+    created = models.DateTimeField('Дата', auto_now_add=True)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='uniq_like'),
+        )
+
+    def __str__(self):
+        return f'{self.user} -> {self.post_id}'
+
+
+class LikeCounter(models.Model):
+    """
+    Счетчик лайков поста, разбитый на шарды: лайк прибавляется к
+    случайному шарду, и одновременные лайки одного поста не ждут
+    блокировки одной строки. Число лайков - сумма шардов, см. posts.likes.
+    """
+
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='like_counters')
+
+    shard = models.PositiveSmallIntegerField('Шард')
+
+    # отдельный шард может уйти в минус: снятый лайк вычитается
+    # из случайного шарда, а не из того, куда его прибавили
+    count = models.IntegerField('Лайков', default=0)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=['post', 'shard'],
+                                    name='uniq_like_counter_shard'),
+        )
+
+    def __str__(self):
+        return f'{self.post_id}:{self.shard} = {self.count}'
@@ -0,0 +1,159 @@
+"""
+Кеш готовых ответов для анонимных читателей: главная, сообщество,
+профиль и страница поста отдаются из кеша без ORM и шаблонов.
+
+Запрос с cookie сессии может быть от вошедшего пользователя, и узнать
+это можно только обращением к сессии, поэтому такие запросы идут мимо
+кеша. Ключ - путь, номер страницы или курсор, версии тегов страницы,
+источник чтения (основная база или реплика, см. core.replicas.source)
+и эпоха лайков: число лайков на странице отстает не дольше нее.
+Сохранение и удаление постов, комментариев, сообществ и подписок
+меняют версии тегов (см. posts.signals); версия - случайная строка,
+и потерянная кешем версия не воскрешает старые страницы. Время смены
+версии тоже запоминается: из него posts.conditional берет Last-Modified.
+"""
+
+import hashlib
+import secrets
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from core import replicas
+
+from . import likes
+
+PREFIX = 'posts:page'
+
+# от этого тега зависит каждая страница: переименование сообщества или
+# пользователя меняет карточки везде
+SITE = 'site'
+
+
+def timeout():
+    return getattr(settings, 'POSTS_PAGE_CACHE_TIMEOUT', 600)
+
+
+def _tag_key(tag):
+    return f'{PREFIX}:tag:{tag}'
+
+
+def versions(tags):
+    keys = [_tag_key(tag) for tag in tags]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, secrets.token_hex(4), None)
+        found.update(cache.get_many(missing))
+    return [found.get(key) for key in keys]
+
+
+def _changed_key(tag):
+    return f'{PREFIX}:changed:{tag}'
+
+
+def invalidate(*tags):
+    now = timezone.now()
+    cache.set_many({
+        **{_tag_key(tag): secrets.token_hex(4) for tag in tags},
+        **{_changed_key(tag): now for tag in tags},
+    }, None)
+
+
+def changed_at(tags):
+    """
+    Время последнего сброса страницы с тегами tags. Если кеш потерял
+    время, отсчет начинается с текущего момента, как в posts.feed_cache.
+    """
+
+    keys = [_changed_key(tag) for tag in [SITE, *tags]]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        now = timezone.now()
+        for key in missing:
+            cache.add(key, now, None)
+        found.update(cache.get_many(missing))
+    return max(found.values(), default=None)
+
+
+def post_tags(post):
+    """Теги всех страниц, на которых виден пост."""
+
+    tags = ['index', f'post:{post.pk}', f'author:{post.author.username}']
+    if post.group_id:
+        tags.append(f'group:{post.group.slug}')
+    return tags
+
+
+def index(request):
+    return ['index']
+
+
+def group_posts(request, slug):
+    return [f'group:{slug}']
+
+
+def profile(request, username):
+    return [f'author:{username}']
+
+
+def post_view(request, username, post_id):
+    # карточка автора со счетчиками есть и на странице поста
+    return [f'post:{post_id}', f'author:{username}']
+
+
+def cacheable(request):
+    return (timeout() != 0
+            and request.method in ('GET', 'HEAD')
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES)
+
+
+def page_key(request, tags):
+    page = [(name, request.GET[name])
+            for name in ('page', 'cursor') if name in request.GET]
+    raw = repr((request.path, page, versions([SITE, *tags]),
+                replicas.source(), likes.epoch()))
+    return f'{PREFIX}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def anonymous(tags):
+    """
+    Декоратор представления: ответ анонимному читателю берется из кеша
+    и проверяется на If-None-Match и If-Modified-Since, как и без кеша.
+    tags(request, ...) возвращает теги страницы по аргументам из URL.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not cacheable(request):
+                return view(request, *args, **kwargs)
+
+            key = page_key(request, tags(request, *args, **kwargs))
+            response = cache.get(key)
+            if response is not None:
+                response['X-Page-Cache'] = 'hit'
+                return get_conditional_response(
+                    request,
+                    etag=response.get('ETag'),
+                    last_modified=parse_http_date_safe(
+                        response.get('Last-Modified', '')),
+                    response=response,
+                )
+
+            response = view(request, *args, **kwargs)
+            if (response.status_code == 200 and not response.streaming
+                    and not response.cookies):
+                cache.set(key, response, timeout())
+                response['X-Page-Cache'] = 'miss'
+            return response
+
+        return wrapper
+
+    return decorator
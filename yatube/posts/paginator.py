@@ -0,0 +1,193 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_ORDERING = ('-pub_date', '-id')
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values, reverse=False):
+    """Упаковывает значения ключа сортировки в непрозрачный токен."""
+
+    payload = json.dumps(
+        [int(reverse)] + [_dump_value(value) for value in values],
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    padding = '=' * (-len(token) % 4)
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + padding))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(token)
+
+    if not isinstance(payload, list) or len(payload) < 2:
+        raise InvalidCursor(token)
+
+    return bool(payload[0]), payload[1:]
+
+
+def _dump_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _load_value(field, value):
+    if field.get_internal_type() == 'DateTimeField':
+        parsed = parse_datetime(value) if isinstance(value, str) else None
+        if parsed is None:
+            raise InvalidCursor(value)
+        return parsed
+    try:
+        return field.to_python(value)
+    except Exception:
+        raise InvalidCursor(value)
+
+
+class CursorPage(Page):
+    """Страница ленты, построенная по ключу сортировки вместо OFFSET."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<Cursor page of {len(self.object_list)} items>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def next_page_number(self):
+        return self.next_cursor
+
+    def previous_page_number(self):
+        return self.previous_cursor
+
+    def start_index(self):
+        return None
+
+    def end_index(self):
+        return None
+
+
+class CursorPaginator:
+    """
+    Keyset-пагинация: каждая страница - это один индексный диапазон
+    `WHERE (pub_date, id) < (курсор) ORDER BY ... LIMIT n + 1`
+    без COUNT(*) и OFFSET, поэтому стоимость страницы не зависит от глубины.
+    """
+
+    def __init__(self, object_list, per_page, ordering=DEFAULT_ORDERING):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [
+            object_list.model._meta.get_field(name.lstrip('-'))
+            for name in self.ordering
+        ]
+
+    def get_page(self, cursor=None):
+        """Как Paginator.get_page: битый курсор открывает первую страницу."""
+
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
+
+    def page(self, cursor=None):
+        reverse, values = False, None
+
+        if cursor:
+            reverse, values = decode_cursor(cursor)
+            if len(values) != len(self.fields):
+                raise InvalidCursor(cursor)
+            values = [
+                _load_value(field, value)
+                for field, value in zip(self.fields, values)
+            ]
+
+        rows = self.fetch(values, reverse, self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                next_cursor = encode_cursor(self._key(rows[-1]))
+            if cursor and (has_more or not reverse):
+                previous_cursor = encode_cursor(
+                    self._key(rows[0]), reverse=True
+                )
+
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+    def fetch(self, values, reverse, limit):
+        """
+        Первые `limit` строк после ключа `values` в порядке чтения:
+        при движении назад - по возрастанию ключа.
+        """
+
+        queryset = self.object_list.order_by(*self.ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, reverse))
+            if reverse:
+                queryset = queryset.reverse()
+        return list(queryset[:limit])
+
+    def _key(self, obj):
+        return [getattr(obj, field.attname) for field in self.fields]
+
+    def _seek(self, values, reverse):
+        """
+        Строит условие `(a, b) < (x, y)` как
+        `a < x OR (a = x AND b < y)` с учетом направления каждого поля.
+        """
+
+        condition = Q()
+        for position, name in enumerate(self.ordering):
+            descending = name.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            step = Q(**{f'{self.fields[position].name}__{lookup}':
+                        values[position]})
+            for prev in range(position):
+                step &= Q(**{self.fields[prev].name: values[prev]})
+            condition |= step
+        return condition
+
+
+def paginate(request, object_list, per_page=None,
+             ordering=DEFAULT_ORDERING, cursor_paginator=CursorPaginator):
+    """
+    Общая пагинация лент. По умолчанию работает постраничный режим
+    `?page=N`; keyset-режим включается параметром `?cursor=` или
+    настройкой POSTS_PAGINATION = 'cursor'.
+    """
+
+    per_page = per_page or settings.POSTS_PER_PAGE
+    cursor = request.GET.get('cursor')
+    mode = getattr(settings, 'POSTS_PAGINATION', 'page')
+
+    if cursor is not None or (mode == 'cursor' and 'page' not in request.GET):
+        return cursor_paginator(
+            object_list, per_page, ordering).get_page(cursor)
+
+    return Paginator(object_list, per_page).get_page(request.GET.get('page'))
@@ -0,0 +1,320 @@
+"""
+Массовая загрузка данных для проверки производительности:
+синтетические пользователи, посты, комментарии и подписки,
+а также выгрузка и загрузка в потоковом JSON Lines (вместе с лайками).
+
+Данные пишутся bulk_create пачками, сигналы при этом не срабатывают,
+поэтому денормализованные таблицы пересчитываются в конце целиком,
+см. refresh_derived.
+"""
+
+import itertools
+import json
+import random
+import secrets
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import (
+    cards, comments, feed_cache, fulltext, likes, page_cache, stats,
+    timeline,
+)
+from .models import Comment, Follow, Group, Like, Post, User
+
+BATCH_SIZE = 5000
+
+# модели в порядке зависимостей; производные таблицы не выгружаются
+EXPORT_MODELS = (User, Group, Post, Comment, Follow, Like)
+
+WORDS = (
+    'день', 'жизнь', 'город', 'работа', 'дом', 'друг', 'книга', 'кот',
+    'собака', 'утро', 'вечер', 'море', 'лес', 'дорога', 'поезд', 'кофе',
+    'музыка', 'фильм', 'погода', 'дождь', 'снег', 'солнце', 'лето',
+    'зима', 'осень', 'весна', 'проект', 'код', 'задача', 'идея', 'новость',
+    'история', 'сегодня', 'вчера', 'завтра', 'снова', 'очень', 'просто',
+    'хороший', 'новый', 'старый', 'большой', 'маленький', 'красивый',
+    'интересный', 'быстрый', 'читать', 'писать', 'гулять', 'думать',
+    'смотреть', 'слушать', 'работать', 'учиться', 'путешествовать',
+    'программист', 'питон', 'джанго', 'база', 'данные', 'запрос', 'лента',
+    'подписка', 'комментарий', 'фотография', 'выходные', 'праздник',
+)
+
+
+def zipf_weights(count, exponent):
+    """Накопленные веса закона Ципфа: i-й по популярности ~ 1 / i^s."""
+
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Encoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder обрезает время до миллисекунд, а ключ
+    сортировки лент (pub_date, id) должен пережить выгрузку точно."""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+@contextmanager
+def keep_dates(*models):
+    """
+    bulk_create перезаписывает поля auto_now и auto_now_add текущим
+    временем; на время загрузки им разрешается сохранять переданные даты.
+    """
+
+    flags = [
+        (field, flag)
+        for model in models for field in model._meta.concrete_fields
+        for flag in ('auto_now', 'auto_now_add')
+        if getattr(field, flag, False)
+    ]
+    for field, flag in flags:
+        setattr(field, flag, False)
+    try:
+        yield
+    finally:
+        for field, flag in flags:
+            setattr(field, flag, True)
+
+
+class Seeder:
+    """
+    Генератор синтетических данных. Популярность авторов, число постов
+    у автора и внимание к постам распределены по Ципфу: немного
+    «звезд» с огромной аудиторией и длинный хвост почти без нее.
+    """
+
+    def __init__(self, seed=None, batch_size=BATCH_SIZE, exponent=1.1,
+                 days=365, log=None):
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.exponent = exponent
+        self.days = days
+        self.log = log or (lambda message: None)
+        self.run = secrets.token_hex(3)
+        self.now = timezone.now()
+        self.words = zipf_weights(len(WORDS), 1.0)
+
+    def bulk_create(self, model, objects):
+        """Вставляет объекты пачками и возвращает id созданных строк."""
+
+        last = model.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+
+        total = 0
+        with keep_dates(model):
+            for batch in batches(objects, self.batch_size):
+                with transaction.atomic():
+                    model.objects.bulk_create(batch)
+                total += len(batch)
+                self.log(f'{model._meta.label}: {total}')
+
+        return list(model.objects.filter(pk__gt=last).order_by(
+            'pk').values_list('pk', flat=True))
+
+    def pick(self, population, weights, count=1):
+        return self.random.choices(population, cum_weights=weights, k=count)
+
+    def text(self, words):
+        return ' '.join(self.random.choices(
+            WORDS, cum_weights=self.words, k=words)).capitalize()
+
+    def moment(self):
+        return self.now - timedelta(
+            seconds=self.random.randrange(self.days * 24 * 3600))
+
+    def users(self, count):
+        # готовый хеш непригодного пароля: make_password на каждого
+        # пользователя занял бы больше времени, чем вся загрузка
+        password = make_password(None)
+        return self.bulk_create(User, (
+            User(username=f'seed_{self.run}_{number}', password=password,
+                 date_joined=self.moment())
+            for number in range(count)
+        ))
+
+    def groups(self, count):
+        return self.bulk_create(Group, (
+            Group(title=f'Сообщество {self.run} {number}',
+                  slug=f'seed-{self.run}-{number}',
+                  description=self.text(12),
+                  updated_at=self.now)
+            for number in range(count)
+        ))
+
+    def posts(self, count, author_ids, group_ids=()):
+        """Посты авторов по Ципфу; примерно треть - в сообществах."""
+
+        authors = self.random.sample(author_ids, len(author_ids))
+        weights = zipf_weights(len(authors), self.exponent)
+
+        def generate():
+            for _ in range(count):
+                group_id = None
+                if group_ids and self.random.random() < 0.3:
+                    group_id = self.random.choice(group_ids)
+                moment = self.moment()
+                yield Post(text=self.text(self.random.randint(5, 60)),
+                           author_id=self.pick(authors, weights)[0],
+                           group_id=group_id,
+                           pub_date=moment,
+                           updated_at=moment)
+
+        return self.bulk_create(Post, generate())
+
+    def follows(self, user_ids, average):
+        """
+        Каждый пользователь подписывается в среднем на `average` авторов
+        (экспоненциальное распределение), выбирая их по популярности.
+        """
+
+        authors = self.random.sample(user_ids, len(user_ids))
+        weights = zipf_weights(len(authors), self.exponent)
+
+        def generate():
+            for user_id in user_ids:
+                wanted = min(round(self.random.expovariate(1 / average)),
+                             len(authors) - 1)
+                chosen = set()
+                for _ in range(wanted * 3):
+                    if len(chosen) >= wanted:
+                        break
+                    author_id = self.pick(authors, weights)[0]
+                    if author_id != user_id:
+                        chosen.add(author_id)
+                for author_id in chosen:
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        if not average or len(user_ids) < 2:
+            return []
+        return self.bulk_create(Follow, generate())
+
+    def comments(self, count, post_ids, user_ids):
+        """Комментарии достаются постам тоже неравномерно."""
+
+        posts = self.random.sample(post_ids, len(post_ids))
+        weights = zipf_weights(len(posts), self.exponent)
+
+        def generate():
+            for _ in range(count):
+                moment = self.moment()
+                yield Comment(post_id=self.pick(posts, weights)[0],
+                              author_id=self.random.choice(user_ids),
+                              text=self.text(self.random.randint(3, 25)),
+                              created=moment,
+                              updated_at=moment)
+
+        return self.bulk_create(Comment, generate())
+
+    def seed(self, users=0, groups=0, posts=0, comments=0, follows=0):
+        user_ids = self.users(users)
+        group_ids = self.groups(groups)
+        post_ids = []
+        if user_ids:
+            post_ids = self.posts(posts, user_ids, group_ids)
+            self.follows(user_ids, follows)
+        if post_ids:
+            self.comments(comments, post_ids, user_ids)
+        refresh_derived(log=self.log)
+        return {'users': user_ids, 'groups': group_ids, 'posts': post_ids}
+
+
+def refresh_comment_counts():
+    counts = Comment.objects.filter(post=OuterRef('pk')).order_by().values(
+        'post').annotate(total=Count('id')).values('total')
+    drifted = Post.objects.order_by().annotate(
+        actual=Count('comments')).exclude(
+        comment_count=F('actual')).values('pk')
+    # счетчик виден в карточке: версию поднимаем только у исправленных
+    Post.objects.filter(pk__in=drifted).update(
+        comment_count=Coalesce(
+            Subquery(counts, output_field=IntegerField()), 0),
+        **cards.changed())
+
+
+def refresh_derived(log=None):
+    """Пересчитывает все, что обычно поддерживают сигналы."""
+
+    log = log or (lambda message: None)
+    for name, step in (('счетчики пользователей', stats.rebuild_all),
+                       ('счетчики комментариев', refresh_comment_counts),
+                       ('пути комментариев', comments.fill_root_paths),
+                       ('ленты подписок', timeline.rebuild_all),
+                       ('счетчики лайков', likes.rebuild_all),
+                       ('поисковый индекс', fulltext.rebuild)):
+        log(f'пересчет: {name}')
+        step()
+    feed_cache.invalidate()
+    page_cache.invalidate(page_cache.SITE)
+
+
+def export(stream, log=None):
+    """Построчно выгружает пользователей, сообщества, посты,
+    комментарии, подписки и лайки, не загружая таблицы в память."""
+
+    log = log or (lambda message: None)
+    total = 0
+    for model in EXPORT_MODELS:
+        names = [field.attname for field in model._meta.concrete_fields]
+        rows = model.objects.order_by('pk').values_list(*names)
+        for row in rows.iterator():
+            stream.write(json.dumps(
+                {'model': model._meta.label_lower,
+                 'fields': dict(zip(names, row))},
+                cls=Encoder, ensure_ascii=False,
+            ) + '\n')
+            total += 1
+        log(f'{model._meta.label}: выгружено')
+    return total
+
+
+def load(stream, batch_size=BATCH_SIZE, log=None):
+    """
+    Загружает выгрузку export пачками bulk_create с исходными id.
+    Строки одной модели должны идти подряд, как их пишет export.
+    """
+
+    log = log or (lambda message: None)
+
+    def parse(line):
+        record = json.loads(line)
+        return apps.get_model(record['model']), record['fields']
+
+    records = (parse(line) for line in stream if line.strip())
+    total = 0
+    for model, group in itertools.groupby(records, key=lambda r: r[0]):
+        fields = {field.attname: field
+                  for field in model._meta.concrete_fields}
+        objects = (
+            model(**{name: fields[name].to_python(value)
+                     for name, value in values.items()})
+            for _, values in group
+        )
+        with keep_dates(model):
+            for batch in batches(objects, batch_size):
+                with transaction.atomic():
+                    model.objects.bulk_create(batch)
+                total += len(batch)
+                log(f'{model._meta.label}: {total}')
+
+    refresh_derived(log=log)
+    return total
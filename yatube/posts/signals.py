@@ -0,0 +1,204 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import (
+    cards, comments, feed_cache, fulltext, likes, page_cache, stats,
+    timeline
+)
+from .models import Comment, Follow, Group, Like, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_counted(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.bump(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def post_uncounted(sender, instance, **kwargs):
+    stats.bump(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_counted(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.bump(instance.author_id, followers_count=1)
+        stats.bump(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_uncounted(sender, instance, **kwargs):
+    stats.bump(instance.author_id, followers_count=-1)
+    stats.bump(instance.user_id, following_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_path_assigned(sender, instance, created, raw=False, **kwargs):
+    # путь включает собственный id, который известен только после INSERT
+    if created and not raw and not instance.path:
+        instance.path = comments.make_path(instance, instance.parent)
+        Comment.objects.filter(pk=instance.pk).update(path=instance.path)
+
+
+@receiver(post_save, sender=Comment)
+def comment_counted(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1, **cards.changed())
+
+
+@receiver(post_delete, sender=Comment)
+def comment_uncounted(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id).update(
+        comment_count=Greatest(F('comment_count') - 1, 0), **cards.changed())
+
+
+@receiver(post_save, sender=Like)
+def like_counted(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        likes.bump(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Like)
+def like_uncounted(sender, instance, **kwargs):
+    likes.bump(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    timeline.trim(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def post_indexed(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and 'text' not in update_fields):
+        return
+    fulltext.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_unindexed(sender, instance, **kwargs):
+    fulltext.remove_post(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    feed_cache.deleted()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def feed_changed(sender, **kwargs):
+    feed_cache.invalidate()
+
+
+@receiver(post_save, sender=Post)
+def post_card_changed(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        cards.bump(pk=instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def group_cards_changed(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        cards.bump(group=instance)
+
+
+@receiver(pre_delete, sender=Group)
+def group_cards_removed(sender, instance, **kwargs):
+    # после удаления у постов обнулится group_id, искать будет нечего
+    cards.bump(group=instance)
+
+
+@receiver(post_save, sender=User)
+def author_cards_changed(sender, instance, created, raw=False,
+                         update_fields=None, **kwargs):
+    # вход сохраняет только last_login, карточки от него не меняются
+    if created or raw or (update_fields and 'username' not in update_fields):
+        return
+    cards.bump(author=instance)
+
+
+@receiver(pre_save, sender=Post)
+def post_group_remembered(sender, instance, raw=False, update_fields=None,
+                          **kwargs):
+    # страница прежнего сообщества тоже меняется, если пост перенесли
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and 'group' not in update_fields:
+        return
+    instance._previous_group = Group.objects.filter(
+        posts=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_pages_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    tags = page_cache.post_tags(instance)
+    previous = getattr(instance, '_previous_group', None)
+    if previous:
+        tags.append(f'group:{previous}')
+    page_cache.invalidate(*tags)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_pages_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=instance.post_id).first()
+    if post is not None:
+        page_cache.invalidate(*page_cache.post_tags(post))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_pages_changed(sender, instance, raw=False, **kwargs):
+    # счетчики подписок видны в карточках обоих пользователей
+    if not raw:
+        page_cache.invalidate(f'author:{instance.author.username}',
+                              f'author:{instance.user.username}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_pages_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        page_cache.invalidate(page_cache.SITE)
+
+
+@receiver(post_save, sender=User)
+def user_pages_changed(sender, instance, created, raw=False,
+                       update_fields=None, **kwargs):
+    if created or raw or (update_fields and 'username' not in update_fields):
+        return
+    page_cache.invalidate(page_cache.SITE)
@@ -0,0 +1,69 @@
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from . import page_cache
+from .models import Follow, Post, User, UserStats
+
+
+def compute(user_id):
+    return {
+        'posts_count': Post.objects.filter(author_id=user_id).count(),
+        'followers_count': Follow.objects.filter(author_id=user_id).count(),
+        'following_count': Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def rebuild(user_id):
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id, defaults=compute(user_id))
+    return stats
+
+
+def rebuild_all():
+    """
+    Пересчитывает счетчики всех пользователей тремя GROUP BY
+    вместо запросов на каждого, например после массовой загрузки.
+    """
+
+    def counts(queryset, field):
+        return dict(queryset.order_by().values_list(field).annotate(
+            total=Count('id')))
+
+    posts = counts(Post.objects, 'author_id')
+    followers = counts(Follow.objects, 'author_id')
+    following = counts(Follow.objects, 'user_id')
+
+    with transaction.atomic():
+        UserStats.objects.all().delete()
+        UserStats.objects.bulk_create(
+            (UserStats(user_id=user_id,
+                       posts_count=posts.get(user_id, 0),
+                       followers_count=followers.get(user_id, 0),
+                       following_count=following.get(user_id, 0))
+             for user_id in User.objects.values_list('id', flat=True)
+             .iterator()),
+        )
+    # счетчики видны в карточке автора на его страницах
+    page_cache.invalidate(page_cache.SITE)
+
+
+def get_stats(user):
+    """Счетчики автора одним запросом по первичному ключу."""
+
+    stats = UserStats.objects.filter(pk=user.pk).first()
+    if stats is None:
+        stats = rebuild(user.pk)
+    return stats
+
+
+def bump(user_id, **deltas):
+    """
+    Атомарно сдвигает счетчики пользователя: UPDATE ... SET x = x + 1.
+    Если строки еще нет, она будет посчитана при первом чтении.
+    """
+
+    UserStats.objects.filter(user_id=user_id).update(**{
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
@@ -0,0 +1,148 @@
+"""
+Стеммер Портера (Snowball) для русского языка.
+
+Окончания перечислены как в описании алгоритма на snowballstem.org;
+слова не на кириллице возвращаются без изменений.
+"""
+
+import re
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+
+
+def _by_length(*endings):
+    """Самые длинные окончания проверяются первыми."""
+
+    return tuple(sorted(endings, key=len, reverse=True))
+
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+
+REFLEXIVE = _by_length('ся', 'сь')
+
+ADJECTIVE = _by_length(
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+
+NOUN = _by_length(
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+)
+
+SUPERLATIVE = _by_length('ейше', 'ейш')
+
+DERIVATIONAL = _by_length('ость', 'ост')
+
+CYRILLIC = re.compile('^[а-я]+$')
+
+
+def _longest(word, endings):
+    for ending in endings:
+        if word.endswith(ending):
+            return ending
+    return None
+
+
+def _strip(word, endings):
+    """Отрезает самое длинное из окончаний, если оно есть."""
+
+    ending = _longest(word, endings)
+    if ending is None:
+        return word, False
+    return word[:-len(ending)], True
+
+
+def _strip_grouped(word, groups):
+    """
+    Окончания первой группы отрезаются, только если перед ними стоит
+    «а» или «я», второй - всегда.
+    """
+
+    first, second = groups
+    candidates = [
+        ending for ending in first
+        if word.endswith(ending) and word[:-len(ending)][-1:] in ('а', 'я')
+    ]
+    candidates += [ending for ending in second if word.endswith(ending)]
+    if not candidates:
+        return word, False
+    return word[:-len(max(candidates, key=len))], True
+
+
+def _region(word):
+    """Позиция, с которой начинается область после первой гласной с
+    последующей согласной (R1/R2 в терминах алгоритма)."""
+
+    for index in range(1, len(word)):
+        if word[index - 1] in VOWELS and word[index] not in VOWELS:
+            return index + 1
+    return len(word)
+
+
+@lru_cache(maxsize=65536)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC.match(word):
+        return word
+
+    rv_start = next(
+        (index + 1 for index, char in enumerate(word) if char in VOWELS),
+        len(word),
+    )
+    r1 = _region(word)
+    r2 = r1 + _region(word[r1:])
+
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # шаг 1
+    rv, found = _strip_grouped(rv, PERFECTIVE_GERUND)
+    if not found:
+        rv, _ = _strip(rv, REFLEXIVE)
+        rv, found = _strip(rv, ADJECTIVE)
+        if found:
+            rv, _ = _strip_grouped(rv, PARTICIPLE)
+        else:
+            rv, found = _strip_grouped(rv, VERB)
+            if not found:
+                rv, _ = _strip(rv, NOUN)
+
+    # шаг 2
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    # шаг 3: словообразовательное окончание в R2
+    ending = _longest(rv, DERIVATIONAL)
+    if ending and rv_start + len(rv) - len(ending) >= r2:
+        rv = rv[:-len(ending)]
+
+    # шаг 4
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        rv, found = _strip(rv, SUPERLATIVE)
+        if found and rv.endswith('нн'):
+            rv = rv[:-1]
+        elif not found and rv.endswith('ь'):
+            rv = rv[:-1]
+
+    return prefix + rv
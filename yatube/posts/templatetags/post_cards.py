@@ -0,0 +1,30 @@
+from django import template
+
+from posts import cards
+
+
+register = template.Library()
+
+
+def _csrf_token(context):
+    # токен формы лайка нужен только вошедшим: у анонима он поставил бы
+    # cookie, и страница не попала бы в posts.page_cache
+    user = context.get('user')
+    if user is None or not user.is_authenticated:
+        return None
+    token = context.get('csrf_token')
+    return str(token) if token else None
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts, full=False):
+    """Карточки постов из общего кеша, см. posts.cards."""
+
+    return cards.render(posts, context.get('user'), full,
+                        _csrf_token(context))
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post, full=False):
+    return cards.render([post], context.get('user'), full,
+                        _csrf_token(context))
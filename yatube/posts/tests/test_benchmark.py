@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+
+from posts import benchmark
+from posts.models import Post
+
+
+class CompareTests(TestCase):
+    baseline = {'1000': {'index': {'best_ms': 10.0, 'p90_ms': 20.0,
+                                   'queries': 4, 'peak_kb': 300.0}}}
+
+    def results(self, **metrics):
+        return {'1000': {'index': {**self.baseline['1000']['index'],
+                                   **metrics}}}
+
+    def test_within_threshold(self):
+        """Рост в пределах допуска регрессией не считается."""
+
+        results = self.results(best_ms=12.0, p90_ms=40.0, peak_kb=350.0)
+
+        self.assertEqual(benchmark.compare(results, self.baseline, 0.25), [])
+
+    def test_latency_regression(self):
+        results = self.results(best_ms=13.0)
+
+        self.assertEqual(benchmark.compare(results, self.baseline, 0.25),
+                         ['1000/index: best_ms 10.0 -> 13.0'])
+
+    def test_any_extra_query_is_regression(self):
+        results = self.results(queries=5)
+
+        self.assertEqual(benchmark.compare(results, self.baseline, 0.25),
+                         ['1000/index: queries 4 -> 5'])
+
+    def test_unknown_scale_is_skipped(self):
+        results = {'5000': self.results(best_ms=100.0)['1000']}
+
+        self.assertEqual(benchmark.compare(results, self.baseline, 0.25), [])
+
+
+class RunTests(TestCase):
+    def test_isolated_cache(self):
+        """Замер сбрасывает и наполняет свой кеш, а не кеш сайта."""
+
+        cache.set('posts:benchmark:site', 'страница сайта')
+        with benchmark.isolated_cache():
+            cache.clear()
+            cache.set('posts:benchmark:site', 'страница замера')
+
+        self.assertEqual(cache.get('posts:benchmark:site'), 'страница сайта')
+
+    def test_measures_every_view(self):
+        """Замер проходит по всем представлениям и собирает метрики."""
+
+        benchmark.seed_scale(60, seed=1)
+        results = benchmark.run(repeat=2)
+
+        self.assertEqual(set(results), {
+            'index', 'group_posts', 'profile', 'post_view', 'follow_index',
+            'add_comment', 'new_post'})
+        for view, metrics in results.items():
+            with self.subTest(view=view):
+                self.assertGreater(metrics['queries'], 0)
+                self.assertGreater(metrics['peak_kb'], 0)
+                self.assertLessEqual(metrics['best_ms'], metrics['p99_ms'])
+
+
+class WriteBenchmarkTests(TransactionTestCase):
+    def test_measures_write_throughput(self):
+        """Писатели в отдельных потоках видят данные и пишут без ошибок."""
+
+        benchmark.seed_scale(30, seed=1)
+        posts = Post.objects.count()
+
+        result = benchmark.measure_writes(
+            benchmark.sqlite_profiles()['tuned'], writers=1, requests=4)
+
+        self.assertEqual(result['errors'], 0)
+        self.assertGreater(result['writes_per_s'], 0)
+        self.assertEqual(Post.objects.count(), posts + 2)
@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts import cards
+from posts.models import Comment, Group, Post
+
+
+User = get_user_model()
+
+
+class PostCardTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ivan')
+        cls.reader = User.objects.create_user(username='petr')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок группы',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст поста',
+            author=cls.author,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def version(self):
+        return Post.objects.get(pk=self.post.pk).version
+
+    def test_card_is_shared_between_readers(self):
+        """Карточка рисуется один раз, кнопку правки видит только автор."""
+
+        address = reverse('posts:index')
+        response = self.reader_client.get(address)
+        self.assertNotContains(response, 'Редактировать')
+        self.assertNotContains(response, '<!--edit:')
+
+        card = cache.get(cards.key(self.post.pk, self.version()))
+        self.assertIn('Редактировать', card)
+
+        with self.assertTemplateNotUsed('includes/post_item.html'):
+            response = self.author_client.get(address)
+        self.assertContains(response, 'Редактировать', count=1)
+
+    def test_post_view_card_is_separate(self):
+        address = reverse('posts:post', kwargs={
+            'username': self.author.username, 'post_id': self.post.pk})
+        self.reader_client.get(address)
+
+        self.assertIsNotNone(
+            cache.get(cards.key(self.post.pk, self.version(), full=True)))
+        self.assertIsNone(cache.get(cards.key(self.post.pk, self.version())))
+
+    def test_changes_bump_version(self):
+        """Правка поста, комментарии и группа поднимают версию карточки."""
+
+        def edit():
+            post = Post.objects.get(pk=self.post.pk)
+            post.text = 'Новый текст'
+            post.save()
+
+        def comment():
+            return Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий')
+
+        def rename_group():
+            group = Group.objects.get(pk=self.group.pk)
+            group.title = 'Новое название'
+            group.save()
+
+        def rename_author():
+            author = User.objects.get(pk=self.author.pk)
+            author.username = 'ivan_new'
+            author.save()
+
+        events = {
+            'edit': edit,
+            'comment': comment,
+            'uncomment': lambda: comment().delete(),
+            'group': rename_group,
+            'author': rename_author,
+        }
+        for event, action in events.items():
+            with self.subTest(event=event):
+                before = self.version()
+                action()
+                self.assertGreater(self.version(), before)
+
+    def test_login_keeps_version(self):
+        before = self.version()
+
+        Client().force_login(self.author)
+
+        self.assertEqual(self.version(), before)
+
+    def test_comment_refreshes_cached_card(self):
+        address = reverse('posts:index')
+        self.reader_client.get(address)
+
+        self.reader_client.post(
+            reverse('posts:add_comment', kwargs={
+                'username': self.author.username, 'post_id': self.post.pk}),
+            {'text': 'Комментарий'})
+
+        self.assertContains(self.reader_client.get(address),
+                            'Комментариев: 1')
+
+    def test_personalize(self):
+        html = (f'a<!--edit:{self.author.pk}-->кнопка<!--/edit-->'
+                f'b<!--edit:{self.reader.pk}-->чужая<!--/edit-->')
+
+        self.assertEqual(cards.personalize(html, self.author), 'aкнопкаb')
+        self.assertEqual(cards.personalize(html, None), 'ab')
@@ -0,0 +1,109 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts import seed
+from posts.models import Comment, Post
+
+
+User = get_user_model()
+
+
+class CommentCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ivan')
+        cls.post = Post.objects.create(text='Тестовый текст поста',
+                                       author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def comment_count(self):
+        return Post.objects.get(pk=self.post.pk).comment_count
+
+    def test_add_comment_increments_counter(self):
+        """add_comment увеличивает счетчик комментариев поста."""
+
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={
+                'username': self.author.username,
+                'post_id': self.post.id}),
+            data={'text': 'Тестовый комментарий'},
+        )
+
+        self.assertEqual(self.comment_count(), 1)
+
+    def test_comment_delete_decrements_counter(self):
+        """Удаление комментария уменьшает счетчик."""
+
+        comment = Comment.objects.create(post=self.post, author=self.author,
+                                         text='Тестовый комментарий')
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Второй комментарий')
+        comment.delete()
+
+        self.assertEqual(self.comment_count(), 1)
+
+    def test_post_edit_keeps_counter(self):
+        """Редактирование поста не затирает счетчик."""
+
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Тестовый комментарий')
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={
+                'username': self.author.username,
+                'post_id': self.post.id}),
+            data={'text': 'Новый текст поста'},
+        )
+
+        self.assertEqual(self.comment_count(), 1)
+
+    def test_reconcile_command(self):
+        """Команда reconcile_comment_counts исправляет расхождения."""
+
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Тестовый комментарий')
+        Post.objects.filter(pk=self.post.pk).update(comment_count=5)
+
+        call_command('reconcile_comment_counts', stdout=StringIO())
+
+        self.assertEqual(self.comment_count(), 1)
+
+    def test_reconcile_command_refreshes_pages(self):
+        """Исправленный счетчик сразу виден на закешированных страницах."""
+
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Тестовый комментарий')
+        Post.objects.filter(pk=self.post.pk).update(comment_count=777)
+        self.assertContains(self.client.get(reverse('posts:index')),
+                            'Комментариев: 777')
+
+        call_command('reconcile_comment_counts', stdout=StringIO())
+
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Комментариев: 777')
+        self.assertContains(response, 'Комментариев: 1')
+
+    def test_seed_refresh_bumps_card_version(self):
+        """Пересчет после загрузки поднимает версию исправленных постов."""
+
+        other = Post.objects.create(text='Другой пост', author=self.author)
+        Post.objects.filter(pk=self.post.pk).update(comment_count=5)
+        version = Post.objects.get(pk=self.post.pk).version
+        other_version = Post.objects.get(pk=other.pk).version
+
+        seed.refresh_comment_counts()
+
+        self.assertEqual(self.comment_count(), 0)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).version,
+                         version + 1)
+        self.assertEqual(Post.objects.get(pk=other.pk).version,
+                         other_version)
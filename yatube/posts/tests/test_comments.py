@@ -0,0 +1,203 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import comments
+from posts.models import Comment, Post
+
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_PER_PAGE=5)
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ivan')
+        cls.post = Post.objects.create(text='Тестовый текст поста',
+                                       author=cls.author)
+        for i in range(12):
+            reader = User.objects.create_user(username=f'reader{i}')
+            Comment.objects.create(post=cls.post, author=reader,
+                                   text=f'Комментарий {i}')
+        kwargs = {'username': 'ivan', 'post_id': cls.post.pk}
+        cls.post_address = reverse('posts:post', kwargs=kwargs)
+        cls.comments_address = reverse('posts:post_comments', kwargs=kwargs)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def texts(self, page):
+        return [comment.text for comment in page]
+
+    def test_post_page_shows_first_comments(self):
+        response = self.guest_client.get(self.post_address)
+
+        page = response.context['comments']
+        self.assertEqual(self.texts(page),
+                         [f'Комментарий {i}' for i in range(11, 6, -1)])
+        self.assertNotContains(response, 'Комментарий 6<')
+        self.assertContains(
+            response, f'{self.comments_address}?cursor={page.next_cursor}')
+
+    def test_queries_do_not_grow_with_comments(self):
+        """Авторы комментариев приходят тем же запросом, что и сами они."""
+
+        def count():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.guest_client.get(self.post_address)
+            return len(queries)
+
+        before = count()
+        for i in range(10):
+            Comment.objects.create(post=self.post, author=self.author,
+                                   text=f'Новый {i}')
+
+        self.assertEqual(count(), before)
+
+    def test_fragment_loads_following_pages(self):
+        cursor = self.guest_client.get(
+            self.post_address).context['comments'].next_cursor
+
+        seen = []
+        while cursor:
+            response = self.guest_client.get(
+                f'{self.comments_address}?cursor={cursor}')
+            self.assertEqual(response.status_code, 200)
+            self.assertTemplateNotUsed(response, 'base.html')
+            page = response.context['comments']
+            seen += self.texts(page)
+            cursor = page.next_cursor
+
+        self.assertEqual(seen, [f'Комментарий {i}' for i in range(6, -1, -1)])
+        self.assertNotContains(response, 'comments-more')
+
+    def test_fragment_of_missing_post(self):
+        address = reverse('posts:post_comments', kwargs={
+            'username': 'reader0', 'post_id': self.post.pk})
+
+        self.assertEqual(self.guest_client.get(address).status_code, 404)
+
+    def test_new_comment_refreshes_cached_fragment(self):
+        self.guest_client.get(self.comments_address)
+
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Свежий комментарий')
+
+        self.assertContains(self.guest_client.get(self.comments_address),
+                            'Свежий комментарий')
+
+
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ivan')
+        cls.reader = User.objects.create_user(username='petr')
+        cls.post = Post.objects.create(text='Тестовый текст поста',
+                                       author=cls.author)
+        cls.other_post = Post.objects.create(text='Другой пост',
+                                             author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def comment(self, text, parent=None, post=None):
+        return Comment.objects.create(post=post or self.post,
+                                      author=self.reader, text=text,
+                                      parent=parent)
+
+    def reply_address(self, comment):
+        return reverse('posts:add_reply', kwargs={
+            'username': 'ivan', 'post_id': comment.post_id,
+            'comment_id': comment.pk})
+
+    def test_path_extends_parent_path(self):
+        root = self.comment('Корень')
+        reply = self.comment('Ответ', parent=root)
+
+        self.assertEqual(root.path, f'{root.pk:010d}/')
+        self.assertEqual(Comment.objects.get(pk=reply.pk).path,
+                         f'{root.pk:010d}/{reply.pk:010d}/')
+        self.assertEqual(comments.depth(reply), 1)
+
+    def test_threads_in_depth_first_order(self):
+        first = self.comment('Первый')
+        second = self.comment('Второй')
+        answer = self.comment('Ответ на первый', parent=first)
+        self.comment('Ответ на ответ', parent=answer)
+        self.comment('Еще ответ на первый', parent=first)
+        self.comment('Ответ на второй', parent=second)
+
+        with self.assertNumQueries(2):
+            page = comments.get_page(self.post.pk)
+            rows = [(comment.text, comment.depth) for comment in page]
+
+        self.assertEqual(rows, [
+            ('Второй', 0),
+            ('Ответ на второй', 1),
+            ('Первый', 0),
+            ('Ответ на первый', 1),
+            ('Ответ на ответ', 2),
+            ('Еще ответ на первый', 1),
+        ])
+
+    @override_settings(COMMENTS_PER_PAGE=1)
+    def test_pages_count_threads(self):
+        old = self.comment('Старая ветка')
+        self.comment('Ответ в старой ветке', parent=old)
+        new = self.comment('Новая ветка')
+        self.comment('Ответ в новой ветке', parent=new)
+
+        first = comments.get_page(self.post.pk)
+        second = comments.get_page(self.post.pk, first.next_cursor)
+
+        self.assertEqual([comment.text for comment in first],
+                         ['Новая ветка', 'Ответ в новой ветке'])
+        self.assertEqual([comment.text for comment in second],
+                         ['Старая ветка', 'Ответ в старой ветке'])
+
+    def test_reply_endpoint(self):
+        root = self.comment('Корень')
+
+        response = self.authorized_client.post(self.reply_address(root),
+                                               {'text': 'Ответ'})
+
+        self.assertRedirects(response, reverse('posts:post', kwargs={
+            'username': 'ivan', 'post_id': self.post.pk}))
+        reply = Comment.objects.get(text='Ответ')
+        self.assertEqual(reply.parent, root)
+        self.assertTrue(reply.path.startswith(root.path))
+        self.assertContains(
+            self.authorized_client.get(response.url), self.reply_address(root))
+
+    def test_reply_to_comment_of_other_post(self):
+        alien = self.comment('Чужой', post=self.other_post)
+        address = reverse('posts:add_reply', kwargs={
+            'username': 'ivan', 'post_id': self.post.pk,
+            'comment_id': alien.pk})
+
+        response = self.authorized_client.post(address, {'text': 'Ответ'})
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Comment.objects.filter(text='Ответ').exists())
+
+    def test_depth_is_limited(self):
+        parent = self.comment('Корень')
+        for level in range(comments.MAX_DEPTH):
+            parent = self.comment(f'Уровень {level + 1}', parent=parent)
+
+        self.authorized_client.post(self.reply_address(parent),
+                                    {'text': 'Слишком глубоко'})
+
+        reply = Comment.objects.get(text='Слишком глубоко')
+        self.assertEqual(reply.parent_id, parent.parent_id)
+        self.assertEqual(comments.depth(reply), comments.MAX_DEPTH)
@@ -0,0 +1,171 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import feed_cache, page_cache
+from posts.models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ivan')
+        cls.reader = User.objects.create_user(username='petr')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок группы',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст поста',
+            author=cls.author,
+            group=cls.group,
+        )
+        cls.addresses = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            'profile': reverse('posts:profile', kwargs={'username': 'ivan'}),
+            'post': reverse('posts:post', kwargs={
+                'username': 'ivan', 'post_id': cls.post.pk}),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def age(self):
+        """Last-Modified точен до секунды: все прошлое отодвигается на час."""
+
+        hour_ago = timezone.now() - timedelta(hours=1)
+        Post.objects.update(updated_at=hour_ago)
+        Group.objects.update(updated_at=hour_ago)
+        cache.set(feed_cache.CHANGED_KEY, hour_ago, None)
+        cache.set(feed_cache.DELETED_KEY, hour_ago, None)
+        tags = [page_cache.SITE, 'index', 'group:test_slug', 'author:ivan',
+                'author:petr', f'post:{self.post.pk}']
+        cache.set_many({page_cache._changed_key(tag): hour_ago
+                        for tag in tags}, None)
+
+    def revalidate(self, address, response, client=None):
+        return (client or self.guest_client).get(
+            address,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+
+    def test_not_modified_without_rendering(self):
+        """Повторный запрос с ETag получает 304 без отрисовки шаблона."""
+
+        for name, address in self.addresses.items():
+            with self.subTest(page=name):
+                response = self.guest_client.get(address)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('no-cache', response['Cache-Control'])
+
+                with self.assertTemplateNotUsed('base.html'):
+                    response = self.revalidate(address, response)
+                self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since(self):
+        for name, address in self.addresses.items():
+            with self.subTest(page=name):
+                response = self.guest_client.get(address)
+                response = self.guest_client.get(
+                    address,
+                    HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(response.status_code, 304)
+
+    def test_changes_modify_pages(self):
+        """Правка поста и новый комментарий меняют все страницы с ним."""
+
+        def edit():
+            post = Post.objects.get(pk=self.post.pk)
+            post.text = 'Новый текст'
+            post.save()
+
+        events = {
+            'edit': edit,
+            'comment': lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'),
+        }
+        for event, action in events.items():
+            responses = {name: self.guest_client.get(address)
+                         for name, address in self.addresses.items()}
+            action()
+            for name, address in self.addresses.items():
+                with self.subTest(event=event, page=name):
+                    response = self.revalidate(address, responses[name])
+                    self.assertEqual(response.status_code, 200)
+
+    def test_deleted_post_modifies_feeds(self):
+        """Удаленный пост не оставляет ленту «свежей» по Last-Modified."""
+
+        other = Post.objects.create(text='Лишний пост', author=self.author,
+                                    group=self.group)
+        self.age()
+        responses = {name: self.guest_client.get(address)
+                     for name, address in self.addresses.items()}
+
+        other.delete()
+
+        for name in ('index', 'group', 'profile'):
+            with self.subTest(page=name):
+                response = self.guest_client.get(
+                    self.addresses[name],
+                    HTTP_IF_MODIFIED_SINCE=responses[name]['Last-Modified'])
+                self.assertEqual(response.status_code, 200)
+
+    def test_page_changes_modify_last_modified(self):
+        """Перенос поста меняет Last-Modified прежнего сообщества,
+        подписка - страниц с карточкой автора."""
+
+        def move():
+            post = Post.objects.get(pk=self.post.pk)
+            post.group = None
+            post.save()
+
+        events = {
+            'move': (move, ('group',)),
+            'follow': (lambda: Follow.objects.create(
+                user=self.reader, author=self.author), ('profile', 'post')),
+        }
+        for event, (action, pages) in events.items():
+            self.age()
+            responses = {name: self.guest_client.get(self.addresses[name])
+                         for name in pages}
+            action()
+            for name in pages:
+                with self.subTest(event=event, page=name):
+                    response = self.guest_client.get(
+                        self.addresses[name],
+                        HTTP_IF_MODIFIED_SINCE=responses[name][
+                            'Last-Modified'])
+                    self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_reader(self):
+        address = self.addresses['post']
+        guest_response = self.guest_client.get(address)
+
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        response = reader_client.get(address,
+                                     HTTP_IF_NONE_MATCH=guest_response['ETag'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.revalidate(address, response, reader_client).status_code,
+            304)
+
+    def test_missing_page_is_still_404(self):
+        address = reverse('posts:post', kwargs={
+            'username': 'ivan', 'post_id': self.post.pk + 100})
+
+        self.assertEqual(self.guest_client.get(address).status_code, 404)
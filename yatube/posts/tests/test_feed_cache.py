@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts import feed_cache
+from posts.models import Comment, Group, Post
+
+
+User = get_user_model()
+
+
+# страницы целиком для анонимов кеширует posts.page_cache,
+# здесь проверяется слой под ним
+@override_settings(POSTS_PAGE_CACHE_TIMEOUT=0)
+class FeedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ivan')
+        cls.admin = User.objects.create_user(username='admin',
+                                             is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок группы',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+        for i in range(12):
+            cls.post = Post.objects.create(
+                text=f'Тестовый текст поста {i}',
+                author=cls.author,
+                group=cls.group,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_cached_page_skips_database(self):
+        """Повторный запрос ленты не обращается к таблице постов."""
+
+        self.guest_client.get(reverse('posts:index'))
+
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(reverse('posts:index'))
+
+        self.assertContains(response, 'Тестовый текст поста 11')
+        self.assertEqual(feed_cache.stats()['hits'], 1)
+        self.assertEqual(feed_cache.stats()['misses'], 1)
+
+    def test_cached_page_keeps_pagination(self):
+        """Закешированная страница сохраняет номер и число страниц."""
+
+        address = reverse('posts:index') + '?page=2'
+        self.guest_client.get(address)
+        page = self.guest_client.get(address).context['page']
+
+        self.assertEqual(page.number, 2)
+        self.assertEqual(page.paginator.num_pages, 2)
+        self.assertEqual(len(page), 2)
+
+    def test_events_invalidate_feed(self):
+        """Изменения постов, комментариев и групп сбрасывают кеш лент."""
+
+        events = {
+            'post': lambda: Post.objects.create(text='Новый пост',
+                                                author=self.author),
+            'comment': lambda: Comment.objects.create(
+                post=self.post, author=self.author, text='Комментарий'),
+            'group': lambda: Group.objects.filter(pk=self.group.pk)
+            .first().save(),
+            'delete': lambda: Post.objects.first().delete(),
+        }
+
+        for event, action in events.items():
+            with self.subTest(event=event):
+                before = feed_cache.version()
+                action()
+                self.assertNotEqual(feed_cache.version(), before)
+
+    def test_stats_endpoint_for_staff_only(self):
+        """Счетчики кеша доступны только персоналу."""
+
+        address = reverse('posts:feed_cache_stats')
+        response = self.guest_client.get(address)
+        self.assertEqual(response.status_code, 302)
+
+        self.guest_client.force_login(self.admin)
+        response = self.guest_client.get(address)
+        self.assertEqual(set(response.json()),
+                         {'version', 'hits', 'misses', 'hit_rate'})
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+class FeedQueryCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='oleg')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок группы',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+
+        cls.author = User.objects.create_user(username='ivan')
+        for i in range(10):
+            post = Post.objects.create(text=f'Пост автора {i}',
+                                       author=cls.author)
+            Comment.objects.create(post=post, author=cls.user,
+                                   text='Комментарий')
+
+        for i in range(20):
+            author = User.objects.create_user(username=f'author_{i}')
+            Follow.objects.create(user=cls.user, author=author)
+            post = Post.objects.create(
+                text=f'Тестовый текст поста {i}',
+                author=author,
+                group=cls.group,
+            )
+            Comment.objects.create(post=post, author=cls.user,
+                                   text='Комментарий')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def count_queries(self, address, per_page):
+        cache.clear()
+        with override_settings(POSTS_PER_PAGE=per_page):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.authorized_client.get(address)
+        self.assertEqual(len(response.context['page']), per_page)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        """Число запросов к базе не растет с числом постов на странице."""
+
+        addresses = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:follow_index'),
+        )
+
+        for address in addresses:
+            with self.subTest(address=address):
+                self.assertEqual(
+                    self.count_queries(address, 2),
+                    self.count_queries(address, 10),
+                )
+
+    def test_feed_shows_comment_count(self):
+        """Число комментариев в карточке берется из поля поста."""
+
+        cache.clear()
+        response = self.authorized_client.get(reverse('posts:index'))
+
+        self.assertEqual(response.context['page'][0].comment_count, 1)
+        self.assertContains(response, 'Комментариев: 1')
@@ -1,3 +1,4 @@
+import os
 import shutil
 import tempfile
 
@@ -62,6 +63,8 @@ class PostFormTests(TestCase):
         )
 
         settings.MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        settings.THUMBNAIL_KVSTORE_PATH = os.path.join(settings.MEDIA_ROOT,
+                                                       'kvstore.sqlite3')
 
     @classmethod
     def tearDownClass(cls):
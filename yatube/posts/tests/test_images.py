@@ -0,0 +1,121 @@
+import io
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from posts import images
+from posts.forms import PostForm
+
+
+def make_jpeg(size=(3000, 1500), orientation=None):
+    image = Image.new('RGB', size, 'red')
+    exif = Image.Exif()
+    exif[0x010F] = 'Тестовая камера'
+    if orientation:
+        exif[0x0112] = orientation
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', exif=exif.tobytes())
+    return SimpleUploadedFile('photo.jpg', buffer.getvalue(),
+                              content_type='image/jpeg')
+
+
+def make_gif(frames=3):
+    frames = [Image.new('P', (50, 50), index) for index in range(frames)]
+    buffer = io.BytesIO()
+    frames[0].save(buffer, format='GIF', save_all=True,
+                   append_images=frames[1:])
+    return SimpleUploadedFile('animation.gif', buffer.getvalue(),
+                              content_type='image/gif')
+
+
+def make_mpo(size=(3000, 1500)):
+    exif = Image.Exif()
+    exif[0x8825] = {0x0001: 'N'}
+    first = Image.new('RGB', size, 'red')
+    second = Image.new('RGB', size, 'blue')
+
+    buffer = io.BytesIO()
+    first.save(buffer, format='MPO', save_all=True,
+               append_images=[second], exif=exif.tobytes())
+    return SimpleUploadedFile('photo.jpg', buffer.getvalue(),
+                              content_type='image/jpeg')
+
+
+@override_settings(POSTS_IMAGE_MAX_DIMENSION=1000)
+class ImageNormalizationTests(TestCase):
+    def open(self, upload):
+        upload.seek(0)
+        return Image.open(upload)
+
+    def test_large_image_is_downscaled(self):
+        """Большая картинка уменьшается до максимального размера."""
+
+        upload = images.normalize(make_jpeg())
+
+        self.assertEqual(upload.name, 'photo.jpg')
+        with self.open(upload) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (1000, 500))
+
+    def test_metadata_is_stripped(self):
+        """EXIF не попадает в сохраненный файл, поворот применяется."""
+
+        upload = images.normalize(make_jpeg((400, 200), orientation=6))
+
+        with self.open(upload) as image:
+            self.assertEqual(len(image.getexif()), 0)
+            self.assertEqual(image.size, (200, 400))
+
+    @override_settings(POSTS_IMAGE_MAX_PIXELS=1000)
+    def test_decompression_bomb_is_rejected(self):
+        """Картинка с огромным числом пикселей отклоняется до декодирования."""
+
+        with self.assertRaises(ValidationError):
+            images.normalize(make_jpeg())
+
+    @override_settings(POSTS_IMAGE_MAX_BYTES=100)
+    def test_byte_cap(self):
+        """Картинка, не влезающая в лимит байт, отклоняется."""
+
+        with self.assertRaises(ValidationError):
+            images.normalize(make_jpeg((400, 200)))
+
+    @override_settings(POSTS_IMAGE_MAX_PIXELS=1000)
+    def test_form_reports_error(self):
+        """Форма поста показывает ошибку у поля картинки."""
+
+        form = PostForm(data={'text': 'Пост'},
+                        files={'image': make_jpeg()})
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    def test_animated_gif_is_kept(self):
+        """Анимация проходит форму без перекодирования."""
+
+        upload = make_gif()
+        data = upload.read()
+        upload.seek(0)
+        form = PostForm(data={'text': 'Пост'}, files={'image': upload})
+
+        self.assertTrue(form.is_valid(), form.errors)
+        image = form.cleaned_data['image']
+        image.seek(0)
+        self.assertEqual(image.read(), data)
+        with self.open(image) as result:
+            self.assertEqual(result.n_frames, 3)
+
+    def test_mpo_is_normalized(self):
+        """Из MPO остается уменьшенный первый кадр без EXIF."""
+
+        form = PostForm(data={'text': 'Пост'},
+                        files={'image': make_mpo()})
+
+        self.assertTrue(form.is_valid(), form.errors)
+        with self.open(form.cleaned_data['image']) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (1000, 500))
+            self.assertEqual(len(image.getexif()), 0)
@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+
+from posts import kvstore, thumbnails
+from posts.models import Post
+
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class ThumbnailKVStoreTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ivan')
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(
+            MEDIA_ROOT=self.media_root,
+            THUMBNAIL_KVSTORE_PATH=os.path.join(self.media_root,
+                                                'kvstore.sqlite3'))
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+
+        self.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=self.author,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF,
+                                     content_type='image/gif'),
+        )
+        thumbnails.generate(self.post.id)
+        self.post.refresh_from_db()
+
+    def test_lookups_skip_database(self):
+        """Повторный get_thumbnail не обращается к основной БД."""
+
+        self.assertIsInstance(default.kvstore, kvstore.KVStore)
+        with self.assertNumQueries(0):
+            thumbnail = get_thumbnail(self.post.image, thumbnails.GEOMETRY,
+                                      **thumbnails.OPTIONS)
+
+        self.assertEqual(thumbnail.name, self.post.thumbnail)
+        self.assertTrue(os.path.exists(kvstore.path()))
+
+    @override_settings(THUMBNAIL_KVSTORE_PATH=None)
+    def test_store_is_not_public(self):
+        """По умолчанию хранилище лежит вне раздаваемого MEDIA_ROOT."""
+
+        self.assertFalse(kvstore.path().startswith(self.media_root))
+        self.assertEqual(os.path.dirname(kvstore.path()), settings.BASE_DIR)
+
+    def test_prefetch_loads_all_thumbnails(self):
+        """prefetch подгружает в LRU исходник и все его миниатюры."""
+
+        store = kvstore.KVStore()
+        store.prefetch([self.post.image])
+        loaded = dict(store.lru.data)
+
+        source = ImageFile(self.post.image)
+        thumbnail_keys = store._get(source.key, identity='thumbnails')
+        self.assertEqual(len(thumbnail_keys), 1 + len(thumbnails.formats()))
+        for key in thumbnail_keys:
+            self.assertIsNotNone(loaded.get(add_prefix(key)))
+
+    def test_gc_removes_orphans(self):
+        """thumbnail_gc удаляет записи удаленных постов и лишние файлы."""
+
+        orphan = os.path.join(self.media_root, 'cache', 'ab', 'orphan.jpg')
+        os.makedirs(os.path.dirname(orphan))
+        open(orphan, 'wb').close()
+
+        other = Post.objects.create(
+            text='Удаленный пост',
+            author=self.author,
+            image=SimpleUploadedFile('other.gif', SMALL_GIF,
+                                     content_type='image/gif'),
+        )
+        thumbnails.generate(other.id)
+        other_thumbnail = Post.objects.get(pk=other.pk).thumbnail
+        other.delete()
+
+        call_command('thumbnail_gc', stdout=StringIO())
+
+        self.assertFalse(os.path.exists(orphan))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.media_root, other_thumbnail)))
+        self.assertTrue(os.path.exists(
+            os.path.join(self.media_root, self.post.thumbnail)))
+        self.assertTrue(os.path.exists(kvstore.path()))
@@ -0,0 +1,120 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts import likes
+from posts.models import Like, LikeCounter, Post
+
+
+User = get_user_model()
+
+
+class LikeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ivan')
+        cls.reader = User.objects.create_user(username='petr')
+        cls.post = Post.objects.create(text='Тестовый текст поста',
+                                       author=cls.author)
+        cls.like_address = reverse('posts:post_like', kwargs={
+            'username': 'ivan', 'post_id': cls.post.pk})
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_toggle(self):
+        self.assertTrue(likes.toggle(self.reader, self.post.pk))
+        self.assertEqual(likes.counts([self.post.pk]), {self.post.pk: 1})
+
+        self.assertFalse(likes.toggle(self.reader, self.post.pk))
+        self.assertEqual(likes.counts([self.post.pk]), {self.post.pk: 0})
+        self.assertFalse(Like.objects.exists())
+
+    def test_unique_like(self):
+        Like.objects.create(user=self.reader, post=self.post)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Like.objects.create(user=self.reader, post=self.post)
+
+    @override_settings(POSTS_LIKE_SHARDS=4)
+    def test_likes_spread_over_shards(self):
+        for i in range(40):
+            user = User.objects.create_user(username=f'fan{i}')
+            Like.objects.create(user=user, post=self.post)
+        Like.objects.filter(user__username__in=['fan0', 'fan1']).delete()
+
+        counters = LikeCounter.objects.filter(post=self.post)
+        self.assertGreater(counters.count(), 1)
+        self.assertLessEqual(counters.count(), 4)
+        self.assertEqual(counters.aggregate(total=Sum('count'))['total'], 38)
+        self.assertEqual(likes.counts([self.post.pk])[self.post.pk], 38)
+
+    def test_counts_are_cached(self):
+        other = Post.objects.create(text='Другой пост', author=self.author)
+        Like.objects.create(user=self.reader, post=self.post)
+        likes.counts([self.post.pk, other.pk])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(likes.counts([self.post.pk, other.pk]),
+                             {self.post.pk: 1, other.pk: 0})
+
+    def test_endpoint(self):
+        response = self.reader_client.post(
+            self.like_address, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json(), {'liked': True, 'likes': 1})
+
+        response = self.reader_client.post(self.like_address)
+        self.assertRedirects(response, reverse('posts:post', kwargs={
+            'username': 'ivan', 'post_id': self.post.pk}))
+        self.assertFalse(Like.objects.exists())
+
+    def test_endpoint_requires_login_and_post(self):
+        response = self.guest_client.post(self.like_address)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.reader_client.get(self.like_address).status_code,
+                         405)
+        self.assertFalse(Like.objects.exists())
+
+    def test_cards_show_count_and_state(self):
+        """Число лайков и кнопка подставляются в карточку из кеша."""
+
+        index = reverse('posts:index')
+        self.reader_client.get(index)
+        Like.objects.create(user=self.author, post=self.post)
+        likes.toggle(self.reader, self.post.pk)
+
+        response = self.reader_client.get(index)
+        self.assertContains(response, 'btn-danger">&#9829; '
+                                      '<span class="like-count">2</span>')
+        self.assertContains(response, f'action="{self.like_address}"')
+
+        response = self.guest_client.get(index)
+        self.assertContains(response, '&#9829; 2')
+        self.assertNotContains(response, 'csrfmiddlewaretoken')
+        self.assertNotIn('csrftoken', response.cookies)
+
+    def test_like_refreshes_conditional_get_for_liker(self):
+        address = reverse('posts:post', kwargs={
+            'username': 'ivan', 'post_id': self.post.pk})
+        etag = self.reader_client.get(address)['ETag']
+
+        self.reader_client.post(self.like_address)
+
+        response = self.reader_client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_deleting_post_removes_likes(self):
+        post = Post.objects.create(text='Удаляемый пост', author=self.author)
+        Like.objects.create(user=self.reader, post=post)
+
+        post.delete()
+
+        self.assertFalse(Like.objects.exists())
+        self.assertFalse(LikeCounter.objects.filter(post_id=post.pk).exists())
@@ -0,0 +1,143 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ivan')
+        cls.reader = User.objects.create_user(username='petr')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок группы',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_slug',
+            description='Другое описание',
+        )
+        for i in range(12):
+            cls.post = Post.objects.create(
+                text=f'Тестовый текст поста {i}',
+                author=cls.author,
+                group=cls.group,
+            )
+        cls.addresses = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            'profile': reverse('posts:profile', kwargs={'username': 'ivan'}),
+            'post': reverse('posts:post', kwargs={
+                'username': 'ivan', 'post_id': cls.post.pk}),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def assert_cached(self, name, cached=True):
+        response = self.guest_client.get(self.addresses[name])
+        self.assertEqual(response['X-Page-Cache'],
+                         'hit' if cached else 'miss', name)
+        return response
+
+    def warm(self):
+        for name in self.addresses:
+            self.assert_cached(name, cached=False)
+
+    def test_anonymous_hit_skips_orm_and_templates(self):
+        """Повторный анонимный запрос не обращается к базе и шаблонам."""
+
+        for name, address in self.addresses.items():
+            with self.subTest(page=name):
+                first = self.guest_client.get(address)
+                with self.assertNumQueries(0), \
+                        self.assertTemplateNotUsed('base.html'):
+                    second = self.guest_client.get(address)
+                self.assertEqual(second['X-Page-Cache'], 'hit')
+                self.assertEqual(second.content, first.content)
+
+    def test_hit_answers_conditional_get(self):
+        first = self.guest_client.get(self.addresses['index'])
+        self.guest_client.get(self.addresses['index'])
+
+        response = self.guest_client.get(
+            self.addresses['index'], HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_pages_are_keyed_by_page_number(self):
+        self.guest_client.get(self.addresses['index'])
+
+        response = self.guest_client.get(self.addresses['index'] + '?page=2')
+
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Тестовый текст поста 0')
+
+    def test_session_cookie_bypasses_cache(self):
+        client = Client()
+        client.force_login(self.reader)
+
+        for _ in range(2):
+            response = client.get(self.addresses['index'])
+            self.assertNotIn('X-Page-Cache', response)
+
+    def test_new_post_invalidates_its_pages(self):
+        self.warm()
+
+        Post.objects.create(text='Свежий пост', author=self.author,
+                            group=self.group)
+
+        for name in ('index', 'group', 'profile'):
+            with self.subTest(page=name):
+                response = self.assert_cached(name, cached=False)
+                self.assertContains(response, 'Свежий пост')
+
+    def test_moved_post_invalidates_old_group(self):
+        self.warm()
+
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.other_group
+        post.save()
+
+        response = self.assert_cached('group', cached=False)
+        self.assertNotContains(response, f'post_{self.post.pk}"')
+
+    def test_comment_invalidates_post_pages(self):
+        self.warm()
+
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+
+        for name in self.addresses:
+            with self.subTest(page=name):
+                self.assert_cached(name, cached=False)
+
+    def test_follow_invalidates_author_pages(self):
+        self.warm()
+
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        self.assert_cached('index')
+        self.assert_cached('group')
+        self.assert_cached('profile', cached=False)
+        self.assert_cached('post', cached=False)
+
+    def test_group_change_invalidates_everything(self):
+        self.warm()
+
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        group.save()
+
+        for name in self.addresses:
+            with self.subTest(page=name):
+                self.assert_cached(name, cached=False)
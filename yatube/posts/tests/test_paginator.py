@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post, Group
+from posts.paginator import CursorPage, CursorPaginator
+
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ivan')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок группы',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый текст поста {i}',
+                 author=cls.author,
+                 group=cls.group)
+            for i in range(25)
+        )
+        # одинаковая дата у всех постов проверяет сортировку по id
+        Post.objects.update(pub_date=timezone.now())
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-id')
+            .values_list('id', flat=True)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def walk(self, paginator, cursor=None):
+        ids = []
+        page = paginator.get_page(cursor)
+        ids.extend(post.id for post in page)
+        while page.has_next():
+            page = paginator.get_page(page.next_cursor)
+            ids.extend(post.id for post in page)
+        return ids, page
+
+    def test_walk_forward_returns_every_post_once(self):
+        """Проход по next-курсорам возвращает все посты по порядку."""
+
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        ids, last_page = self.walk(paginator)
+
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(len(last_page), 5)
+        self.assertFalse(last_page.has_next())
+
+    def test_walk_backward(self):
+        """prev-курсор возвращает предыдущую страницу целиком."""
+
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+        back = paginator.get_page(second.previous_cursor)
+
+        self.assertFalse(first.has_previous())
+        self.assertTrue(second.has_previous())
+        self.assertEqual([post.id for post in back], self.expected[:10])
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_invalid_cursor_opens_first_page(self):
+        """Битый курсор открывает первую страницу."""
+
+        page = CursorPaginator(Post.objects.all(), 10).get_page('мусор')
+        self.assertEqual([post.id for post in page], self.expected[:10])
+
+    def test_feed_views_accept_cursor(self):
+        """Все ленты переключаются в keyset-режим по ?cursor=."""
+
+        addresses = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+        )
+
+        for address in addresses:
+            with self.subTest(address=address):
+                response = self.guest_client.get(address, {'cursor': ''})
+                page = response.context['page']
+                self.assertIsInstance(page, CursorPage)
+                self.assertEqual(len(page), 10)
+                self.assertContains(response, f'?cursor={page.next_cursor}')
+
+    def test_page_mode_is_default(self):
+        """Без курсора остается постраничный режим ?page=N."""
+
+        response = self.guest_client.get(reverse('posts:index') + '?page=3')
+        self.assertEqual(response.context['page'].number, 3)
+        self.assertEqual(len(response.context['page']), 5)
@@ -0,0 +1,155 @@
+import re
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import comments
+from posts.models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?(?P<table>\w+)(?!.* USING )')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class QueryPlanTests(TestCase):
+    """
+    Каждый запрос, который выполняют представления posts, должен идти
+    по индексу: без полного просмотра таблицы и без сортировки
+    во временном B-дереве.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ivan')
+        cls.user = User.objects.create_user(username='oleg')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок группы',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+        for i in range(15):
+            cls.post = Post.objects.create(
+                text=f'Тестовый текст поста {i}',
+                author=cls.author,
+                group=cls.group,
+            )
+            Comment.objects.create(post=cls.post, author=cls.user,
+                                   text='Тестовый комментарий')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_indexed(self, address):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(address)
+        self.assertEqual(response.status_code, 200)
+
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            for line in self.explain(sql):
+                self.assertIsNone(FULL_SCAN.match(line),
+                                  f'{address}: {line}\n{sql}')
+                self.assertNotIn(TEMP_SORT, line, f'{address}: {sql}')
+        return response
+
+    def test_feed_views_use_indexes(self):
+        """Ленты, профиль и страница поста читаются по индексам."""
+
+        addresses = (
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:post', kwargs={
+                'username': self.author.username,
+                'post_id': self.post.id}),
+            reverse('posts:follow_index'),
+        )
+
+        for address in addresses:
+            with self.subTest(address=address):
+                self.assert_indexed(address)
+
+    def test_cursor_pages_use_indexes(self):
+        """Следующие keyset-страницы тоже идут по индексам."""
+
+        addresses = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:follow_index'),
+        )
+
+        for address in addresses:
+            with self.subTest(address=address):
+                response = self.assert_indexed(address + '?cursor=')
+                cursor = response.context['page'].next_cursor
+                self.assert_indexed(f'{address}?cursor={cursor}')
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_merged_timeline_uses_indexes(self):
+        """Лента подписчика знаменитости сливается из индексных диапазонов."""
+
+        address = reverse('posts:follow_index')
+        self.assert_indexed(address)
+        self.assert_indexed(address + '?page=2')
+        response = self.assert_indexed(address + '?cursor=')
+        cursor = response.context['page'].next_cursor
+        self.assert_indexed(f'{address}?cursor={cursor}')
+
+    @override_settings(POSTS_SEARCH_BACKEND='index')
+    def test_index_search_uses_indexes(self):
+        """Поиск по обратному индексу читает постинги диапазонами."""
+
+        address = reverse('posts:search')
+        self.assert_indexed(address + '?q=тестовый')
+        self.assert_indexed(address + '?q=тестовый+текст')
+
+    @override_settings(COMMENTS_PER_PAGE=2)
+    def test_comment_pages_use_indexes(self):
+        for _ in range(4):
+            root = Comment.objects.create(post=self.post, author=self.author,
+                                          text='Еще комментарий')
+            Comment.objects.create(post=self.post, author=self.user,
+                                   text='Ответ', parent=root)
+        kwargs = {'username': self.author.username, 'post_id': self.post.id}
+
+        response = self.assert_indexed(reverse('posts:post', kwargs=kwargs))
+        cursor = response.context['comments'].next_cursor
+        address = reverse('posts:post_comments', kwargs=kwargs)
+        self.assert_indexed(f'{address}?cursor={cursor}')
+
+    def test_comment_threads_use_path_ranges(self):
+        """Ответы веток читаются диапазонами индекса (post, path)."""
+
+        root = Comment.objects.filter(post=self.post).first()
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Ответ', parent=root)
+
+        with CaptureQueriesContext(connection) as queries:
+            comments.get_page(self.post.pk)
+
+        plan = ' '.join(self.explain(queries.captured_queries[-1]['sql']))
+        self.assertIn('comment_post_path_idx', plan)
@@ -0,0 +1,154 @@
+import sqlite3
+from urllib.parse import urlencode
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts import fulltext
+from posts.models import Post
+from posts.stemmer import stem
+
+
+User = get_user_model()
+
+
+def sqlite_has_fts5():
+    try:
+        sqlite3.connect(':memory:').execute(
+            'CREATE VIRTUAL TABLE fts USING fts5(body)')
+    except sqlite3.OperationalError:
+        return False
+    return connection.vendor == 'sqlite'
+
+
+class StemmerTests(TestCase):
+    def test_russian_forms_share_stem(self):
+        """Формы одного слова сводятся к общей основе."""
+
+        cases = (
+            ('котики', 'котиков', 'котиками'),
+            ('бежала', 'бежали', 'бежать'),
+            ('красивая', 'красивый', 'красивых'),
+        )
+        for forms in cases:
+            with self.subTest(forms=forms):
+                self.assertEqual(len({stem(word) for word in forms}), 1)
+
+    def test_non_cyrillic_word_kept(self):
+        self.assertEqual(stem('Django'), 'django')
+        self.assertEqual(stem('Ёлки'), 'елк')
+
+
+class SearchMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ivan')
+        cls.cats = Post.objects.create(
+            text='Котики спят, котики едят, котики играют',
+            author=cls.author,
+        )
+        cls.cat_and_dog = Post.objects.create(
+            text='Котик подружился с собакой соседей, '
+                 'и теперь они гуляют вместе по двору каждый день',
+            author=cls.author,
+        )
+        cls.dogs = Post.objects.create(text='Собаки лают',
+                                       author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+
+    def search(self, query, **params):
+        return self.client.get(reverse('posts:search'),
+                               {'q': query, **params})
+
+    def test_inflected_query_finds_posts(self):
+        """Запрос в другой форме слова находит посты."""
+
+        response = self.search('котиками')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['page']),
+                         [self.cats, self.cat_and_dog])
+
+    def test_all_words_required(self):
+        """В выдаче только посты со всеми словами запроса."""
+
+        response = self.search('котик собака')
+
+        self.assertEqual(list(response.context['page']), [self.cat_and_dog])
+
+    def test_empty_query(self):
+        response = self.search('')
+
+        self.assertEqual(list(response.context['page']), [])
+
+    def test_keyset_pages(self):
+        """Выдача листается курсором, страницы не пересекаются."""
+
+        with self.settings(POSTS_PER_PAGE=1):
+            first = self.search('котик').context['page']
+            second = self.search(
+                'котик', cursor=first.next_cursor).context['page']
+            back = self.search(
+                'котик', cursor=second.previous_cursor).context['page']
+
+        self.assertEqual(list(first), [self.cats])
+        self.assertEqual(list(second), [self.cat_and_dog])
+        self.assertFalse(second.has_next())
+        self.assertEqual(list(back), [self.cats])
+
+    def test_pager_keeps_query(self):
+        with self.settings(POSTS_PER_PAGE=1):
+            response = self.search('котик')
+
+        query = urlencode({'q': 'котик'})
+        self.assertContains(response, f'?{query}&amp;cursor=')
+
+    def test_index_follows_edit_and_delete(self):
+        """Правка и удаление поста сразу видны в поиске."""
+
+        self.dogs.text = 'Кошки мяукают'
+        self.dogs.save()
+        self.assertEqual(list(self.search('собаки').context['page']),
+                         [self.cat_and_dog])
+        self.assertEqual(list(self.search('кошка').context['page']),
+                         [self.dogs])
+
+        self.dogs.delete()
+        self.assertEqual(list(self.search('кошка').context['page']), [])
+
+
+@skipUnless(sqlite_has_fts5(), 'SQLite без FTS5')
+class FTS5SearchTests(SearchMixin, TestCase):
+    def test_backend(self):
+        self.assertTrue(fulltext.fts5_enabled())
+
+
+@override_settings(POSTS_SEARCH_BACKEND='index')
+class InvertedIndexSearchTests(SearchMixin, TestCase):
+    def test_backend(self):
+        self.assertFalse(fulltext.fts5_enabled())
+        self.assertTrue(self.cats.search_postings.filter(
+            term=stem('котики'), frequency=3).exists())
+
+    @override_settings(POSTS_SEARCH_MAX_CANDIDATES=1)
+    def test_candidates_are_capped(self):
+        """Ранжируются только самые новые совпадения."""
+
+        self.assertEqual(list(self.search('котик').context['page']),
+                         [self.cat_and_dog])
+
+    def test_postings_read_in_chunks(self):
+        """Постинги читаются пачками, выдача от размера пачки не зависит."""
+
+        with mock.patch.object(fulltext, 'CHUNK_SIZE', 1):
+            self.assertEqual(list(self.search('котик').context['page']),
+                             [self.cats, self.cat_and_dog])
+            self.assertEqual(
+                list(self.search('котик собака').context['page']),
+                [self.cat_and_dog])
@@ -0,0 +1,109 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db.models import Count
+from django.test import TestCase
+
+from posts import likes, seed, stats
+from posts.models import (
+    Comment, Follow, Group, Like, LikeCounter, Post, TimelineEntry
+)
+
+
+User = get_user_model()
+
+
+class SeedBulkTests(TestCase):
+    def setUp(self):
+        self.seeder = seed.Seeder(seed=1, batch_size=50)
+        self.created = self.seeder.seed(users=40, groups=3, posts=300,
+                                        comments=200, follows=6)
+
+    def test_volumes(self):
+        """Создается запрошенное число записей."""
+
+        self.assertEqual(User.objects.count(), 40)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertTrue(Follow.objects.exists())
+        self.assertEqual(len(self.created['posts']), 300)
+
+    def test_dates_are_spread(self):
+        """Даты постов разбросаны, а не равны моменту загрузки."""
+
+        dates = set(Post.objects.values_list('pub_date__date', flat=True))
+        self.assertGreater(len(dates), 30)
+
+    def test_followers_are_skewed(self):
+        """У самых популярных авторов подписчиков намного больше среднего."""
+
+        counts = sorted(Follow.objects.values('author').annotate(
+            total=Count('id')).values_list('total', flat=True))
+        average = sum(counts) / len(counts)
+        self.assertGreater(counts[-1], 3 * average)
+
+    def test_derived_data_is_rebuilt(self):
+        """Счетчики, ленты и индекс пересчитаны после bulk_create."""
+
+        for user in User.objects.all():
+            expected = stats.compute(user.pk)
+            actual = user.stats
+            self.assertEqual(
+                (actual.posts_count, actual.followers_count,
+                 actual.following_count),
+                (expected['posts_count'], expected['followers_count'],
+                 expected['following_count']))
+
+        for post in Post.objects.annotate(actual=Count('comments')):
+            self.assertEqual(post.comment_count, post.actual)
+
+        comment = Comment.objects.first()
+        self.assertEqual(comment.path, f'{comment.pk:010d}/')
+
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(
+                user=follow.user, post__author=follow.author).count(),
+            Post.objects.filter(author=follow.author).count())
+
+    def test_export_and_load_roundtrip(self):
+        """Выгрузка JSON Lines загружается обратно без потерь."""
+
+        posts = list(Post.objects.order_by('id')[:3])
+        for user in User.objects.order_by('id')[:4]:
+            for post in posts[:user.pk % 3 + 1]:
+                Like.objects.create(user=user, post=post)
+        like_counts = likes.counts([post.pk for post in posts])
+
+        stream = StringIO()
+        exported = seed.export(stream)
+        before = list(Post.objects.order_by('id').values_list(
+            'id', 'text', 'author_id', 'group_id', 'pub_date',
+            'comment_count'))
+
+        Follow.objects.all().delete()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+
+        stream.seek(0)
+        loaded = seed.load(stream, batch_size=70)
+
+        self.assertEqual(loaded, exported)
+        after = list(Post.objects.order_by('id').values_list(
+            'id', 'text', 'author_id', 'group_id', 'pub_date',
+            'comment_count'))
+        self.assertEqual(after, before)
+
+        cache.clear()
+        self.assertEqual(likes.counts(list(like_counts)), like_counts)
+        self.assertEqual(LikeCounter.objects.filter(shard=0).count(), 3)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('seed_bulk', users=5, posts=10, seed=2, stdout=out)
+
+        self.assertEqual(User.objects.count(), 45)
+        self.assertIn('Готово', out.getvalue())
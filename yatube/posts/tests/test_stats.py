@@ -0,0 +1,99 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts import stats
+from posts.models import Follow, Post, UserStats
+
+
+User = get_user_model()
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ivan')
+        cls.user = User.objects.create_user(username='oleg')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def stats(self, user):
+        return UserStats.objects.get(pk=user.pk)
+
+    def test_counters_follow_posts_and_follows(self):
+        """Счетчики меняются при создании и удалении постов и подписок."""
+
+        post = Post.objects.create(text='Тестовый текст', author=self.author)
+        self.authorized_client.get(reverse(
+            'posts:profile_follow',
+            kwargs={'username': self.author.username}))
+
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.user).following_count, 1)
+
+        post.delete()
+        self.authorized_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}))
+
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.user).following_count, 0)
+
+    def test_author_card_uses_stats(self):
+        """Карточка автора показывает денормализованные счетчики."""
+
+        Post.objects.create(text='Тестовый текст', author=self.author)
+        Follow.objects.create(user=self.user, author=self.author)
+
+        response = self.authorized_client.get(reverse(
+            'posts:profile', kwargs={'username': self.author.username}))
+
+        self.assertEqual(response.context['author_stats'].posts_count, 1)
+        self.assertContains(response, 'Подписчиков: 1')
+        self.assertContains(response, 'Записей: 1')
+
+    def test_rebuild_command_fixes_drift(self):
+        """Команда rebuild_user_stats исправляет расхождения."""
+
+        Post.objects.create(text='Тестовый текст', author=self.author)
+        UserStats.objects.filter(pk=self.author.pk).update(posts_count=7)
+
+        call_command('rebuild_user_stats', stdout=StringIO())
+
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+
+    def test_rebuild_command_refreshes_pages(self):
+        """Исправленные счетчики сразу видны на закешированной странице."""
+
+        Post.objects.create(text='Тестовый текст', author=self.author)
+        UserStats.objects.filter(pk=self.author.pk).update(posts_count=7)
+        url = reverse('posts:profile',
+                      kwargs={'username': self.author.username})
+        self.assertContains(self.client.get(url), 'Записей: 7')
+
+        call_command('rebuild_user_stats', stdout=StringIO())
+
+        self.assertContains(self.client.get(url), 'Записей: 1')
+
+    def test_rebuild_all_refreshes_pages(self):
+        """Пересчет всех счетчиков сбрасывает кеш страниц."""
+
+        Post.objects.create(text='Тестовый текст', author=self.author)
+        UserStats.objects.filter(pk=self.author.pk).update(posts_count=7)
+        url = reverse('posts:profile',
+                      kwargs={'username': self.author.username})
+        self.assertContains(self.client.get(url), 'Записей: 7')
+
+        stats.rebuild_all()
+
+        self.assertContains(self.client.get(url), 'Записей: 1')
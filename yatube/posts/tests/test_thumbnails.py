@@ -0,0 +1,147 @@
+import os
+import shutil
+import tempfile
+
+import json
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Post
+
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    THUMBNAIL_KVSTORE_PATH=os.path.join(MEDIA_ROOT, 'kvstore.sqlite3'))
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ivan')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def create_post(self):
+        self.authorized_client.post(
+            reverse('posts:new_post'),
+            data={
+                'text': 'Пост с картинкой',
+                'image': SimpleUploadedFile('small.gif', SMALL_GIF,
+                                            content_type='image/gif'),
+            },
+        )
+        return Post.objects.get(text='Пост с картинкой')
+
+    @override_settings(POSTS_THUMBNAIL_WORKERS=0)
+    def test_thumbnail_is_precomputed_on_save(self):
+        """Миниатюра строится при сохранении, шаблон берет готовый адрес."""
+
+        post = self.create_post()
+
+        self.assertTrue(post.thumbnail.startswith('cache/'))
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, f'src="{post.thumbnail_url}"')
+
+    @override_settings(POSTS_THUMBNAIL_WORKERS=0)
+    def test_responsive_variants(self):
+        """Для srcset строятся варианты в каждом доступном формате."""
+
+        post = self.create_post()
+        variants = json.loads(post.image_variants)
+
+        expected = [name.lower() for name in thumbnails.formats()]
+        self.assertEqual(sorted(variants), sorted(expected))
+        self.assertTrue(post.image_srcset('webp').endswith('w'))
+
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, '<picture>')
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, f'srcset="{post.thumbnail_srcset}"')
+
+    def test_variant_widths_follow_source(self):
+        """Ширины больше исходной картинки не нарезаются."""
+
+        with override_settings(POSTS_IMAGE_WIDTHS=(2, 640)):
+            post = self.create_post()
+            variants = thumbnails.build_variants(post.image)
+
+        self.assertEqual([width for width, _ in variants['jpeg']], [2])
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        """Пока фоновый поток не построил миниатюру, выводится заглушка."""
+
+        post = self.create_post()
+
+        self.assertEqual(post.thumbnail, '')
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'aspect-ratio: 960 / 339')
+
+    @override_settings(POSTS_THUMBNAIL_WORKERS=0)
+    def test_new_image_resets_thumbnail(self):
+        """Замена картинки при редактировании перестраивает миниатюру."""
+
+        post = self.create_post()
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={
+                'username': self.author.username,
+                'post_id': post.id}),
+            data={
+                'text': 'Пост с картинкой',
+                'image': SimpleUploadedFile('other.gif', SMALL_GIF,
+                                            content_type='image/gif'),
+            },
+        )
+
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, 'posts/other.gif')
+        self.assertTrue(post.thumbnail)
+
+    @override_settings(POSTS_THUMBNAIL_WORKERS=0)
+    def test_failed_thumbnail_falls_back_to_image(self):
+        """Если миниатюру построить не удалось, показывается исходная
+        картинка, а generate_thumbnails строит миниатюру позже."""
+
+        with mock.patch.object(thumbnails, 'get_thumbnail',
+                               side_effect=OSError('битая картинка')), \
+                self.assertLogs('posts.thumbnails', 'ERROR'):
+            post = self.create_post()
+
+        self.assertEqual(post.thumbnail, post.image.name)
+        self.assertEqual(list(thumbnails.failed()), [post])
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, f'src="{post.image.url}"')
+
+        call_command('generate_thumbnails', stdout=StringIO())
+
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail.startswith('cache/'))
+        self.assertFalse(thumbnails.failed().exists())
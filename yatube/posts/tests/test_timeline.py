@@ -0,0 +1,134 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry
+
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ivan')
+        cls.star = User.objects.create_user(username='star')
+        cls.user = User.objects.create_user(username='oleg')
+
+        Post.objects.create(text='Старый пост автора', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def feed(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return [post.text for post in response.context['page']]
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту уже опубликованные посты автора."""
+
+        self.authorized_client.get(reverse(
+            'posts:profile_follow',
+            kwargs={'username': self.author.username}))
+
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(self.feed(), ['Старый пост автора'])
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков при сохранении."""
+
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=post).exists())
+        self.assertEqual(self.feed(), ['Новый пост', 'Старый пост автора'])
+
+    def test_unfollow_trims_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+
+        Follow.objects.create(user=self.user, author=self.author)
+        self.authorized_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}))
+
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_celebrity_posts_are_merged_on_read(self):
+        """Посты авторов с большим числом подписчиков подмешиваются
+        при чтении и не раскладываются по лентам."""
+
+        Follow.objects.create(user=self.author, author=self.star)
+        Follow.objects.create(user=self.user, author=self.star)
+        post = Post.objects.create(text='Пост знаменитости', author=self.star)
+
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), ['Пост знаменитости'])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_below_limit_keeps_merged_posts(self):
+        """Посты, опубликованные над порогом, остаются в лентах,
+        когда автор возвращается под порог."""
+
+        Follow.objects.create(user=self.author, author=self.star)
+        Follow.objects.create(user=self.user, author=self.star)
+        post = Post.objects.create(text='Пост знаменитости', author=self.star)
+        Follow.objects.filter(user=self.author, author=self.star).delete()
+
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=post).exists())
+        self.assertEqual(self.feed(), ['Пост знаменитости'])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_above_limit_is_withdrawn(self):
+        """Автор, перешедший порог, убирается из материализованных лент,
+        а его посты по-прежнему видны один раз."""
+
+        Follow.objects.create(user=self.user, author=self.star)
+        post = Post.objects.create(text='Пост звезды', author=self.star)
+        Follow.objects.create(user=self.author, author=self.star)
+
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), ['Пост звезды'])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1, POSTS_PER_PAGE=2)
+    def test_merged_timeline_pages(self):
+        """Слияние ленты и постов знаменитостей листается
+        и по номерам страниц, и по курсору."""
+
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.author, author=self.star)
+        Follow.objects.create(user=self.user, author=self.star)
+        for i in range(3):
+            Post.objects.create(text=f'Автор {i}', author=self.author)
+            Post.objects.create(text=f'Звезда {i}', author=self.star)
+        expected = [
+            'Звезда 2', 'Автор 2', 'Звезда 1', 'Автор 1', 'Звезда 0',
+            'Автор 0', 'Старый пост автора',
+        ]
+        address = reverse('posts:follow_index')
+
+        texts = []
+        for number in range(1, 5):
+            response = self.authorized_client.get(address, {'page': number})
+            texts += [post.text for post in response.context['page']]
+        self.assertEqual(texts, expected)
+
+        texts, cursor = [], ''
+        while cursor is not None:
+            response = self.authorized_client.get(address, {'cursor': cursor})
+            page = response.context['page']
+            texts += [post.text for post in page]
+            cursor = page.next_cursor
+        self.assertEqual(texts, expected)
+
+        previous = self.authorized_client.get(
+            address, {'cursor': page.previous_cursor}).context['page']
+        self.assertEqual([post.text for post in previous], expected[4:6])
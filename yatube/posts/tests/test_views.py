@@ -1,3 +1,4 @@
+import os
 import shutil
 import tempfile
 
@@ -51,6 +52,10 @@ class PostPagesTests(TestCase):
             content_type='image/gif'
         )
 
+        settings.MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        settings.THUMBNAIL_KVSTORE_PATH = os.path.join(settings.MEDIA_ROOT,
+                                                       'kvstore.sqlite3')
+
         cls.post = Post.objects.create(
             text='Тестовый текст поста',
             author=cls.author,
@@ -58,8 +63,6 @@ class PostPagesTests(TestCase):
             image=uploaded,
         )
 
-        settings.MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
-
     @classmethod
     def tearDownClass(cls):
         shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
@@ -257,34 +260,32 @@ class PostPagesTests(TestCase):
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
 
     def test_index_cache(self):
-        """ Получить текущее количество постов, создать новый пост,
-        запросить страницу с постами и проверить что там нет нового поста,
-        затем очистить кеш, снова запросить страницу с постами и увидеть,
-        что там появился пост.
+        """ Страница ленты берется из кеша, а новый пост сбрасывает кеш
+        и сразу появляется на главной странице без ожидания таймаута.
         """
 
-        posts_in_bd = self.guest_client.get(reverse('index')).content
-
-        Post.objects.create(
-            text='Тестовый текст нового поста',
-            author=self.author,
-        )
-
-        posts_with_cache = self.guest_client.get(reverse('index')).content
+        cache.clear()
+        posts_in_bd = self.guest_client.get(reverse('posts:index')).content
+        posts_with_cache = self.guest_client.get(
+            reverse('posts:index')).content
 
         self.assertEqual(
             posts_in_bd,
             posts_with_cache,
-            'Количество постов отличается')
+            'Повторный запрос отдал другую страницу')
 
-        cache.clear()
+        Post.objects.create(
+            text='Тестовый текст нового поста',
+            author=self.author,
+        )
 
-        posts_without_cache = self.guest_client.get(reverse('index')).content
+        posts_after_save = self.guest_client.get(
+            reverse('posts:index')).content
 
         self.assertNotEqual(
             posts_in_bd,
-            posts_without_cache,
-            'Количество постов одинаково')
+            posts_after_save,
+            'Новый пост не сбросил кеш ленты')
 
     def test_add_follow(self):
         """ подписка: обращаешься к follow_index, через context['page'].object_list[0]
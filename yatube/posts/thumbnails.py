@@ -0,0 +1,193 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.base import ThumbnailBackend as BaseThumbnailBackend
+
+from . import cards, feed_cache, page_cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+GEOMETRY = '960x339'
+OPTIONS = {'crop': 'center', 'upscale': True}
+
+# форматы вариантов в порядке предпочтения для <picture>
+FORMATS = ('AVIF', 'WEBP', 'JPEG')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def workers():
+    return getattr(settings, 'POSTS_THUMBNAIL_WORKERS', 2)
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=workers(), thread_name_prefix='thumbnails')
+        return _executor
+
+
+class ThumbnailBackend(BaseThumbnailBackend):
+    """Бэкенд sorl, который знает расширения форматов новее его самого."""
+
+    def _get_thumbnail_filename(self, source, geometry_string, options):
+        if options['format'] in EXTENSIONS:
+            return super()._get_thumbnail_filename(
+                source, geometry_string, options)
+
+        name = super()._get_thumbnail_filename(
+            source, geometry_string, dict(options, format='JPEG'))
+        return f"{name.rsplit('.', 1)[0]}.{options['format'].lower()}"
+
+
+def prefetch(images):
+    """
+    Подгружает метаданные миниатюр сразу для пачки картинок, если
+    хранилище sorl это умеет (см. posts.kvstore).
+    """
+
+    prefetch = getattr(default.kvstore, 'prefetch', None)
+    if prefetch is not None:
+        prefetch([image for image in images if image])
+
+
+def formats():
+    """Форматы, которые умеет записывать установленный Pillow."""
+
+    Image.init()
+    return [name for name in FORMATS if name in Image.SAVE]
+
+
+def widths():
+    return getattr(settings, 'POSTS_IMAGE_WIDTHS', (320, 640, 960, 1920))
+
+
+def variant_geometry(width):
+    base_width, base_height = map(int, GEOMETRY.split('x'))
+    return f'{width}x{max(1, round(width * base_height / base_width))}'
+
+
+def build_variants(image):
+    """
+    Нарезает картинку по ширинам POSTS_IMAGE_WIDTHS во всех доступных
+    форматах с тем же кадром, что и основная миниатюра. Ширины больше
+    исходной картинки пропускаются: растягивать их для srcset незачем.
+    """
+
+    sizes = [width for width in widths() if width <= image.width]
+    sizes = sizes or [min(widths())]
+
+    variants = {}
+    for format_ in formats():
+        entries = []
+        for width in sizes:
+            variant = get_thumbnail(image, variant_geometry(width),
+                                    crop='center', format=format_)
+            if variant.exists():
+                entries.append([variant.width, variant.name])
+        if entries:
+            variants[format_.lower()] = entries
+    return variants
+
+
+def generate(post_id):
+    """
+    Строит миниатюру и адаптивные варианты картинки поста и сохраняет
+    их адреса в посте. Если картинку успели заменить, результат
+    отбрасывается.
+    """
+
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or not post.image:
+        return None
+
+    prefetch([post.image])
+    thumbnail = get_thumbnail(post.image, GEOMETRY, **OPTIONS)
+    if not thumbnail.exists():
+        fall_back(post_id)
+        return None
+    variants = build_variants(post.image)
+
+    updated = Post.objects.filter(
+        pk=post_id, image=post.image.name
+    ).update(thumbnail=thumbnail.name, image_variants=json.dumps(variants),
+             **cards.changed())
+
+    if updated:
+        _changed(post_id)
+    return thumbnail.name
+
+
+def failed():
+    """Посты, которым вместо миниатюры показывается исходная картинка."""
+
+    return Post.objects.exclude(image='').filter(thumbnail=F('image'))
+
+
+def fall_back(post_id):
+    """
+    Если миниатюру построить не удалось, карточка показывает исходную
+    картинку вместо вечной заглушки: адрес картинки записывается
+    в thumbnail, и generate_thumbnails потом попробует снова.
+    """
+
+    updated = Post.objects.filter(pk=post_id, thumbnail='').exclude(
+        image='').update(thumbnail=F('image'), image_variants='',
+                         **cards.changed())
+    if updated:
+        _changed(post_id)
+
+
+def _changed(post_id):
+    feed_cache.invalidate()
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id).first()
+    if post is not None:
+        page_cache.invalidate(*page_cache.post_tags(post))
+
+
+def build(post_id):
+    """generate, который не роняет вызывающего: ошибка пишется в лог."""
+
+    try:
+        return generate(post_id)
+    except Exception:
+        logger.exception('Не удалось построить миниатюру поста %s', post_id)
+        fall_back(post_id)
+        return None
+
+
+def _run(post_id):
+    try:
+        build(post_id)
+    finally:
+        connection.close()
+
+
+def schedule(post):
+    """
+    Ставит построение миниатюры в очередь фоновых потоков после коммита,
+    чтобы запрос не ждал декодирования картинки. При
+    POSTS_THUMBNAIL_WORKERS = 0 миниатюра строится сразу.
+    """
+
+    if not post.image:
+        return
+
+    if not workers():
+        build(post.pk)
+        return
+
+    transaction.on_commit(lambda: executor().submit(_run, post.pk))
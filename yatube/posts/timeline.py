@@ -0,0 +1,239 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .paginator import DEFAULT_ORDERING, CursorPaginator, paginate
+
+CELEBRITIES_CACHE_KEY = 'posts:timeline:celebrities'
+CELEBRITIES_CACHE_TIMEOUT = 60
+
+ENTRY_ORDERING = ('-pub_date', '-post_id')
+
+
+def fanout_limit():
+    return getattr(settings, 'TIMELINE_FANOUT_LIMIT', 1000)
+
+
+def followers_count(author_id):
+    return UserStats.objects.filter(pk=author_id).values_list(
+        'followers_count', flat=True).first() or 0
+
+
+def is_celebrity(author_id):
+    """Авторов с огромным числом подписчиков не раскладываем по лентам."""
+
+    return followers_count(author_id) > fanout_limit()
+
+
+def celebrity_ids():
+    ids = cache.get(CELEBRITIES_CACHE_KEY)
+    if ids is None:
+        ids = list(
+            UserStats.objects.filter(followers_count__gt=fanout_limit())
+            .values_list('user_id', flat=True)
+        )
+        cache.set(CELEBRITIES_CACHE_KEY, ids, CELEBRITIES_CACHE_TIMEOUT)
+    return ids
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+
+    if is_celebrity(post.author_id):
+        cache.delete(CELEBRITIES_CACHE_KEY)
+        return
+
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers),
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_author(author_id):
+    """
+    Раскладывает все посты автора по лентам всех его подписчиков
+    одним INSERT ... SELECT, пропуская уже разложенные.
+    """
+
+    entries = TimelineEntry._meta.db_table
+    follows = Follow._meta.db_table
+    posts = Post._meta.db_table
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {entries} (user_id, post_id, pub_date) '
+            f'SELECT f.user_id, p.id, p.pub_date FROM {follows} f '
+            f'JOIN {posts} p ON p.author_id = f.author_id '
+            'WHERE f.author_id = %s AND NOT EXISTS ('
+            f'SELECT 1 FROM {entries} e '
+            'WHERE e.user_id = f.user_id AND e.post_id = p.id)',
+            [author_id],
+        )
+
+
+def withdraw(author_id):
+    """Убирает посты автора из всех лент подписчиков."""
+
+    TimelineEntry.objects.filter(post__author_id=author_id).delete()
+
+
+def backfill(user_id, author_id):
+    """
+    Добавляет в ленту подписчика уже опубликованные посты автора.
+    Если эта подписка перевела автора через порог, его посты
+    убираются из лент: дальше они подмешиваются при чтении.
+    """
+
+    followers = followers_count(author_id)
+    if followers > fanout_limit():
+        cache.delete(CELEBRITIES_CACHE_KEY)
+        if followers == fanout_limit() + 1:
+            withdraw(author_id)
+        return
+
+    posts = Post.objects.filter(
+        author_id=author_id).values_list('id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts.iterator()),
+        ignore_conflicts=True,
+    )
+
+
+def trim(user_id, author_id):
+    """
+    Убирает из ленты посты автора, от которого отписались. Если автор
+    при этом вернулся под порог, его посты раскладываются по лентам
+    оставшихся подписчиков: при чтении они больше не подмешиваются.
+    """
+
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+    if followers_count(author_id) == fanout_limit():
+        cache.delete(CELEBRITIES_CACHE_KEY)
+        fan_out_author(author_id)
+
+
+def rebuild(user_id):
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    for author_id in Follow.objects.filter(
+            user_id=user_id).values_list('author_id', flat=True):
+        backfill(user_id, author_id)
+
+
+class MergedTimeline:
+    """
+    Лента подписчика знаменитостей как слияние отсортированных
+    источников: диапазона материализованной ленты и по диапазону
+    на каждого такого автора. Каждый источник читается по индексу
+    с LIMIT, так что страница не зависит от длины ленты.
+    """
+
+    def __init__(self, user, celebrities):
+        self.entries = TimelineEntry.objects.filter(user=user)
+        self.sources = [
+            (self.entries.select_related('post__author', 'post__group'),
+             ENTRY_ORDERING),
+        ] + [
+            (Post.objects.filter(author_id=author_id).for_feed(),
+             DEFAULT_ORDERING)
+            for author_id in celebrities
+        ]
+        self.celebrities = celebrities
+
+    def count(self):
+        return self.entries.count() + Post.objects.filter(
+            author_id__in=self.celebrities).count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step:
+            raise TypeError('MergedTimeline поддерживает только срезы.')
+        return self.fetch(None, False, index.stop)[index.start or 0:]
+
+    def fetch(self, values, reverse, limit):
+        """Как CursorPaginator.fetch, но по всем источникам сразу."""
+
+        posts = {}
+        for queryset, ordering in self.sources:
+            rows = CursorPaginator(queryset, limit, ordering).fetch(
+                values, reverse, limit)
+            for row in rows:
+                post = row.post if isinstance(row, TimelineEntry) else row
+                posts[post.pk] = post
+        posts = sorted(posts.values(),
+                       key=lambda post: (post.pub_date, post.pk),
+                       reverse=not reverse)
+        return posts[:limit]
+
+
+class MergedPaginator(CursorPaginator):
+    """Keyset-страницы MergedTimeline; курсор тот же, что у ленты."""
+
+    def __init__(self, object_list, per_page, ordering=ENTRY_ORDERING):
+        super().__init__(object_list.entries, per_page, ordering)
+        self.timeline = object_list
+
+    def fetch(self, values, reverse, limit):
+        return self.timeline.fetch(values, reverse, limit)
+
+    def _key(self, post):
+        return [post.pub_date, post.pk]
+
+
+def get_page(request, user):
+    """
+    Страница ленты подписок. Обычно это один индексный диапазон по
+    (user, pub_date) материализованной ленты; посты авторов-знаменитостей,
+    если пользователь на них подписан, подмешиваются при чтении
+    слиянием ограниченных диапазонов, см. MergedTimeline.
+    """
+
+    celebrities = celebrity_ids()
+    if celebrities:
+        celebrities = list(Follow.objects.filter(
+            user=user, author_id__in=celebrities
+        ).values_list('author_id', flat=True))
+
+    if celebrities:
+        return paginate(request, MergedTimeline(user, celebrities),
+                        ordering=ENTRY_ORDERING,
+                        cursor_paginator=MergedPaginator)
+
+    entries = TimelineEntry.objects.filter(user=user).select_related(
+        'post__author', 'post__group').order_by(*ENTRY_ORDERING)
+    page = paginate(request, entries, ordering=ENTRY_ORDERING)
+    page.object_list = [entry.post for entry in page.object_list]
+    return page
+
+
+def rebuild_all():
+    """
+    Заново раскладывает посты по лентам всех подписчиков одним
+    INSERT ... SELECT, например после массовой загрузки.
+    """
+
+    entries = TimelineEntry._meta.db_table
+    follows = Follow._meta.db_table
+    posts = Post._meta.db_table
+    stats = UserStats._meta.db_table
+
+    with transaction.atomic():
+        TimelineEntry.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {entries} (user_id, post_id, pub_date) '
+                f'SELECT f.user_id, p.id, p.pub_date FROM {follows} f '
+                f'JOIN {posts} p ON p.author_id = f.author_id '
+                f'LEFT JOIN {stats} s ON s.user_id = f.author_id '
+                'WHERE COALESCE(s.followers_count, 0) <= %s',
+                [fanout_limit()],
+            )
+    cache.delete(CELEBRITIES_CACHE_KEY)
@@ -11,10 +11,18 @@ urlpatterns = [
     path('404/', views.page_not_found, name='404'),
     path('new/', views.new_post, name='new_post'),
 
+    path('cache/stats/',
+         views.feed_cache_stats,
+         name='feed_cache_stats'),
+
     path('follow/',
          views.follow_index,
          name='follow_index'),
 
+    path('search/',
+         views.search,
+         name='search'),
+
     path('<str:username>/',
          views.profile,
          name='profile'),
@@ -31,10 +39,22 @@ urlpatterns = [
          views.post_edit,
          name='post_edit'),
 
+    path('<str:username>/<int:post_id>/comments/',
+         views.post_comments,
+         name='post_comments'),
+
     path('<str:username>/<int:post_id>/comment/',
          views.add_comment,
          name='add_comment'),
 
+    path('<str:username>/<int:post_id>/comment/<int:comment_id>/',
+         views.add_comment,
+         name='add_reply'),
+
+    path('<str:username>/<int:post_id>/like/',
+         views.post_like,
+         name='post_like'),
+
     path('<str:username>/follow/',
          views.profile_follow,
          name='profile_follow'),
@@ -1,12 +1,17 @@
-from django.core.paginator import Paginator
+from django.db import transaction
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.conf import settings
-from django.views.decorators.http import require_GET
-from django.core.cache import cache
-
+from django.views.decorators.http import require_GET, require_POST
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+
+from . import (
+    comments, conditional, feed_cache, fulltext, likes, page_cache,
+    thumbnails, timeline
+)
 from .forms import CommentForm, PostForm
-from .models import Follow, Post, Group, User
+from .models import Comment, Follow, Post, Group, User
+from .stats import get_stats
 
 
 def page_not_found(request, exception):
@@ -23,41 +28,55 @@ def server_error(request):
 
 
 @require_GET
+@page_cache.anonymous(page_cache.index)
+@conditional.conditional(conditional.index)
 def index(request):
-    posts = cache.get('posts:index')
-    if posts is None:
-        posts = Post.objects.select_related('group').all()
-        cache.set('posts:index', posts, timeout=20)
+    posts = Post.objects.for_feed()
+    page = feed_cache.get_page(request, 'index', posts)
+
+    context = {
+        'page': page,
+    }
+
+    return render(request, 'posts/index.html', context)
+
+
+@require_GET
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page = fulltext.get_page(request, query)
 
-    paginator = Paginator(posts, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    context = {
+        'page': page,
+        'query': query,
+    }
 
-    return render(request, 'posts/index.html', {'page': page})
+    return render(request, 'posts/search.html', context)
 
 
+@page_cache.anonymous(page_cache.group_posts)
+@conditional.conditional(conditional.group_posts)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post = group.posts.all()
-    paginator = Paginator(post, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts = group.posts.for_feed()
+    page = feed_cache.get_page(request, f'group:{group.pk}', posts)
 
-    return render(
-        request,
-        'posts/group.html',
-        {'group': group, 'page': page}
-    )
+    context = {
+        'group': group,
+        'page': page,
+    }
 
+    return render(request, 'posts/group.html', context)
 
+
+@page_cache.anonymous(page_cache.post_view)
+@conditional.conditional(conditional.post_view)
 def post_view(request, username, post_id):
     post_view = get_object_or_404(Post, author__username=username, id=post_id)
     form = CommentForm(request.POST or None)
-    comments = post_view.comments.all()
+    comments_page = comments.get_page(post_view.pk)
 
-    posts_count = post_view.author.posts.count()
-    followers_count = Follow.objects.filter(author=post_view.author).count()
-    follow_count = Follow.objects.filter(user=post_view.author).count()
+    author_stats = get_stats(post_view.author)
 
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user, author=post_view.author).exists()
@@ -65,30 +84,68 @@ def post_view(request, username, post_id):
     context = {
         'form': form,
         'post_view': post_view,
-        'posts_count': posts_count,
-        'comments': comments,
-        'follow_count': follow_count,
-        'followers_count': followers_count,
+        'author_stats': author_stats,
+        'comments': comments_page,
         'following': following,
     }
 
     return render(request, 'posts/post.html', context)
 
 
+@require_GET
+@page_cache.anonymous(page_cache.post_view)
+@conditional.conditional(conditional.post_view)
+def post_comments(request, username, post_id):
+    """Следующая порция комментариев фрагментом HTML для подгрузки."""
+
+    get_object_or_404(Post.objects.only('pk'), author__username=username,
+                      id=post_id)
+    comments_page = comments.get_page(post_id, request.GET.get('cursor'))
+
+    context = {
+        'comments': comments_page,
+        'post_id': post_id,
+        'username': username,
+    }
+
+    return render(request, 'includes/comment_list.html', context)
+
+
 @login_required
-def add_comment(request, username, post_id):
+def add_comment(request, username, post_id, comment_id=None):
     post = get_object_or_404(Post, id=post_id)
+    parent = None
+    if comment_id is not None:
+        parent = comments.reply_parent(
+            get_object_or_404(Comment, id=comment_id, post=post))
     form = CommentForm(request.POST or None)
 
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        comment.parent = parent
+        with transaction.atomic():
+            comment.save()
 
     return redirect('posts:post', username, post_id)
 
 
+@require_POST
+@login_required
+def post_like(request, username, post_id):
+    """Ставит или снимает лайк; запросу из JS отвечает JSON."""
+
+    post = get_object_or_404(Post.objects.only('pk'),
+                             author__username=username, id=post_id)
+    liked = likes.toggle(request.user, post.pk)
+
+    if request.is_ajax():
+        return JsonResponse({'liked': liked,
+                             'likes': likes.counts([post.pk])[post.pk]})
+    return redirect('posts:post', username, post_id)
+
+
 @login_required
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -96,7 +153,9 @@ def new_post(request):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        with transaction.atomic():
+            post.save()
+            thumbnails.schedule(post)
 
         return redirect('posts:index')
 
@@ -120,7 +179,18 @@ def post_edit(request, username, post_id):
         return redirect('posts:post', post_edit.author, post_edit.id)
 
     if form.is_valid():
-        post_edit.save()
+        image_changed = 'image' in form.changed_data
+        update_fields = list(form.Meta.fields)
+        if image_changed:
+            post_edit.thumbnail = post_edit.image_variants = ''
+            update_fields += ['thumbnail', 'image_variants']
+
+        # comment_count меняется только атомарными UPDATE-ами,
+        # поэтому при редактировании сохраняем лишь поля формы
+        with transaction.atomic():
+            post_edit.save(update_fields=update_fields)
+            if image_changed:
+                thumbnails.schedule(post_edit)
 
         return redirect('posts:post', post_edit.author, post_edit.id)
 
@@ -131,26 +201,23 @@ def post_edit(request, username, post_id):
     )
 
 
+@page_cache.anonymous(page_cache.profile)
+@conditional.conditional(conditional.profile)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
 
-    paginator = Paginator(author.posts.all(), settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts = author.posts.for_feed()
+    page = feed_cache.get_page(request, f'profile:{author.pk}', posts)
 
-    posts_count = author.posts.count()
-    followers_count = Follow.objects.filter(author=author).count()
-    follow_count = Follow.objects.filter(user=author).count()
+    author_stats = get_stats(author)
 
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user, author=author).exists()
 
     context = {
         'author': author,
-        'posts_count': posts_count,
+        'author_stats': author_stats,
         'page': page,
-        'follow_count': follow_count,
-        'followers_count': followers_count,
         'following': following,
     }
 
@@ -159,11 +226,7 @@ def profile(request, username):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-
-    paginator = Paginator(posts, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = timeline.get_page(request, request.user)
 
     return render(request, "posts/follow.html", {'page': page})
 
@@ -173,10 +236,11 @@ def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
 
     if request.user != author:
-        Follow.objects.get_or_create(
-            author=author,
-            user=request.user
-        )
+        with transaction.atomic():
+            Follow.objects.get_or_create(
+                author=author,
+                user=request.user
+            )
 
     return redirect('posts:profile', username)
 
@@ -184,6 +248,12 @@ def profile_follow(request, username):
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    Follow.objects.filter(author=author, user=request.user).delete()
+    with transaction.atomic():
+        Follow.objects.filter(author=author, user=request.user).delete()
 
     return redirect('posts:profile', username)
+
+
+@staff_member_required
+def feed_cache_stats(request):
+    return JsonResponse(feed_cache.stats())
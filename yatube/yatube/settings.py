@@ -53,6 +53,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,6 +62,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware'
 ]
 
@@ -68,7 +71,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -88,13 +91,55 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# core.backends.sqlite3 настраивает каждое соединение PRAGMA ниже;
+# CONN_MAX_AGE держит соединение между запросами, чтобы не открывать
+# файл и не повторять PRAGMA на каждый запрос
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# WAL: читатели не ждут писателя; synchronous=NORMAL в WAL не теряет
+# целостность и делает fsync только при checkpoint; mmap_size и
+# cache_size (в КиБ со знаком минус) - 256 и 64 МиБ; busy_timeout - сколько
+# мс писатель ждет блокировку вместо "database is locked"
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+}
+
+# транзакции берут блокировку записи сразу и ждут ее busy_timeout
+SQLITE_TRANSACTION_MODE = 'IMMEDIATE'
+
+# DB_REPLICAS=N добавляет реплики replica1..N: чтения GET-запросов идут
+# на них, записи - на default, см. core.replicas. Локально это копии
+# db.sqlite3, которые обновляет manage.py sync_replicas --interval 1;
+# в тестах реплики - зеркала default
+DB_REPLICAS = int(os.environ.get('DB_REPLICAS', 0))
+
+for number in range(1, DB_REPLICAS + 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db.replica{number}.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+REPLICA_DATABASES = [f'replica{number}'
+                     for number in range(1, DB_REPLICAS + 1)]
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# сколько секунд после POST читатель читает основную базу: должно быть
+# больше отставания реплик
+REPLICA_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -130,6 +175,43 @@ USE_TZ = True
 
 POSTS_PER_PAGE = 10
 
+# 'page' - классическая пагинация ?page=N, 'cursor' - keyset-пагинация ?cursor=
+POSTS_PAGINATION = 'page'
+
+# комментарии на странице поста и в каждой подгружаемой порции, см.
+# posts.comments
+COMMENTS_PER_PAGE = 20
+
+# авторы с большим числом подписчиков не раскладываются по лентам подписок,
+# их посты подмешиваются в ленту при чтении
+TIMELINE_FANOUT_LIMIT = 1000
+
+# число фоновых потоков, строящих миниатюры; 0 - строить сразу в запросе
+POSTS_THUMBNAIL_WORKERS = 2
+
+# ширины адаптивных вариантов картинки поста для srcset
+POSTS_IMAGE_WIDTHS = (320, 640, 960, 1920)
+
+# ограничения на загружаемые картинки, см. posts.images
+POSTS_IMAGE_MAX_DIMENSION = 2560
+POSTS_IMAGE_MAX_PIXELS = 40_000_000
+POSTS_IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 ** 2
+POSTS_IMAGE_MAX_BYTES = 2 * 1024 ** 2
+POSTS_IMAGE_QUALITY = 85
+
+# 'auto' - SQLite FTS5, если она есть, иначе обратный индекс в таблице;
+# 'index' - всегда обратный индекс. После смены - rebuild_search_index
+POSTS_SEARCH_BACKEND = 'auto'
+
+# sorl с поддержкой AVIF, если его умеет Pillow
+THUMBNAIL_BACKEND = 'posts.thumbnails.ThumbnailBackend'
+
+# метаданные миниатюр хранятся не в основной БД, а в LRU процесса перед
+# SQLite-файлом THUMBNAIL_KVSTORE_PATH вне публичного MEDIA_ROOT,
+# см. posts.kvstore
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+THUMBNAIL_KVSTORE_PATH = os.path.join(BASE_DIR, 'thumbnails.sqlite3')
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
@@ -146,12 +228,80 @@ LOGOUT_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+# кеш лент сбрасывается событиями (сохранение и удаление постов, комментариев
+# и групп), таймаут лишь ограничивает время жизни давно не читанных страниц
+FEED_CACHE_TIMEOUT = 300
+
+# лайки: шарды счетчика на пост и сколько секунд кешируется число лайков;
+# столько же могут отставать чужие лайки на кешированных страницах и в 304
+POSTS_LIKE_SHARDS = 8
+POSTS_LIKES_TIMEOUT = 60
+
+# готовые страницы для анонимных читателей, см. posts.page_cache;
+# сбрасываются по тегам, таймаут ограничивает память; 0 - не кешировать
+POSTS_PAGE_CACHE_TIMEOUT = 600
+
+# CACHE_BACKEND=locmem - кеш в памяти процесса, у каждого воркера свой;
+# sqlite - один SQLite-файл CACHE_LOCATION на все процессы сервера, без
+# внешних сервисов. Оба бэкенда core.cache считают попадания для
+# core.metrics. Ключи живут с префиксом сайта и версией: CACHE_VERSION
+# поднимают при изменении формата закешированных страниц и карточек,
+# так как общий кеш переживает перезапуск воркеров
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND',
+                               'locmem' if DEBUG else 'sqlite')
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'core.cache.LocMemCache',
+    },
+    'sqlite': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+        },
+    },
+}
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        **CACHE_BACKENDS[CACHE_BACKEND],
+        'KEY_PREFIX': 'yatube',
+        'VERSION': int(os.environ.get('CACHE_VERSION', 1)),
     }
 }
 
+# MetricsMiddleware пишет строку на каждый запрос в логгер core.metrics
+# на уровне INFO (при DEBUG - только с METRICS_LOG_LEVEL=INFO), накопленные
+# гистограммы отдает /core/metrics/ (только staff)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.metrics': {
+            'handlers': ['console'],
+            'level': os.environ.get(
+                'METRICS_LOG_LEVEL', 'WARNING' if DEBUG else 'INFO'),
+        },
+    },
+}
+
+# профилирование запросов, см. core.profiling: staff включает его токеном
+# из /core/profiles/, остальные запросы попадают в выборку с этой долей
+PROFILING_SAMPLE_RATE = 0
+# 'sample' - свернутые стеки для flame graph, 'cprofile' - файлы .prof
+PROFILING_ENGINE = 'sample'
+PROFILING_INTERVAL = 0.001
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILING_MAX_FILES = 200
+PROFILING_MAX_BYTES = 50 * 1024 ** 2
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]